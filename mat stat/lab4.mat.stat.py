@@ -3,57 +3,130 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import statsmodels.api as sm
-from scipy.stats import pearsonr, spearmanr, kendalltau, chi2_contingency
+from scipy import stats
+from scipy.stats import chi2_contingency
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 
+
+# Корреляции всех пар столбцов матричными операциями, без вызова scipy на каждую пару
+
+def pearson_matrix(values):
+    """Матрица коэффициентов Пирсона по стандартизованным столбцам: r = Z^T Z / n"""
+    z = (values - values.mean(axis=0)) / values.std(axis=0)
+    return np.clip(z.T @ z / len(values), -1, 1)
+
+
+def t_test_matrix(r, n):
+    """t-статистики и двусторонние p-значения для матрицы коэффициентов (n - 2 степени свободы)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r * np.sqrt((n - 2) / (1 - r ** 2))
+    return t, 2 * stats.t.sf(np.abs(t), n - 2)
+
+
+def kendall_matrix(values, block_size=4_000_000):
+    """Матрицы tau-b Кендалла, z-статистик и p-значений (нормальное приближение с поправкой на связи)
+
+    S^T S по знакам разностей всех пар наблюдений дает разность согласованных и
+    несогласованных пар сразу для всех пар столбцов. Разности считаются блоками
+    строк, чтобы в памяти было не больше block_size чисел.
+    """
+    n, k = values.shape
+    con_minus_dis = np.zeros((k, k))
+    rows = max(1, block_size // (n * k))
+    for start in range(0, n, rows):
+        signs = np.sign(values[None, :, :] - values[start:start + rows, None, :]).reshape(-1, k)
+        con_minus_dis += signs.T @ signs
+    # Каждая пара наблюдений учтена дважды (i, j) и (j, i)
+    con_minus_dis /= 2
+
+    # Связи внутри столбцов: число связанных пар и слагаемые дисперсии, как в scipy.stats.kendalltau
+    tie_pairs, tie_x0, tie_x1 = np.zeros(k), np.zeros(k), np.zeros(k)
+    for col in range(k):
+        cnt = np.unique(values[:, col], return_counts=True)[1].astype(float)
+        cnt = cnt[cnt > 1]
+        tie_pairs[col] = (cnt * (cnt - 1) / 2).sum()
+        tie_x0[col] = (cnt * (cnt - 1) * (cnt - 2)).sum()
+        tie_x1[col] = (cnt * (cnt - 1) * (2 * cnt + 5)).sum()
+
+    total = n * (n - 1) / 2
+    untied = np.sqrt(total - tie_pairs)
+    m = n * (n - 1.0)
+    var = ((m * (2 * n + 5) - tie_x1[:, None] - tie_x1[None, :]) / 18
+           + 2 * np.outer(tie_pairs, tie_pairs) / m + np.outer(tie_x0, tie_x0) / (9 * m * (n - 2)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tau = np.clip(con_minus_dis / np.outer(untied, untied), -1, 1)
+        z = con_minus_dis / np.sqrt(var)
+    return tau, z, 2 * stats.norm.sf(np.abs(z))
+
+
+def correlation_matrices(df, method='pearson'):
+    """Коэффициенты, статистики и p-значения для всех пар столбцов df
+
+    method: 'pearson', 'spearman' (Пирсон по рангам) или 'kendall' (tau-b).
+    Возвращает три DataFrame: коэффициенты, статистики (t, для Кендалла - z)
+    и p-значения; на диагонали p-значение равно 0.
+    """
+    values = df.to_numpy(dtype=float)
+    if method == 'kendall':
+        r, stat, p = kendall_matrix(values)
+    else:
+        if method == 'spearman':
+            values = df.rank().to_numpy(dtype=float)
+        elif method != 'pearson':
+            raise ValueError(f"Неизвестный метод: {method}")
+        r = pearson_matrix(values)
+        stat, p = t_test_matrix(r, len(values))
+    np.fill_diagonal(r, 1.0)
+    np.fill_diagonal(stat, np.inf)
+    np.fill_diagonal(p, 0.0)
+    return tuple(pd.DataFrame(a, index=df.columns, columns=df.columns) for a in (r, stat, p))
+
+
+def max_corr_pair(r):
+    """Пара столбцов с наибольшим по модулю коэффициентом вне диагонали"""
+    i, j = np.triu_indices(len(r), k=1)
+    best = np.nanargmax(np.abs(r.to_numpy()[i, j]))
+    return (r.columns[i[best]], r.columns[j[best]]), r.iat[i[best], j[best]]
+
+
 data = pd.read_excel("iskhodnye.xlsx", sheet_name="Задание 4")
 data_clean = data.replace([np.inf, -np.inf], np.nan).dropna()
 X = data_clean[["X1", "X2", "X3", "X4", "X5"]]
 Y = data_clean["Y"]
 
 # 4.1 Корреляционный анализ
-corr_matrix = X.corr()
+corr_matrix, t_values, p_values = correlation_matrices(X)
 print("Корреляционная матрица:\n")
 print(corr_matrix.round(3))
 
-p_values = pd.DataFrame(np.zeros((5, 5)), columns=X.columns, index=X.columns)
-for col1 in X.columns:
-    for col2 in X.columns:
-        if col1 != col2:
-            _, p_val = pearsonr(X[col1], X[col2])
-            p_values.loc[col1, col2] = p_val
-
 print("\nМатрица p-значений:\n")
 print(p_values.round(3))
 
 significant_pairs = []
-for i in range(len(X.columns)):
-    for j in range(i+1, len(X.columns)):
-        col1, col2 = X.columns[i], X.columns[j]
-        if p_values.loc[col1, col2] < 0.05:
-            significant_pairs.append((col1, col2))
-            plt.figure(figsize=(6, 4))
-            plt.scatter(X[col1], X[col2], alpha=0.6)
-            plt.xlabel(col1)
-            plt.ylabel(col2)
-            plt.title(f"Диаграмма рассеивания: {col1} vs {col2}")
-            plt.grid(True)
-            plt.show()
+rows, cols = np.triu_indices(len(X.columns), k=1)
+for i, j in zip(rows, cols):
+    col1, col2 = X.columns[i], X.columns[j]
+    if p_values.iat[i, j] < 0.05:
+        significant_pairs.append((col1, col2))
+        plt.figure(figsize=(6, 4))
+        plt.scatter(X[col1], X[col2], alpha=0.6)
+        plt.xlabel(col1)
+        plt.ylabel(col2)
+        plt.title(f"Диаграмма рассеивания: {col1} vs {col2}")
+        plt.grid(True)
+        plt.show()
 
 # 4.2 Анализ пары с максимальной корреляцией
-max_corr = 0
-pair = None
-for col1 in X.columns:
-    for col2 in X.columns:
-        if col1 != col2 and abs(corr_matrix.loc[col1, col2]) > max_corr:
-            max_corr = abs(corr_matrix.loc[col1, col2])
-            pair = (col1, col2)
+pair, r_max = max_corr_pair(corr_matrix)
+max_corr = abs(r_max)
 
 col1, col2 = pair
 x1, x2 = X[col1], X[col2]
 
-rho, p_spearman = spearmanr(x1, x2)
-tau, p_kendall = kendalltau(x1, x2)
+spearman_r, _, spearman_p = correlation_matrices(X, 'spearman')
+kendall_r, _, kendall_p = correlation_matrices(X, 'kendall')
+rho, p_spearman = spearman_r.loc[col1, col2], spearman_p.loc[col1, col2]
+tau, p_kendall = kendall_r.loc[col1, col2], kendall_p.loc[col1, col2]
 x1_binned = pd.qcut(x1, q=3, labels=False)
 x2_binned = pd.qcut(x2, q=3, labels=False)
 contingency_table = pd.crosstab(x1_binned, x2_binned)
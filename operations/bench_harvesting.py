@@ -0,0 +1,75 @@
+"""Сравнение времени построения модели лесозаготовки в зависимости от размера задачи.
+
+Запуск:
+    python bench_harvesting.py
+    python bench_harvesting.py --sites 100 1000 5000 --months 12
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from harvesting import (SITE_COL, MONTH_COL, INCOME_COL, LABOR_COL, RESOURCES_COL, AREA_COL,
+                        tables_to_dicts, build_model, build_matrices)
+
+
+def make_instance(n_sites, n_months, missing_share=0.05, seed=0):
+    """Генерирует случайную задачу в виде четырех таблиц (как листы Excel файла)"""
+    rng = np.random.default_rng(seed)
+    sites = np.repeat(np.arange(1, n_sites + 1), n_months)
+    months = np.tile(np.arange(1, n_months + 1), n_sites)
+
+    income = rng.uniform(5, 15, len(sites)).round(2)
+    labor = rng.uniform(5, 10, len(sites)).round(2)
+    # Часть значений отсутствует, как "Не указано" в файле
+    income[rng.random(len(sites)) < missing_share] = np.nan
+    labor[rng.random(len(sites)) < missing_share] = np.nan
+
+    df_c = pd.DataFrame({SITE_COL: sites, MONTH_COL: months, INCOME_COL: income})
+    df_a = pd.DataFrame({SITE_COL: sites, MONTH_COL: months, LABOR_COL: labor})
+    df_b = pd.DataFrame({MONTH_COL: np.arange(1, n_months + 1),
+                         RESOURCES_COL: rng.uniform(50, 100, n_months).round(2) * n_sites})
+    df_bj = pd.DataFrame({SITE_COL: np.arange(1, n_sites + 1),
+                          AREA_COL: rng.uniform(20, 100, n_sites).round(2)})
+    return df_c, df_a, df_b, df_bj
+
+
+def time_dict_build(df_c, df_a, df_b, df_bj):
+    """Время построения модели PuLP через iterrows и вложенные циклы"""
+    start = time.perf_counter()
+    c, a, b, b_j = tables_to_dicts(df_c, df_a, df_b, df_bj)
+    build_model(c, a, b, b_j)
+    return time.perf_counter() - start
+
+
+def time_matrix_build(df_c, df_a, df_b, df_bj):
+    """Время построения модели в матричной форме"""
+    start = time.perf_counter()
+    build_matrices(df_c, df_a, df_b, df_bj)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Время построения модели лесозаготовки")
+    parser.add_argument('--sites', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--skip-dict', type=int, default=20000,
+                        help="не замерять построение через словари, начиная с этого числа переменных")
+    args = parser.parse_args(argv)
+
+    print(f"{'Участков':>9} {'Переменных':>11} {'Словари, с':>11} {'Матрицы, с':>11} {'Ускорение':>10}")
+    for n_sites in args.sites:
+        tables = make_instance(n_sites, args.months)
+        n_vars = n_sites * args.months
+        matrix_time = time_matrix_build(*tables)
+        if n_vars <= args.skip_dict:
+            dict_time = time_dict_build(*tables)
+            print(f"{n_sites:>9} {n_vars:>11} {dict_time:>11.3f} {matrix_time:>11.3f} "
+                  f"{dict_time / matrix_time:>9.1f}x")
+        else:
+            print(f"{n_sites:>9} {n_vars:>11} {'-':>11} {matrix_time:>11.3f} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""Набор замеров для моделей раздела operations: время построения и решения,
+пиковая память и значение целевой функции.
+
+Модели:
+    harvesting - ЛП лесозаготовки (lab2ui, HarvestingModel), участки x 12 месяцев,
+                 и она же генерацией столбцов (pricing);
+    transport  - транспортная ЛП (lab3): метод потенциалов и HiGHS;
+    timber     - MILP перевозки древесины (lab4), две переменные на маршрут.
+
+Каждый случай запускается в отдельном процессе, поэтому пиковая память
+(ru_maxrss) относится только к нему. Результаты пишутся в JSON, и два прогона
+разных версий можно сравнить ключом --compare.
+
+Запуск:
+    python benchmarks.py
+    python benchmarks.py --models transport --sizes toy small large -o bench.json
+    python benchmarks.py --sizes toy small --compare bench.json
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows: пиковая память не измеряется
+    resource = None
+
+# Размеры задач: от учебного примера до ~10^6 переменных
+SIZES = {
+    'harvesting': {'toy': {'sites': 10}, 'small': {'sites': 100},
+                   'medium': {'sites': 10000}, 'large': {'sites': 83334}},
+    'transport': {'toy': {'m': 3, 'n': 5}, 'small': {'m': 30, 'n': 50},
+                  'medium': {'m': 300, 'n': 400}, 'large': {'m': 1000, 'n': 1000}},
+    'timber': {'toy': {'m': 3, 'n': 4}, 'small': {'m': 20, 'n': 25},
+               'medium': {'m': 200, 'n': 250}, 'large': {'m': 700, 'n': 700}},
+}
+MONTHS = 12
+
+
+def make_transport(m, n, seed=0):
+    """Случайная сбалансированная транспортная задача m x n с целыми данными"""
+    rng = np.random.default_rng(seed)
+    cost = rng.integers(1, 21, size=(m, n)).astype(float)
+    supply = rng.integers(50, 150, size=m)
+    # Потребности - случайное разбиение суммы запасов, каждая не меньше 1
+    total = int(supply.sum())
+    cuts = np.sort(rng.choice(np.arange(1, total), size=n - 1, replace=False))
+    demand = np.diff(np.concatenate([[0], cuts, [total]]))
+    return supply.astype(float).tolist(), demand.astype(float).tolist(), cost
+
+
+def make_timber(m, n, seed=0):
+    """Случайная задача lab4 в виде словаря, как у load_data_from_excel"""
+    rng = np.random.default_rng(seed)
+    d1 = rng.integers(10, 50, size=n)
+    d2 = rng.integers(10, 50, size=n)
+    # Запасы распределены случайно с избытком 20% по каждому виду древесины
+    weights = rng.uniform(1, 5, size=m)
+    b = np.ceil(weights / weights.sum() * 2.4 * max(d1.sum(), d2.sum())).astype(int) + 2
+    b_half = b // 2  # при alpha = 0.5 нечетный остаток уходит в лиственную, как в lab4
+    return {
+        'm': m,
+        'n': n,
+        'alpha1': 0.5,
+        'alpha2': 0.5,
+        'c': rng.integers(1, 30, size=(m, n)).tolist(),
+        'b': b.tolist(),
+        'b_hardwood': (b - b_half).tolist(),
+        'b_softwood': b_half.tolist(),
+        'r': rng.integers(1, 10, size=m).tolist(),
+        'd1': d1.tolist(),
+        'd2': d2.tolist(),
+    }
+
+
+def _rss_mb():
+    """Пиковый объем памяти процесса в МБ (ru_maxrss: КБ в Linux, байты в macOS)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10
+
+
+def _bench_harvesting(params, time_limit, seed, method):
+    from bench_harvesting import make_instance
+    from harvesting import HarvestingModel
+
+    tables = make_instance(params['sites'], MONTHS, seed=seed)
+    rss_before = _rss_mb()
+    if method == 'pricing':
+        return _bench_pricing(tables, rss_before)
+    start = time.perf_counter()
+    model = HarvestingModel.from_tables(*tables)
+    build_time = time.perf_counter() - start
+    rss_build = _rss_mb()
+    start = time.perf_counter()
+    result = model.solve(time_limit=time_limit)
+    solve_time = time.perf_counter() - start
+    return {
+        'solver': result['solver'],
+        'n_vars': sum(1 for key in model.c if model._is_active(*key)),
+        'n_constraints': len(model.b) + len(model.b_j),
+        'build_time': build_time,
+        'solve_time': solve_time,
+        'rss_before_mb': rss_before,
+        'peak_build_mb': rss_build,
+        'objective': result['objective'],
+        'status': 'Stopped' if result.get('partial') else result['status_name'],
+    }
+
+
+def _bench_pricing(tables, rss_before):
+    # Генерация столбцов: в HiGHS попадают только добавленные пары, лимит времени не действует
+    from harvesting import build_matrices, solve_matrices_pricing
+
+    start = time.perf_counter()
+    mm = build_matrices(*tables)
+    build_time = time.perf_counter() - start
+    rss_build = _rss_mb()
+    start = time.perf_counter()
+    result = solve_matrices_pricing(mm)
+    solve_time = time.perf_counter() - start
+    return {
+        'solver': 'highs',
+        'n_vars': len(mm['c']),
+        'n_columns': result['pricing']['columns'],
+        'n_constraints': len(mm['rhs']),
+        'build_time': build_time,
+        'solve_time': solve_time,
+        'rss_before_mb': rss_before,
+        'peak_build_mb': rss_build,
+        'objective': result['objective'],
+        'status': result['status_name'],
+    }
+
+
+def _bench_transport(params, time_limit, seed, method):
+    import transport_simplex
+    from lab3 import build_highs, highspy
+
+    m, n = params['m'], params['n']
+    supply, demand, cost = make_transport(m, n, seed)
+    rss_before = _rss_mb()
+    case = {'n_vars': m * n, 'n_constraints': m + n, 'rss_before_mb': rss_before}
+    if method == 'modi':
+        # У метода потенциалов нет отдельной модели: построение - часть решения
+        start = time.perf_counter()
+        total, _ = transport_simplex.solve(cost, supply, demand)
+        case.update(build_time=0.0, solve_time=time.perf_counter() - start, peak_build_mb=rss_before,
+                    objective=total, status='Optimal' if total is not None else 'Infeasible')
+        return case
+
+    if highspy is None:
+        raise RuntimeError("Для метода highs нужен highspy")
+    start = time.perf_counter()
+    h = build_highs(supply, demand, cost, forbidden=())
+    build_time = time.perf_counter() - start
+    rss_build = _rss_mb()
+    if time_limit:
+        h.setOptionValue('time_limit', float(time_limit))
+    start = time.perf_counter()
+    h.run()
+    solve_time = time.perf_counter() - start
+    optimal = h.getModelStatus() == highspy.HighsModelStatus.kOptimal
+    case.update(build_time=build_time, solve_time=solve_time, peak_build_mb=rss_build,
+                objective=h.getInfo().objective_function_value if optimal else None,
+                status='Optimal' if optimal else h.modelStatusToString(h.getModelStatus()))
+    return case
+
+
+def _bench_timber(params, time_limit, seed, relax):
+    from lab4 import _solve_block, build_model
+
+    data = make_timber(params['m'], params['n'], seed)
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    prob, _, _ = build_model(data)
+    build_time = time.perf_counter() - start
+    rss_build = _rss_mb()
+    # Как в solve_timber(mode='monolithic'): модель передается решателю через словарь
+    start = time.perf_counter()
+    status, objective, _ = _solve_block((prob.to_dict(), relax, False))
+    solve_time = time.perf_counter() - start
+    return {
+        'n_vars': 2 * data['m'] * data['n'],
+        'n_constraints': 2 * (data['m'] + data['n']),
+        'build_time': build_time,
+        'solve_time': solve_time,
+        'rss_before_mb': rss_before,
+        'peak_build_mb': rss_build,
+        'objective': objective,
+        'status': status,
+    }
+
+
+def run_case(args):
+    """Выполняет один замер (в отдельном процессе) и добавляет пиковую память"""
+    model, size, method, time_limit, seed = args
+    params = SIZES[model][size]
+    if model == 'harvesting':
+        case = _bench_harvesting(params, time_limit, seed, method)
+    elif model == 'transport':
+        case = _bench_transport(params, time_limit, seed, method)
+    else:
+        case = _bench_timber(params, time_limit, seed, relax=method == 'relax')
+    case.update(model=model, size=size, method=method, params=params, seed=seed, peak_mb=_rss_mb())
+    return case
+
+
+def _isolated(task):
+    # Новый процесс на каждый замер: ru_maxrss не накапливается между случаями
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, task).result()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(models, sizes, time_limit=None, seed=0, isolate=True, on_case=None):
+    """Выполняет замеры для всех сочетаний модели, размера и метода
+
+    Ошибка одного случая (например, нехватка памяти) записывается в его
+    результат ('error') и не останавливает остальные замеры.
+    """
+    # harvesting решается HarvestingModel (HiGHS, без него - по списку решателей)
+    # и генерацией столбцов,
+    # timber - CBC как ЛП с проверкой целочисленности (relax) или как MILP
+    methods = {'harvesting': ['highs', 'pricing'], 'transport': ['modi', 'highs'], 'timber': ['relax', 'milp']}
+    results = []
+    for model in models:
+        for size in sizes:
+            for method in methods[model]:
+                task = (model, size, method, time_limit, seed)
+                try:
+                    case = _isolated(task) if isolate else run_case(task)
+                except Exception as e:
+                    case = {'model': model, 'size': size, 'method': method,
+                            'params': SIZES[model][size], 'seed': seed, 'error': f"{type(e).__name__}: {e}"}
+                results.append(case)
+                if on_case is not None:
+                    on_case(case)
+    return {
+        'commit': _git_commit(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time_limit': time_limit,
+        'results': results,
+    }
+
+
+def _case_key(case):
+    return case['model'], case['size'], case['method']
+
+
+def compare(old, new, tol=1e-6):
+    """Сравнивает два прогона: отношения времени и памяти, расхождения целевой функции
+
+    Возвращает список строк {model, size, method, build_ratio, solve_ratio,
+    peak_ratio, objective_changed}; отношение > 1 - новая версия медленнее.
+    """
+    def ratio(key, old_case, new_case):
+        before, after = old_case.get(key), new_case.get(key)
+        if before is None or after is None or before <= 0:
+            return None
+        return after / before
+
+    old_cases = {_case_key(case): case for case in old['results']}
+    rows = []
+    for case in new['results']:
+        prev = old_cases.get(_case_key(case))
+        if prev is None:
+            continue
+        before, after = prev.get('objective'), case.get('objective')
+        rows.append({
+            'model': case['model'],
+            'size': case['size'],
+            'method': case['method'],
+            'build_ratio': ratio('build_time', prev, case),
+            'solve_ratio': ratio('solve_time', prev, case),
+            'peak_ratio': ratio('peak_mb', prev, case),
+            'objective_changed': (before is None) != (after is None) or (
+                before is not None and abs(after - before) > tol * max(1.0, abs(before))),
+        })
+    return rows
+
+
+def _fmt(value, spec, suffix=''):
+    return '-' if value is None else format(value, spec) + suffix
+
+
+def format_case(case):
+    name = f"{case['model']}/{case['size']}/{case['method']}"
+    if 'error' in case:
+        return f"{name:<28} ошибка: {case['error']}"
+    return (f"{name:<28} {case['n_vars']:>9} {case['build_time']:>10.3f} {case['solve_time']:>10.3f} "
+            f"{_fmt(case['peak_mb'], '.1f'):>9} {_fmt(case['objective'], '.2f'):>16}  {case['status']}")
+
+
+def format_compare(rows):
+    lines = [f"{'Случай':<28} {'Построение':>10} {'Решение':>10} {'Память':>8}  Целевая функция"]
+    for row in rows:
+        name = f"{row['model']}/{row['size']}/{row['method']}"
+        lines.append(f"{name:<28} {_fmt(row['build_ratio'], '.2f', 'x'):>10} {_fmt(row['solve_ratio'], '.2f', 'x'):>10} "
+                     f"{_fmt(row['peak_ratio'], '.2f', 'x'):>8}  {'ИЗМЕНИЛАСЬ' if row['objective_changed'] else 'совпадает'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры моделей лесозаготовки, транспортной задачи и lab4")
+    parser.add_argument('--models', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--sizes', nargs='+', choices=['toy', 'small', 'medium', 'large'],
+                        default=['toy', 'small', 'medium'])
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help="лимит времени решения в секундах (для моделей HiGHS)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="файл JSON для результатов")
+    parser.add_argument('--compare', metavar='OLD_JSON', help="сравнить с результатами предыдущего прогона")
+    parser.add_argument('--no-isolate', action='store_true',
+                        help="замерять в текущем процессе (пиковая память накапливается)")
+    args = parser.parse_args(argv)
+
+    print(f"{'Случай':<28} {'Перем.':>9} {'Постр., с':>10} {'Реш., с':>10} {'Пик, МБ':>9} {'Цел. функция':>16}")
+    report = run_benchmarks(args.models, args.sizes, time_limit=args.time_limit, seed=args.seed,
+                            isolate=not args.no_isolate, on_case=lambda case: print(format_case(case), flush=True))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        print()
+        print(format_compare(compare(old, report)))
+    return 1 if any('error' in case for case in report['results']) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
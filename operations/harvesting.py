@@ -0,0 +1,1290 @@
+"""Расчетное ядро задачи оптимизации лесозаготовки без графического интерфейса.
+
+Модуль можно импортировать в пакетных расчетах, рабочих процессах и под
+профилировщиком: он не зависит от tkinter и не показывает диалогов.
+
+Запуск из командной строки:
+    python harvesting.py lesozagotovka.xlsx
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+import pulp
+from pulp import LpMaximize, LpProblem, LpVariable, lpSum, PULP_CBC_CMD
+from scipy import sparse
+from scipy.optimize import linprog
+
+from profiling import instrument_pulp, session, stage
+from result_cache import ResultCache, diff_plans, format_plan_diff, result_key
+
+try:
+    import highspy
+except ImportError:  # без highspy HiGHS доступен через scipy, а HarvestingModel пересобирает модель
+    highspy = None
+
+# Названия листов и колонок файла с исходными данными
+SITE_COL = 'Участок'
+MONTH_COL = 'Месяц'
+INCOME_COL = 'Доход (тыс. руб./га)'
+LABOR_COL = 'Трудозатраты (ч/га)'
+RESOURCES_COL = 'Ресурсы (часы)'
+AREA_COL = 'Площадь (га)'
+
+SHEETS = {
+    'income': 'Доход',
+    'labor': 'Труд',
+    'resources': 'Ресурсы',
+    'area': 'Площадь',
+}
+
+# Значение, которым в таблицах обозначаются отсутствующие данные
+MISSING_VALUE = "Не указано"
+
+# Значения меньше этого порога считаются нулевыми
+EPS = 0.0001
+
+
+def load_tables(file_path):
+    """Загружает четыре таблицы задачи из Excel файла"""
+    with stage('load'):
+        return {
+            key: pd.read_excel(file_path, sheet_name=sheet)
+            for key, sheet in SHEETS.items()
+        }
+
+
+def _is_missing(value):
+    return value == MISSING_VALUE or pd.isna(value)
+
+
+def format_value(value):
+    """Значение для отображения: "Не указано" для NaN, целое без дробной части, иначе 2 знака"""
+    if pd.isna(value):
+        return MISSING_VALUE
+    return int(value) if value == int(value) else round(float(value), 2)
+
+
+def tables_to_dicts(df_c, df_a, df_b, df_bj):
+    """Преобразует таблицы в словари c, a, b, b_j, пропуская "Не указано" """
+    c = {}
+    for _, row in df_c.iterrows():
+        if _is_missing(row[INCOME_COL]):
+            continue
+        c[(int(row[SITE_COL]), int(row[MONTH_COL]))] = float(row[INCOME_COL])
+
+    a = {}
+    for _, row in df_a.iterrows():
+        if _is_missing(row[LABOR_COL]):
+            continue
+        a[(int(row[SITE_COL]), int(row[MONTH_COL]))] = float(row[LABOR_COL])
+
+    b = {}
+    for _, row in df_b.iterrows():
+        b[int(row[MONTH_COL])] = float(row[RESOURCES_COL])
+
+    b_j = {}
+    for _, row in df_bj.iterrows():
+        b_j[int(row[SITE_COL])] = float(row[AREA_COL])
+
+    return c, a, b, b_j
+
+
+class MissingDataReport(dict):
+    """Отчет о полноте данных: {категория: список отсутствующих} плюс счетчики
+
+    Категории: income и labor - пары (участок, месяц) сетки без значения,
+    resources - месяцы, для которых есть доход или трудозатраты, но нет ресурсов,
+    area - такие же участки без площади. Пустые категории в словарь не входят,
+    так что пустой отчет ложен, как и прежний пустой словарь.
+    """
+    CATEGORIES = ('income', 'labor', 'resources', 'area')
+    TITLES = {
+        'income': "Отсутствуют доходы",
+        'labor': "Отсутствуют трудозатраты",
+        'resources': "Месяцы без ресурсов",
+        'area': "Участки без площади",
+    }
+
+    def __init__(self, missing, n_sites=0, n_months=0):
+        super().__init__((k, missing[k]) for k in self.CATEGORIES if missing.get(k))
+        self.n_sites = n_sites
+        self.n_months = n_months
+
+    @property
+    def counts(self):
+        """Число отсутствующих записей по каждой категории (включая нулевые)"""
+        return {k: len(self.get(k, ())) for k in self.CATEGORIES}
+
+    @property
+    def grid_size(self):
+        return self.n_sites * self.n_months
+
+    def summary(self):
+        """Краткая сводка по категориям"""
+        lines = [f"Сетка участок x месяц: {self.n_sites} x {self.n_months} = {self.grid_size}"]
+        for k, count in self.counts.items():
+            lines.append(f"{self.TITLES[k]}: {count}")
+        return "\n".join(lines)
+
+
+def _grid_missing(sites, months, keys):
+    """Ищет отсутствующие данные на сетке участок x месяц
+
+    sites, months - массивы участков и месяцев сетки, keys - {категория: (участки, месяцы)}
+    известных пар. Пары сопоставляются с сеткой внешним соединением по номерам
+    (get_indexer): пустые ячейки сетки - отсутствующие значения, пары вне сетки
+    указывают на месяцы без ресурсов и участки без площади.
+    """
+    sites = np.asarray(sites)
+    months = np.asarray(months)
+    site_index = pd.Index(sites)
+    month_index = pd.Index(months)
+
+    missing = {}
+    orphan_sites = []
+    orphan_months = []
+    for name, (key_sites, key_months) in keys.items():
+        i = site_index.get_indexer(key_sites)
+        j = month_index.get_indexer(key_months)
+        inside = (i >= 0) & (j >= 0)
+        present = np.zeros((len(sites), len(months)), dtype=bool)
+        present[i[inside], j[inside]] = True
+        # Порядок как у вложенных циклов: по участкам, внутри - по месяцам
+        ii, jj = np.nonzero(~present)
+        missing[name] = list(zip(sites[ii].tolist(), months[jj].tolist()))
+        orphan_sites.append(np.asarray(key_sites)[i < 0])
+        orphan_months.append(np.asarray(key_months)[j < 0])
+
+    missing['area'] = pd.unique(np.concatenate(orphan_sites)).tolist() if orphan_sites else []
+    missing['resources'] = pd.unique(np.concatenate(orphan_months)).tolist() if orphan_months else []
+    return MissingDataReport(missing, len(sites), len(months))
+
+
+def _key_arrays(d):
+    """Массивы участков и месяцев ключей словаря {(участок, месяц): значение}"""
+    keys = np.fromiter(chain.from_iterable(d), dtype=np.int64, count=2 * len(d)).reshape(len(d), 2)
+    return keys[:, 0], keys[:, 1]
+
+
+def check_data_completeness(c, a, b, b_j):
+    """Проверяет полноту данных и возвращает отчет MissingDataReport"""
+    sites = np.fromiter(b_j.keys(), dtype=np.int64, count=len(b_j))
+    months = np.fromiter(b.keys(), dtype=np.int64, count=len(b))
+    return _grid_missing(sites, months, {'income': _key_arrays(c), 'labor': _key_arrays(a)})
+
+
+def remove_problematic_data(c, a, b, b_j, missing_data):
+    """Удаляет проблемные данные из словарей (за один проход по c и a)"""
+    for site, month in missing_data.get('income', []):
+        c.pop((site, month), None)
+
+    for site, month in missing_data.get('labor', []):
+        a.pop((site, month), None)
+
+    # Участки без площади и месяцы без ресурсов удаляются вместе со связанными данными
+    bad_sites = set(missing_data.get('area', []))
+    bad_months = set(missing_data.get('resources', []))
+    for site in bad_sites:
+        b_j.pop(site, None)
+    for month in bad_months:
+        b.pop(month, None)
+    if bad_sites or bad_months:
+        for d in (c, a):
+            for key in [key for key in d if key[0] in bad_sites or key[1] in bad_months]:
+                del d[key]
+
+    return c, a, b, b_j
+
+
+def build_model(c, a, b, b_j):
+    """Строит модель ЛП и возвращает пару (модель, переменные x[j, t])
+
+    Переменные создаются только для пар (участок, месяц), у которых есть и
+    доход, и трудозатраты: остальные пары не входят в целевую функцию, и их
+    заготовка в оптимальном плане нулевая. Обход идет по данным, а не по
+    всей сетке участок x месяц; порядок переменных - по участкам, затем по
+    месяцам, как в b_j и b.
+    """
+    if not b_j or not b:
+        raise ValueError("Недостаточно данных для расчета!")
+
+    model = LpProblem("Оптимизация_лесозаготовки", LpMaximize)
+    site_order = {j: i for i, j in enumerate(b_j)}
+    month_order = {t: i for i, t in enumerate(b)}
+    keys = sorted(((j, t) for (j, t) in c if (j, t) in a and j in site_order and t in month_order),
+                  key=lambda key: (site_order[key[0]], month_order[key[1]]))
+    if not keys:
+        raise ValueError("Нет данных для расчета целевой функции!")
+    x = {(j, t): LpVariable(f"x_{j}_{t}", lowBound=0) for j, t in keys}
+
+    model += lpSum(c[key] * x[key] for key in keys)
+
+    # Слагаемые ограничений по месяцам и участкам собираются за один проход по переменным
+    labor_terms = {}
+    area_terms = {}
+    for j, t in keys:
+        labor_terms.setdefault(t, []).append(a[j, t] * x[j, t])
+        area_terms.setdefault(j, []).append(x[j, t])
+
+    # Ограничения по трудовым ресурсам и площади участков с явными именами
+    for t in b.keys():
+        if t in labor_terms:
+            model += lpSum(labor_terms[t]) <= b[t], f"Ресурсы_месяц_{t}"
+    for j in b_j.keys():
+        if j in area_terms:
+            model += lpSum(area_terms[j]) <= b_j[j], f"Площадь_участок_{j}"
+
+    return model, x
+
+
+def solve_model(model, msg=False):
+    """Решает модель симплекс-методом, перебирая доступные решатели"""
+    try:
+        # Первый вариант: используем GLPK если установлен
+        model.solve(pulp.GLPK(msg=msg, options=["--simplex"]))
+    except Exception:
+        try:
+            # Второй вариант: используем COIN с симплекс-методом
+            model.solve(PULP_CBC_CMD(msg=msg, options=["simplex"]))
+        except Exception:
+            # Третий вариант: стандартный решатель (часто использует симплекс)
+            model.solve(PULP_CBC_CMD(msg=msg))
+    return model.status
+
+
+def _shadow_price(model, name):
+    """Возвращает теневую цену ограничения или None, если оно не создано"""
+    if name not in model.constraints:
+        return None
+    pi = model.constraints[name].pi
+    if pi is None or abs(pi) < EPS:
+        return 0.0
+    return pi
+
+
+def extract_result(model, x, c, a, b, b_j):
+    """Собирает результат решения в словарь"""
+    result = {
+        'status': model.status,
+        'status_name': pulp.LpStatus[model.status],
+        'objective': None,
+        'plan': {},
+        'shadow_prices': {'resources': {}, 'area': {}},
+        'months': sorted(b.keys()),
+        'sites': sorted(b_j.keys()),
+    }
+    if model.status != 1:
+        return result
+
+    result['objective'] = model.objective.value()
+
+    for t in result['months']:
+        for j in result['sites']:
+            if (j, t) in c and (j, t) in a:
+                result['plan'][(j, t)] = x[j, t].value() or 0.0
+
+    for t in result['months']:
+        pi = _shadow_price(model, f"Ресурсы_месяц_{t}")
+        if pi is not None:
+            result['shadow_prices']['resources'][t] = pi
+
+    for j in result['sites']:
+        pi = _shadow_price(model, f"Площадь_участок_{j}")
+        if pi is not None:
+            result['shadow_prices']['area'][j] = pi
+
+    return result
+
+
+def solve_harvesting(c, a, b, b_j, msg=False, solver=None, ranging=False):
+    """Строит и решает модель по словарям данных, возвращает словарь результата
+
+    solver - имя решателя из SOLVERS; по умолчанию перебираются доступные
+    решатели в порядке SOLVER_ORDER, пока один из них не отработает. В результат
+    добавляются имя решателя ('solver') и время построения и решения ('solve_time').
+    ranging=True - добавить анализ чувствительности ('ranging', см. highs_ranging);
+    подходят только решатели, которые его поддерживают.
+    """
+    names = [solver] if solver else available_solvers()
+    if ranging:
+        if solver and solver in SOLVERS and not SOLVERS[solver].get('ranging'):
+            raise RuntimeError(f"Решатель {solver} не поддерживает анализ чувствительности")
+        names = [name for name in names if SOLVERS[name].get('ranging')]
+    if not names:
+        raise RuntimeError("Нет доступных решателей" + (" с анализом чувствительности" if ranging else ""))
+
+    error = None
+    for name in names:
+        if name not in SOLVERS:
+            raise ValueError(f"Неизвестный решатель: {name}")
+        start = time.perf_counter()
+        try:
+            if ranging:
+                result = SOLVERS[name]['solve'](c, a, b, b_j, msg=msg, ranging=True)
+            else:
+                result = SOLVERS[name]['solve'](c, a, b, b_j, msg=msg)
+        except ValueError:
+            # Недостаточно данных - другой решатель не поможет
+            raise
+        except Exception as e:
+            error = e
+            continue
+        result['solver'] = name
+        result['solve_time'] = time.perf_counter() - start
+        return result
+    raise RuntimeError(f"Ни один решатель не отработал: {error}")
+
+
+def _numeric_table(df, key_cols, value_col):
+    """Оставляет строки с числовым значением, при повторах ключа берет последнюю"""
+    table = df[key_cols + [value_col]].copy()
+    table[value_col] = pd.to_numeric(table[value_col], errors='coerce')
+    table = table.dropna()
+    table[key_cols] = table[key_cols].astype('int64')
+    table[value_col] = table[value_col].astype('float64')
+    return table.drop_duplicates(subset=key_cols, keep='last')
+
+
+def build_matrices(df_c, df_a, df_b, df_bj):
+    """Строит модель в матричной форме напрямую из таблиц, без циклов по строкам
+
+    Переменные - пары (участок, месяц), для которых известны и доход, и трудозатраты.
+    Строки матрицы: сначала ограничения по ресурсам месяцев, затем по площадям участков.
+    Возвращает словарь с вектором дохода 'c', разреженной матрицей 'A' (CSR) и правой частью 'rhs'.
+    """
+    income = _numeric_table(df_c, [SITE_COL, MONTH_COL], INCOME_COL)
+    labor = _numeric_table(df_a, [SITE_COL, MONTH_COL], LABOR_COL)
+    resources = _numeric_table(df_b, [MONTH_COL], RESOURCES_COL).sort_values(MONTH_COL)
+    area = _numeric_table(df_bj, [SITE_COL], AREA_COL).sort_values(SITE_COL)
+
+    if resources.empty or area.empty:
+        raise ValueError("Недостаточно данных для расчета!")
+
+    months = resources[MONTH_COL].to_numpy()
+    sites = area[SITE_COL].to_numpy()
+
+    # Оставляем только известные участки и месяцы
+    labor = labor[labor[SITE_COL].isin(sites) & labor[MONTH_COL].isin(months)]
+    pairs = income.merge(labor, on=[SITE_COL, MONTH_COL], how='inner')
+    pairs = pairs.sort_values([SITE_COL, MONTH_COL], ignore_index=True)
+
+    if pairs.empty:
+        raise ValueError("Нет данных для расчета целевой функции!")
+
+    # Ограничение по ресурсам создается для месяца, если в нем есть трудозатраты,
+    # по площади - для участка, если у него есть переменные в целевой функции
+    row_months = months[np.isin(months, labor[MONTH_COL].to_numpy())]
+    row_sites = sites[np.isin(sites, pairs[SITE_COL].to_numpy())]
+
+    pair_sites = pairs[SITE_COL].to_numpy()
+    pair_months = pairs[MONTH_COL].to_numpy()
+    n_vars = len(pairs)
+    n_res = len(row_months)
+
+    labor_rows = np.searchsorted(row_months, pair_months)
+    area_rows = n_res + np.searchsorted(row_sites, pair_sites)
+    cols = np.arange(n_vars)
+
+    A = sparse.csr_matrix(
+        (np.concatenate([pairs[LABOR_COL].to_numpy(), np.ones(n_vars)]),
+         (np.concatenate([labor_rows, area_rows]), np.concatenate([cols, cols]))),
+        shape=(n_res + len(row_sites), n_vars),
+    )
+    resources_rhs = resources.set_index(MONTH_COL)[RESOURCES_COL].loc[row_months].to_numpy()
+    area_rhs = area.set_index(SITE_COL)[AREA_COL].loc[row_sites].to_numpy()
+
+    return {
+        'c': pairs[INCOME_COL].to_numpy(),
+        'labor': pairs[LABOR_COL].to_numpy(),
+        'A': A,
+        'rhs': np.concatenate([resources_rhs, area_rhs]),
+        'pair_sites': pair_sites,
+        'pair_months': pair_months,
+        'row_months': row_months,
+        'row_sites': row_sites,
+        'months': months,
+        'sites': sites,
+    }
+
+
+def _matrix_result(mm, status, objective=None, x=None, duals=None):
+    """Словарь результата для решения модели в матричной форме"""
+    result = {
+        'status': status,
+        'status_name': pulp.LpStatus[status],
+        'objective': None,
+        'plan': {},
+        'shadow_prices': {'resources': {}, 'area': {}},
+        'months': [int(t) for t in mm['months']],
+        'sites': [int(j) for j in mm['sites']],
+    }
+    if status != pulp.LpStatusOptimal:
+        return result
+
+    result['objective'] = objective
+    result['plan'] = dict(zip(zip(mm['pair_sites'].tolist(), mm['pair_months'].tolist()), np.asarray(x).tolist()))
+
+    duals = np.array(duals, dtype=float)
+    duals[np.abs(duals) < EPS] = 0.0
+    n_res = len(mm['row_months'])
+    result['shadow_prices']['resources'] = dict(zip(mm['row_months'].tolist(), duals[:n_res].tolist()))
+    result['shadow_prices']['area'] = dict(zip(mm['row_sites'].tolist(), duals[n_res:].tolist()))
+    return result
+
+
+def solve_matrices(mm, msg=False):
+    """Решает модель в матричной форме за один вызов HiGHS (scipy.optimize.linprog)"""
+    with stage('solve'):
+        res = linprog(-mm['c'], A_ub=mm['A'], b_ub=mm['rhs'], bounds=(0, None), method='highs',
+                      options={'disp': bool(msg)})
+    status = {0: pulp.LpStatusOptimal, 2: pulp.LpStatusInfeasible,
+              3: pulp.LpStatusUnbounded}.get(res.status, pulp.LpStatusNotSolved)
+    with stage('extract'):
+        if status != pulp.LpStatusOptimal:
+            return _matrix_result(mm, status)
+        # Для задачи на максимум теневые цены равны маргиналам со знаком минус
+        return _matrix_result(mm, status, -res.fun, res.x, -res.ineqlin.marginals)
+
+
+def solve_matrices_highspy(mm, msg=False, ranging=False):
+    """Решает модель в матричной форме напрямую через highspy (без копирования в scipy)
+
+    ranging=True - добавить в результат анализ чувствительности ('ranging').
+    """
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', bool(msg))
+    inf = highspy.kHighsInf
+    with stage('build'):
+        A = mm['A'].tocsc()
+        n_vars = A.shape[1]
+        n_rows = A.shape[0]
+        # Сначала пустые строки, затем столбцы с коэффициентами (матрица по столбцам)
+        h.addRows(n_rows, np.full(n_rows, -inf), mm['rhs'].astype(float), 0,
+                  np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+        h.addCols(n_vars, mm['c'].astype(float), np.zeros(n_vars), np.full(n_vars, inf),
+                  A.nnz, A.indptr[:-1].astype(np.int32), A.indices.astype(np.int32), A.data.astype(float))
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+    with stage('solve'):
+        h.run()
+
+    model_status = h.getModelStatus()
+    status = {highspy.HighsModelStatus.kOptimal: pulp.LpStatusOptimal,
+              highspy.HighsModelStatus.kInfeasible: pulp.LpStatusInfeasible,
+              highspy.HighsModelStatus.kUnbounded: pulp.LpStatusUnbounded}.get(model_status, pulp.LpStatusNotSolved)
+    if status != pulp.LpStatusOptimal:
+        return _matrix_result(mm, status)
+    with stage('extract'):
+        solution = h.getSolution()
+        # При максимизации двойственные оценки строк <= неотрицательны и равны теневым ценам
+        result = _matrix_result(mm, status, h.getInfo().objective_function_value,
+                                solution.col_value, solution.row_dual)
+        if ranging:
+            keys = list(zip(mm['pair_sites'].tolist(), mm['pair_months'].tolist()))
+            n_res = len(mm['row_months'])
+            result['ranging'] = highs_ranging(
+                h, dict(zip(keys, range(len(keys)))), dict(zip(keys, mm['c'].tolist())),
+                dict(zip(mm['row_months'].tolist(), range(n_res))),
+                dict(zip(mm['row_sites'].tolist(), range(n_res, n_res + len(mm['row_sites'])))))
+    return result
+
+
+def solve_matrices_pricing(mm, msg=False, batch=None, tol=1e-9, max_rounds=1000):
+    """Решает модель в матричной форме генерацией столбцов (highspy)
+
+    HiGHS получает не все пары, а сокращенную задачу: сначала по одной паре
+    с наибольшим доходом на участок. После каждого решения по теневым ценам
+    месяцев pi_t и участков pi_j считаются приведенные стоимости всех пар
+    c - a * pi_t - pi_j (векторно, без модели), и пары с положительной
+    стоимостью добавляются столбцами - не больше batch за раунд (по умолчанию
+    по числу участков), начиная с наибольших. Решение продолжается с прежнего
+    базиса. Когда положительных приведенных стоимостей нет, план оптимален
+    для полной задачи.
+
+    Модель решателя растет только на добавленные столбцы, поэтому память
+    пропорциональна опорному множеству плана, а не числу пар. План
+    результата содержит только добавленные пары (остальные равны нулю);
+    в 'pricing' - число раундов 'rounds' и столбцов 'columns'.
+    """
+    if highspy is None:
+        raise RuntimeError("Генерация столбцов требует highspy")
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', bool(msg))
+    inf = highspy.kHighsInf
+    n_res = len(mm['row_months'])
+    n_pairs = len(mm['c'])
+    batch = batch or max(len(mm['row_sites']), 1)
+    with stage('build'):
+        # Номера строк ограничений для каждой пары: ресурсы месяца и площадь участка
+        labor_rows = np.searchsorted(mm['row_months'], mm['pair_months']).astype(np.int32)
+        area_rows = (n_res + np.searchsorted(mm['row_sites'], mm['pair_sites'])).astype(np.int32)
+        h.addRows(len(mm['rhs']), np.full(len(mm['rhs']), -inf), mm['rhs'].astype(float), 0,
+                  np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+
+    def add_columns(cols):
+        k = len(cols)
+        indices = np.empty(2 * k, dtype=np.int32)
+        indices[0::2] = labor_rows[cols]
+        indices[1::2] = area_rows[cols]
+        values = np.ones(2 * k)
+        values[0::2] = mm['labor'][cols]
+        h.addCols(k, mm['c'][cols].astype(float), np.zeros(k), np.full(k, inf),
+                  2 * k, np.arange(0, 2 * k, 2, dtype=np.int32), indices, values)
+
+    # Начальный набор: пара с наибольшим доходом на каждом участке (пары упорядочены по участкам)
+    order = np.lexsort((-mm['c'], mm['pair_sites']))
+    first = np.ones(n_pairs, dtype=bool)
+    first[1:] = mm['pair_sites'][order][1:] != mm['pair_sites'][order][:-1]
+    cols = np.sort(order[first])
+    active = np.zeros(n_pairs, dtype=bool)
+    active[cols] = True
+    with stage('build'):
+        add_columns(cols)
+
+    rounds = 0
+    while True:
+        rounds += 1
+        with stage('solve'):
+            h.run()
+        if h.getModelStatus() != highspy.HighsModelStatus.kOptimal or rounds >= max_rounds:
+            break
+        with stage('build'):
+            # При максимизации двойственные оценки строк <= неотрицательны и равны теневым ценам
+            duals = np.asarray(h.getSolution().row_dual)
+            reduced = mm['c'] - mm['labor'] * duals[labor_rows] - duals[area_rows]
+            reduced[active] = 0.0
+            candidates = np.flatnonzero(reduced > tol)
+            if not len(candidates):
+                break
+            if len(candidates) > batch:
+                candidates = candidates[np.argpartition(-reduced[candidates], batch - 1)[:batch]]
+            candidates.sort()
+            active[candidates] = True
+            cols = np.concatenate([cols, candidates])
+            add_columns(candidates)
+
+    model_status = h.getModelStatus()
+    status = {highspy.HighsModelStatus.kOptimal: pulp.LpStatusOptimal,
+              highspy.HighsModelStatus.kInfeasible: pulp.LpStatusInfeasible,
+              highspy.HighsModelStatus.kUnbounded: pulp.LpStatusUnbounded}.get(model_status, pulp.LpStatusNotSolved)
+    if rounds >= max_rounds and status == pulp.LpStatusOptimal:
+        # Раунды кончились раньше, чем приведенные стоимости: план допустим, но не доказано, что оптимален
+        status = pulp.LpStatusNotSolved
+    # Результат - по добавленным парам в порядке добавления столбцов
+    generated = dict(mm, pair_sites=mm['pair_sites'][cols], pair_months=mm['pair_months'][cols])
+    with stage('extract'):
+        if status != pulp.LpStatusOptimal:
+            result = _matrix_result(generated, status)
+        else:
+            solution = h.getSolution()
+            result = _matrix_result(generated, status, h.getInfo().objective_function_value,
+                                    solution.col_value, solution.row_dual)
+    result['pricing'] = {'rounds': rounds, 'columns': len(cols)}
+    return result
+
+
+def highs_ranging(h, cols, costs, resources_rows, area_rows):
+    """Анализ чувствительности по оптимальному базису HiGHS за один проход, без повторных решений
+
+    cols - {(участок, месяц): номер столбца}, costs - доходы этих пар,
+    resources_rows и area_rows - номера строк ограничений по месяцам и участкам.
+    Возвращает словарь:
+        'columns' - для каждой пары: приведенная стоимость 'reduced_cost',
+            диапазон дохода 'income' и трудозатрат 'labor', в которых
+            оптимальный базис (набор заготавливаемых пар) не меняется;
+            диапазон трудозатрат считается только для пар с нулевой
+            заготовкой, для остальных он None (их площадь меняется при
+            любом изменении трудозатрат);
+        'resources', 'area' - диапазоны правых частей, в которых теневые
+            цены не меняются.
+    Границы диапазонов - float, бесконечные - float('inf').
+    """
+    _, ranges = h.getRanging()
+    solution = h.getSolution()
+    basis = h.getBasis()
+    basic = highspy.HighsBasisStatus.kBasic
+    row_dual = solution.row_dual
+    col_dual = solution.col_dual
+
+    def bound(value):
+        if abs(value) >= highspy.kHighsInf:
+            return float('inf') if value > 0 else float('-inf')
+        return float(value) + 0.0  # без отрицательного нуля
+
+    columns = {}
+    for key, k in cols.items():
+        j, t = key
+        labor = None
+        if basis.col_status[k] != basic:
+            # Пара не заготавливается, пока c - pi_t * a - pi_j <= 0: трудозатраты можно
+            # увеличивать без ограничений, а уменьшать до (c - pi_j) / pi_t
+            pi_t = row_dual[resources_rows[t]] if t in resources_rows else 0.0
+            pi_j = row_dual[area_rows[j]] if j in area_rows else 0.0
+            lower = (costs[key] - pi_j) / pi_t if pi_t > EPS else float('-inf')
+            labor = (max(lower, 0.0), float('inf'))
+        reduced_cost = col_dual[k]
+        columns[key] = {
+            'reduced_cost': 0.0 if abs(reduced_cost) < EPS else reduced_cost,
+            'income': (bound(ranges.col_cost_dn.value_[k]), bound(ranges.col_cost_up.value_[k])),
+            'labor': labor,
+        }
+
+    def row_ranges(rows):
+        result = {}
+        for key, i in rows.items():
+            if basis.row_status[i] == basic:
+                # Ограничение не активно: правую часть можно уменьшать до фактического использования
+                result[key] = (float(solution.row_value[i]), float('inf'))
+            else:
+                result[key] = (bound(ranges.row_bound_dn.value_[i]), bound(ranges.row_bound_up.value_[i]))
+        return result
+
+    return {'columns': columns, 'resources': row_ranges(resources_rows), 'area': row_ranges(area_rows)}
+
+
+def dicts_to_matrices(c, a, b, b_j):
+    """Строит матричную форму модели по словарям c, a, b, b_j"""
+    def frame(d, key_cols, value_col):
+        keys = np.array(list(d.keys()), dtype=np.int64).reshape(len(d), len(key_cols))
+        df = pd.DataFrame(keys, columns=key_cols)
+        df[value_col] = np.fromiter(d.values(), dtype=float, count=len(d))
+        return df
+
+    with stage('convert'):
+        tables = (frame(c, [SITE_COL, MONTH_COL], INCOME_COL), frame(a, [SITE_COL, MONTH_COL], LABOR_COL),
+                  frame(b, [MONTH_COL], RESOURCES_COL), frame(b_j, [SITE_COL], AREA_COL))
+    with stage('build'):
+        return build_matrices(*tables)
+
+
+def _pulp_backend(make_solver):
+    """Решатель через модель PuLP (внешняя программа, двойственные оценки из файла решения)"""
+    def solve(c, a, b, b_j, msg=False):
+        with stage('build'):
+            model, x = build_model(c, a, b, b_j)
+        solver = make_solver(msg)
+        instrument_pulp(model, solver)
+        with stage('solve'):
+            model.solve(solver)
+        with stage('extract'):
+            return extract_result(model, x, c, a, b, b_j)
+    return solve
+
+
+# Реестр решателей: имя -> функция решения по словарям и проверка доступности.
+# Все решатели возвращают одинаковый словарь результата, включая теневые цены;
+# решатели с 'ranging' умеют добавлять в него анализ чувствительности.
+SOLVERS = {
+    'highs': {
+        'solve': lambda c, a, b, b_j, msg=False, ranging=False: solve_matrices_highspy(
+            dicts_to_matrices(c, a, b, b_j), msg, ranging),
+        'available': lambda: highspy is not None,
+        'ranging': True,
+    },
+    'scipy': {
+        'solve': lambda c, a, b, b_j, msg=False: solve_matrices(dicts_to_matrices(c, a, b, b_j), msg),
+        'available': lambda: True,
+    },
+    'cbc': {
+        'solve': _pulp_backend(lambda msg: PULP_CBC_CMD(msg=msg, options=["simplex"])),
+        'available': lambda: PULP_CBC_CMD(msg=False).available(),
+    },
+    'glpk': {
+        'solve': _pulp_backend(lambda msg: pulp.GLPK(msg=msg, options=["--simplex"])),
+        'available': lambda: pulp.GLPK(msg=False).available(),
+    },
+    # Генерация столбцов для очень больших задач: выбирается только явно
+    'pricing': {
+        'solve': lambda c, a, b, b_j, msg=False: solve_matrices_pricing(dicts_to_matrices(c, a, b, b_j), msg),
+        'available': lambda: highspy is not None,
+    },
+}
+
+# Порядок предпочтения: сначала решатели в текущем процессе, затем внешние программы
+SOLVER_ORDER = ['highs', 'scipy', 'cbc', 'glpk']
+
+
+def register_solver(name, solve, available=lambda: True, first=False, ranging=False):
+    """Добавляет решатель в реестр; first=True - поставить его первым в порядке предпочтения
+
+    ranging=True - функция решения принимает аргумент ranging (анализ чувствительности).
+    """
+    SOLVERS[name] = {'solve': solve, 'available': available, 'ranging': ranging}
+    if name in SOLVER_ORDER:
+        SOLVER_ORDER.remove(name)
+    if first:
+        SOLVER_ORDER.insert(0, name)
+    else:
+        SOLVER_ORDER.append(name)
+
+
+def available_solvers():
+    """Имена доступных решателей в порядке предпочтения"""
+    return [name for name in SOLVER_ORDER if SOLVERS[name]['available']()]
+
+
+def plan_harvesting_matrix(df_c, df_a, df_b, df_bj, drop_missing=True, ranging=False, pricing=False):
+    """Расчет по таблицам через матричную форму модели
+
+    Пары без дохода или трудозатрат в модель не входят; при drop_missing=False
+    и неполной сетке участок x месяц возбуждается ValueError. Анализ
+    чувствительности (ranging=True) и генерация столбцов (pricing=True, см.
+    solve_matrices_pricing) требуют highspy.
+    """
+    with stage('build'):
+        mm = build_matrices(df_c, df_a, df_b, df_bj)
+    if not drop_missing and len(mm['c']) < len(mm['sites']) * len(mm['months']):
+        raise ValueError("Обнаружены отсутствующие данные")
+    if pricing:
+        if ranging:
+            raise RuntimeError("Анализ чувствительности не поддерживается при генерации столбцов")
+        return solve_matrices_pricing(mm)
+    if ranging:
+        if highspy is None:
+            raise RuntimeError("Анализ чувствительности требует highspy")
+        return solve_matrices_highspy(mm, ranging=True)
+    return solve_matrices(mm)
+
+
+def check_tables_completeness(df_c, df_a, df_b, df_bj):
+    """То же, что check_data_completeness, но прямо по таблицам
+
+    Значения NaN отбрасываются масками, участки сетки берутся из таблицы
+    площадей, месяцы - из таблицы ресурсов.
+    """
+    sites = _numeric_table(df_bj, [SITE_COL], AREA_COL)[SITE_COL].to_numpy()
+    months = _numeric_table(df_b, [MONTH_COL], RESOURCES_COL)[MONTH_COL].to_numpy()
+    keys = {}
+    for name, df, value_col in (('income', df_c, INCOME_COL), ('labor', df_a, LABOR_COL)):
+        table = _numeric_table(df, [SITE_COL, MONTH_COL], value_col)
+        keys[name] = (table[SITE_COL].to_numpy(), table[MONTH_COL].to_numpy())
+    return _grid_missing(sites, months, keys)
+
+
+def tables_to_dicts_fast(df_c, df_a, df_b, df_bj):
+    """То же, что tables_to_dicts, но без iterrows (для больших таблиц)"""
+    income = _numeric_table(df_c, [SITE_COL, MONTH_COL], INCOME_COL)
+    labor = _numeric_table(df_a, [SITE_COL, MONTH_COL], LABOR_COL)
+    resources = _numeric_table(df_b, [MONTH_COL], RESOURCES_COL)
+    area = _numeric_table(df_bj, [SITE_COL], AREA_COL)
+
+    c = dict(zip(zip(income[SITE_COL].tolist(), income[MONTH_COL].tolist()), income[INCOME_COL].tolist()))
+    a = dict(zip(zip(labor[SITE_COL].tolist(), labor[MONTH_COL].tolist()), labor[LABOR_COL].tolist()))
+    b = dict(zip(resources[MONTH_COL].tolist(), resources[RESOURCES_COL].tolist()))
+    b_j = dict(zip(area[SITE_COL].tolist(), area[AREA_COL].tolist()))
+    return c, a, b, b_j
+
+
+class HarvestingModel:
+    """Постоянная модель лесозаготовки для повторных расчетов после правок
+
+    Правки передаются как изменения (доход, трудозатраты, ресурсы, площадь,
+    добавление или удаление участка и месяца). При установленном highspy модель
+    живет в одном объекте HiGHS, и повторное решение начинается с предыдущего
+    оптимального базиса. Без highspy модель пересобирается при каждом решении.
+
+    Удаленные переменные и ограничения не удаляются из HiGHS, а отключаются
+    границами: так номера столбцов и строк остаются стабильными, а базис -
+    допустимым для теплого старта.
+
+    Решение можно запускать в рабочем потоке: HiGHS отпускает GIL, а cancel()
+    из другого потока прерывает симплекс-метод. Лимит времени и отмена
+    действуют только при установленном highspy.
+    """
+
+    def __init__(self, c, a, b, b_j):
+        self.c = dict(c)
+        self.a = dict(a)
+        self.b = dict(b)
+        self.b_j = dict(b_j)
+
+        self._highs = None
+        self._cols = {}  # (участок, месяц) -> номер столбца
+        self._resources_rows = {}  # месяц -> номер строки
+        self._area_rows = {}  # участок -> номер строки
+        self._cancel = threading.Event()
+        if highspy is not None:
+            with stage('build'):
+                self._build_highs()
+
+    @classmethod
+    def from_tables(cls, df_c, df_a, df_b, df_bj):
+        """Создает модель по таблицам данных"""
+        with stage('convert'):
+            data = tables_to_dicts_fast(df_c, df_a, df_b, df_bj)
+        return cls(*data)
+
+    def _is_active(self, site, month):
+        key = (site, month)
+        return site in self.b_j and month in self.b and key in self.c and key in self.a
+
+    def _build_highs(self):
+        """Передает всю модель в HiGHS одним пакетом строк и столбцов"""
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+        # Прямой симплекс-метод: план x = 0 допустим, и каждая промежуточная точка -
+        # допустимый план с неубывающим доходом, который можно показать при прерывании
+        h.setOptionValue('simplex_strategy', 4)
+        h.cbSimplexInterrupt += self._interrupt
+        h.cbIpmInterrupt += self._interrupt
+        inf = highspy.kHighsInf
+
+        months = sorted(self.b)
+        sites = sorted(self.b_j)
+        self._resources_rows = {t: i for i, t in enumerate(months)}
+        self._area_rows = {j: len(months) + i for i, j in enumerate(sites)}
+        upper = np.array([self.b[t] for t in months] + [self.b_j[j] for j in sites], dtype=float)
+        h.addRows(len(upper), np.full(len(upper), -inf), upper, 0,
+                  np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+
+        keys = sorted(key for key in self.c if self._is_active(*key))
+        self._cols = {key: k for k, key in enumerate(keys)}
+        if keys:
+            n = len(keys)
+            indices = np.empty(2 * n, dtype=np.int32)
+            indices[0::2] = [self._resources_rows[t] for _, t in keys]
+            indices[1::2] = [self._area_rows[j] for j, _ in keys]
+            values = np.ones(2 * n)
+            values[0::2] = [self.a[key] for key in keys]
+            h.addCols(n, np.array([self.c[key] for key in keys], dtype=float), np.zeros(n), np.full(n, inf),
+                      2 * n, np.arange(0, 2 * n, 2, dtype=np.int32), indices, values)
+        self._highs = h
+
+    def _ensure_row(self, rows, key, upper):
+        inf = highspy.kHighsInf
+        if key in rows:
+            self._highs.changeRowBounds(rows[key], -inf, upper)
+        else:
+            rows[key] = self._highs.getNumRow()
+            self._highs.addRow(-inf, upper, 0, np.array([], dtype=np.int32), np.array([], dtype=float))
+
+    def _disable_row(self, rows, key):
+        if key in rows:
+            inf = highspy.kHighsInf
+            self._highs.changeRowBounds(rows[key], -inf, inf)
+
+    def _refresh_col(self, site, month):
+        """Приводит столбец x[site, month] в HiGHS в соответствие с данными"""
+        if self._highs is None:
+            return
+        key = (site, month)
+        col = self._cols.get(key)
+        if self._is_active(site, month):
+            if col is None:
+                self._cols[key] = self._highs.getNumCol()
+                self._highs.addCol(self.c[key], 0, highspy.kHighsInf, 2,
+                                   np.array([self._resources_rows[month], self._area_rows[site]], dtype=np.int32),
+                                   np.array([self.a[key], 1.0]))
+            else:
+                self._highs.changeColCost(col, self.c[key])
+                self._highs.changeCoeff(self._resources_rows[month], col, self.a[key])
+                self._highs.changeColBounds(col, 0, highspy.kHighsInf)
+        elif col is not None:
+            self._highs.changeColCost(col, 0)
+            self._highs.changeColBounds(col, 0, 0)
+
+    def set_income(self, site, month, value):
+        """Меняет доход пары (участок, месяц); None - значение не указано"""
+        if value is None:
+            self.c.pop((site, month), None)
+        else:
+            self.c[(site, month)] = float(value)
+        self._refresh_col(site, month)
+
+    def set_labor(self, site, month, value):
+        """Меняет трудозатраты пары (участок, месяц); None - значение не указано"""
+        if value is None:
+            self.a.pop((site, month), None)
+        else:
+            self.a[(site, month)] = float(value)
+        self._refresh_col(site, month)
+
+    def set_resources(self, month, value):
+        """Меняет ресурсы месяца, при необходимости добавляя месяц"""
+        is_new = month not in self.b
+        self.b[month] = float(value)
+        if self._highs is not None:
+            self._ensure_row(self._resources_rows, month, self.b[month])
+            if is_new:
+                for site in self.b_j:
+                    self._refresh_col(site, month)
+
+    def set_area(self, site, value):
+        """Меняет площадь участка, при необходимости добавляя участок"""
+        is_new = site not in self.b_j
+        self.b_j[site] = float(value)
+        if self._highs is not None:
+            self._ensure_row(self._area_rows, site, self.b_j[site])
+            if is_new:
+                for month in self.b:
+                    self._refresh_col(site, month)
+
+    def remove_month(self, month):
+        """Удаляет месяц вместе с доходами и трудозатратами этого месяца"""
+        self.b.pop(month, None)
+        for key in [key for key in self.c if key[1] == month]:
+            del self.c[key]
+        for key in [key for key in self.a if key[1] == month]:
+            del self.a[key]
+        if self._highs is not None:
+            self._disable_row(self._resources_rows, month)
+            for key in [key for key in self._cols if key[1] == month]:
+                self._refresh_col(*key)
+
+    def remove_site(self, site):
+        """Удаляет участок вместе с его доходами и трудозатратами"""
+        self.b_j.pop(site, None)
+        for key in [key for key in self.c if key[0] == site]:
+            del self.c[key]
+        for key in [key for key in self.a if key[0] == site]:
+            del self.a[key]
+        if self._highs is not None:
+            self._disable_row(self._area_rows, site)
+            for key in [key for key in self._cols if key[0] == site]:
+                self._refresh_col(*key)
+
+    def _interrupt(self, event):
+        # Флаг прерывания в данных обратного вызова HiGHS сам не сбрасывается,
+        # поэтому он выставляется при каждом вызове, а не только при отмене
+        event.interrupt(self._cancel.is_set())
+
+    def cancel(self):
+        """Прерывает идущее или ближайшее решение (можно вызывать из другого потока)"""
+        self._cancel.set()
+
+    def _feasible_plan(self, keys, col_value):
+        """Допустимый план из текущей точки прерванного симплекс-метода
+
+        Обычно точка уже допустима; если нет (например, после уменьшения ресурсов
+        решение прервано на первой фазе), отрицательные значения обнуляются, а
+        столбцы нарушенных ограничений уменьшаются пропорционально превышению.
+        Для неотрицательных трудозатрат, ресурсов и площадей план допустим.
+        """
+        x = np.maximum(np.asarray(col_value, dtype=float)[[self._cols[key] for key in keys]], 0.0)
+
+        def excess(groups, weights, limits):
+            # Отношение использования ограничения к его правой части для каждого столбца
+            names, inverse = np.unique(groups, return_inverse=True)
+            used = np.bincount(inverse, weights=weights * x, minlength=len(names))
+            upper = np.maximum([limits[name] for name in names.tolist()], 0.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.where(used > EPS, used / upper, 0.0)
+            return ratio[inverse]
+
+        labor = np.array([self.a[key] for key in keys])
+        scale = np.maximum(1.0, np.maximum(excess([t for _, t in keys], labor, self.b),
+                                           excess([j for j, _ in keys], np.ones(len(keys)), self.b_j)))
+        x = np.where(np.isinf(scale), 0.0, x / scale)
+        income = np.array([self.c[key] for key in keys])
+        return dict(zip(keys, x.tolist())), float(income @ x)
+
+    def solve(self, msg=False, time_limit=None, ranging=False):
+        """Решает модель и возвращает словарь результата, как solve_harvesting
+
+        ranging=True - добавить анализ чувствительности по оптимальному базису
+        ('ranging', см. highs_ranging).
+        time_limit - ограничение времени решения в секундах. Если решение
+        прервано по времени или через cancel(), в результат попадает лучший
+        найденный допустимый план: 'partial' = True, 'stopped' - причина
+        ('time_limit' или 'cancelled'). Теневые цены для такого плана не вычисляются.
+        """
+        if self._highs is None:
+            return solve_harvesting(dict(self.c), dict(self.a), dict(self.b), dict(self.b_j), msg=msg,
+                                    ranging=ranging)
+
+        if not self.b_j or not self.b:
+            raise ValueError("Недостаточно данных для расчета!")
+        active = [key for key in self._cols if self._is_active(*key)]
+        if not active:
+            raise ValueError("Нет данных для расчета целевой функции!")
+
+        h = self._highs
+        h.setOptionValue('output_flag', bool(msg))
+        h.setOptionValue('time_limit', float(time_limit) if time_limit else highspy.kHighsInf)
+        start = time.perf_counter()
+        try:
+            # Отмена, запрошенная до начала решения, прерывает его сразу
+            with stage('solve'):
+                h.run()
+        finally:
+            self._cancel.clear()
+        solve_time = time.perf_counter() - start
+
+        model_status = h.getModelStatus()
+        optimal = model_status == highspy.HighsModelStatus.kOptimal
+        status = pulp.LpStatusOptimal if optimal else pulp.LpStatusNotSolved
+        result = {
+            'status': status,
+            'status_name': pulp.LpStatus[status],
+            'objective': None,
+            'plan': {},
+            'shadow_prices': {'resources': {}, 'area': {}},
+            'months': sorted(self.b),
+            'sites': sorted(self.b_j),
+            'solver': 'highs (теплый старт)',
+            'solve_time': solve_time,
+        }
+        stopped = {highspy.HighsModelStatus.kTimeLimit: 'time_limit',
+                   highspy.HighsModelStatus.kInterrupt: 'cancelled'}.get(model_status)
+        with stage('extract'):
+            if stopped is not None:
+                result['stopped'] = stopped
+                result['partial'] = True
+                result['plan'], result['objective'] = self._feasible_plan(active, h.getSolution().col_value)
+                return result
+            if not optimal:
+                return result
+
+            solution = h.getSolution()
+            col_value = solution.col_value
+            row_dual = solution.row_dual
+            result['objective'] = h.getInfo().objective_function_value
+            result['plan'] = {key: col_value[self._cols[key]] for key in active}
+
+            # Ограничение по ресурсам считается созданным, если в месяце есть трудозатраты,
+            # по площади - если у участка есть переменные в целевой функции
+            labor_months = {t for (j, t) in self.a if j in self.b_j and t in self.b}
+            for t in result['months']:
+                if t in labor_months:
+                    pi = row_dual[self._resources_rows[t]]
+                    result['shadow_prices']['resources'][t] = 0.0 if abs(pi) < EPS else pi
+            for j in {j for j, _ in active}:
+                pi = row_dual[self._area_rows[j]]
+                result['shadow_prices']['area'][j] = 0.0 if abs(pi) < EPS else pi
+
+            if ranging:
+                shadow_prices = result['shadow_prices']
+                result['ranging'] = highs_ranging(
+                    h, {key: self._cols[key] for key in active}, self.c,
+                    {t: self._resources_rows[t] for t in shadow_prices['resources']},
+                    {j: self._area_rows[j] for j in shadow_prices['area']})
+        return result
+
+
+def plan_harvesting(df_c, df_a, df_b, df_bj, drop_missing=True, msg=False, solver=None, ranging=False,
+                    cache=None):
+    """Полный расчет по таблицам: подготовка данных, модель, решение, результат
+
+    При drop_missing=False и неполных данных возбуждается ValueError.
+    cache - ResultCache: оптимальный результат запоминается по содержимому
+    таблиц и параметрам, повторный расчет тех же данных берется из кэша.
+    """
+    if cache is not None:
+        key = result_key({'income': df_c, 'labor': df_a, 'resources': df_b, 'area': df_bj},
+                         drop_missing=drop_missing, solver=solver, ranging=ranging)
+        result, _ = cache.get_or_compute(
+            key, lambda: plan_harvesting(df_c, df_a, df_b, df_bj, drop_missing, msg, solver, ranging),
+            store=lambda result: result['status'] == 1)
+        return result
+
+    with stage('convert'):
+        c, a, b, b_j = tables_to_dicts(df_c, df_a, df_b, df_bj)
+        missing_data = check_data_completeness(c, a, b, b_j)
+        if missing_data:
+            if not drop_missing:
+                raise ValueError("Обнаружены отсутствующие данные")
+            c, a, b, b_j = remove_problematic_data(c, a, b, b_j, missing_data)
+
+    result = solve_harvesting(c, a, b, b_j, msg=msg, solver=solver, ranging=ranging)
+    result['missing_data'] = missing_data
+    return result
+
+
+# Причины остановки решения до оптимума
+STOP_REASONS = {
+    'time_limit': "исчерпан лимит времени",
+    'cancelled': "расчет отменен",
+}
+
+
+def format_result(result):
+    """Формирует текстовый отчет по результату расчета"""
+    partial = result.get('partial', False)
+    if result['status'] != 1 and not partial:
+        return f"Решение не найдено. Статус: {result['status']}\n"
+
+    if partial:
+        lines = [f"Расчет прерван: {STOP_REASONS[result['stopped']]}.",
+                 "Показан лучший найденный допустимый план (не оптимальный).",
+                 f"Доход плана: {result['objective']:.2f} тыс. руб.", "", "План лесозаготовки:"]
+    else:
+        lines = [f"Максимальный доход: {result['objective']:.2f} тыс. руб.", "", "План лесозаготовки:"]
+
+    found_plan = False
+    for (j, t), harvested_area in sorted(result['plan'].items(), key=lambda item: (item[0][1], item[0][0])):
+        if harvested_area > 0.001:
+            lines.append(f"Месяц {t}, участок {j}: {harvested_area:.2f} га")
+            found_plan = True
+    if not found_plan:
+        lines.append("Нет активных планов заготовки")
+
+    if partial:
+        # Двойственные оценки существуют только у оптимального плана
+        lines.append("")
+        lines.append(f"Решатель: {result['solver']}, время: {result['solve_time']:.3f} с")
+        return "\n".join(lines) + "\n"
+
+    lines.append("")
+    lines.append("=" * 50)
+    lines.append("ДВОЙСТВЕННЫЕ ПЕРЕМЕННЫЕ:")
+    lines.append("")
+
+    # Теневые цены ресурсов (по месяцам)
+    lines.append("Теневые цены ресурсов (по месяцам):")
+    resources = result['shadow_prices']['resources']
+    for t in result['months']:
+        if t in resources:
+            lines.append(f"Месяц {t}: {resources[t]:.4f} тыс. руб./час")
+        else:
+            lines.append(f"Месяц {t}: ограничение не создано")
+
+    # Теневые цены площадей (по участкам)
+    lines.append("")
+    lines.append("Теневые цены площадей (по участкам):")
+    area = result['shadow_prices']['area']
+    for j in result['sites']:
+        if j in area:
+            lines.append(f"Участок {j}: {area[j]:.4f} тыс. руб./га")
+        else:
+            lines.append(f"Участок {j}: ограничение не создано")
+
+    if 'solver' in result:
+        lines.append("")
+        lines.append(f"Решатель: {result['solver']}, время: {result['solve_time']:.3f} с")
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_range(bounds):
+    lower, upper = bounds
+    lower = "-∞" if lower == float('-inf') else f"{lower:.4g}"
+    upper = "+∞" if upper == float('inf') else f"{upper:.4g}"
+    return f"[{lower}; {upper}]"
+
+
+def format_ranging(result):
+    """Формирует текстовый отчет анализа чувствительности (пустая строка, если его нет)"""
+    ranging = result.get('ranging')
+    if not ranging:
+        return ""
+
+    lines = ["", "=" * 50, "АНАЛИЗ ЧУВСТВИТЕЛЬНОСТИ:", "",
+             "Приведенные стоимости и диапазоны, в которых набор заготавливаемых пар не меняется:"]
+    for (j, t), item in sorted(ranging['columns'].items(), key=lambda entry: (entry[0][1], entry[0][0])):
+        line = (f"Месяц {t}, участок {j}: приведенная стоимость {item['reduced_cost']:.4f}, "
+                f"доход {_format_range(item['income'])}")
+        if item['labor'] is not None:
+            line += f", трудозатраты {_format_range(item['labor'])}"
+        lines.append(line)
+
+    lines.append("")
+    lines.append("Диапазоны ресурсов, в которых теневые цены не меняются:")
+    for t, bounds in sorted(ranging['resources'].items()):
+        lines.append(f"Месяц {t}: {_format_range(bounds)} ч")
+
+    lines.append("")
+    lines.append("Диапазоны площадей, в которых теневые цены не меняются:")
+    for j, bounds in sorted(ranging['area'].items()):
+        lines.append(f"Участок {j}: {_format_range(bounds)} га")
+
+    return "\n".join(lines) + "\n"
+
+
+def result_to_json(result):
+    """Преобразует результат в JSON-совместимый словарь (ключи-кортежи в строки)"""
+    data = dict(result)
+    data['plan'] = [
+        {'site': j, 'month': t, 'area': v} for (j, t), v in sorted(result['plan'].items())
+    ]
+    data['shadow_prices'] = {
+        kind: {str(k): v for k, v in prices.items()}
+        for kind, prices in result['shadow_prices'].items()
+    }
+    if 'ranging' in result:
+        # Бесконечные границы диапазонов в JSON записываются как null
+        def bounds(pair):
+            return None if pair is None else [None if abs(v) == float('inf') else v for v in pair]
+        ranging = result['ranging']
+        data['ranging'] = {
+            'columns': [{'site': j, 'month': t, 'reduced_cost': item['reduced_cost'],
+                         'income': bounds(item['income']), 'labor': bounds(item['labor'])}
+                        for (j, t), item in sorted(ranging['columns'].items())],
+            'resources': {str(t): bounds(pair) for t, pair in ranging['resources'].items()},
+            'area': {str(j): bounds(pair) for j, pair in ranging['area'].items()},
+        }
+    if 'missing_data' in result:
+        data['missing_data'] = {k: [list(item) if isinstance(item, tuple) else item for item in v]
+                                for k, v in result['missing_data'].items()}
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Расчет оптимального плана лесозаготовки")
+    parser.add_argument('file', nargs='?', default='lesozagotovka.xlsx', help="Excel файл с данными")
+    parser.add_argument('--strict', action='store_true',
+                        help="завершиться с ошибкой при неполных данных")
+    parser.add_argument('--json', action='store_true', help="вывести результат в формате JSON")
+    parser.add_argument('--msg', action='store_true', help="показывать вывод решателя")
+    parser.add_argument('--matrix', action='store_true',
+                        help="строить модель в матричной форме и решать HiGHS")
+    parser.add_argument('--pricing', action='store_true',
+                        help="матричная форма с генерацией столбцов для очень больших задач (только пары "
+                             "с положительной приведенной стоимостью)")
+    parser.add_argument('--solver', choices=list(SOLVERS),
+                        help="решатель (по умолчанию первый доступный из: " + ", ".join(SOLVER_ORDER) + ")")
+    parser.add_argument('--ranging', action='store_true',
+                        help="анализ чувствительности: приведенные стоимости и диапазоны устойчивости")
+    parser.add_argument('--profile', metavar='TRACE_JSON',
+                        help="замерить этапы расчета и сохранить трассу Chrome в файл")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="каталог кэша результатов: повторный расчет тех же данных берется из него")
+    parser.add_argument('--compare', metavar='FILE',
+                        help="сравнить план с планом по другому файлу данных (какие x[j, t] изменились)")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(disk_dir=args.cache_dir) if args.cache_dir else None
+
+    def plan(file_path):
+        tables = load_tables(file_path)
+        if args.matrix or args.pricing:
+            return plan_harvesting_matrix(tables['income'], tables['labor'], tables['resources'],
+                                          tables['area'], drop_missing=not args.strict, ranging=args.ranging,
+                                          pricing=args.pricing)
+        return plan_harvesting(tables['income'], tables['labor'], tables['resources'], tables['area'],
+                               drop_missing=not args.strict, msg=args.msg, solver=args.solver,
+                               ranging=args.ranging, cache=cache)
+
+    with session(args.profile):
+        try:
+            result = plan(args.file)
+            previous = plan(args.compare) if args.compare else None
+        except (ValueError, RuntimeError) as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return 1
+
+    if previous is not None:
+        diff = diff_plans(previous, result)
+        if args.json:
+            print(json.dumps({
+                'objective': diff['objective'],
+                'changes': [{'site': j, 'month': t, 'old': before, 'new': after}
+                            for (j, t), before, after in diff['changes']],
+            }, ensure_ascii=False, indent=2))
+        else:
+            print(f"Сравнение с {args.compare}:\n" + format_plan_diff(diff), end='')
+    elif args.json:
+        print(json.dumps(result_to_json(result), ensure_ascii=False, indent=2))
+    else:
+        print(format_result(result) + format_ranging(result), end='')
+    return 0 if result['status'] == 1 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,112 @@
+import numpy as np
 import pandas as pd
-from pulp import LpMaximize, LpProblem, LpVariable, lpSum, PULP_CBC_CMD
-import pulp
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
+import queue
+import threading
+import time
+
+import profiling
+from harvesting import HarvestingModel, check_tables_completeness, format_ranging, format_result, format_value
+from result_cache import ResultCache, diff_plans, format_plan_diff, result_key
+from storage import TABLES, TableStore, open_store, import_excel, export_excel
+from tables import KeyedTable
+
+
+class VirtualTable:
+    """Виртуальная таблица на Treeview: виджеты существуют только для видимых строк
+
+    Treeview держит столько элементов, сколько строк помещается в окне, а при
+    прокрутке в них подставляются значения нужного окна таблицы. Перерисовываются
+    только элементы, значения которых изменились.
+    """
+
+    def __init__(self, tree, scrollbar, get_frame, columns):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.get_frame = get_frame  # функция, возвращающая текущий DataFrame
+        self.columns = columns
+        self.offset = 0
+        self.rendered = []  # значения, показанные в элементах окна
+
+        scrollbar.configure(command=self.yview)
+        tree.bind('<Configure>', lambda e: self.render())
+        tree.bind('<MouseWheel>', self.on_wheel)
+        tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll(3))
+
+    def page_size(self):
+        """Сколько строк помещается в окне (одна строка уходит на заголовок)"""
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        height = self.tree.winfo_height()
+        if height <= 1:  # окно еще не показано
+            return int(self.tree.cget('height'))
+        return max(1, height // row_height - 1)
+
+    def scroll(self, rows):
+        self.offset += rows
+        self.render()
+        return "break"
+
+    def on_wheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def yview(self, *args):
+        """Команда полосы прокрутки: moveto <доля> или scroll <n> units|pages"""
+        total = len(self.get_frame())
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            step = self.page_size() if args[2] == 'pages' else 1
+            self.offset += int(args[1]) * step
+        self.render()
+
+    def render(self):
+        """Показывает окно таблицы начиная с self.offset"""
+        df = self.get_frame()
+        total = len(df)
+        size = self.page_size()
+        self.offset = max(0, min(self.offset, total - size))
+        # Ключи - целые, значение (последний столбец) форматируется только для видимых строк
+        window = df.iloc[self.offset:self.offset + size][self.columns].to_numpy().tolist()
+        window = [tuple(int(v) for v in row[:-1]) + (format_value(row[-1]),) for row in window]
+
+        items = list(self.tree.get_children())
+        for item in items[len(window):]:
+            self.tree.delete(item)
+        del self.rendered[len(window):]
+        for k, values in enumerate(window):
+            if k >= len(items):
+                self.tree.insert('', 'end', iid=str(k), values=values)
+                self.rendered.append(values)
+            elif self.rendered[k] != values:
+                self.tree.item(items[k], values=values)
+                self.rendered[k] = values
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + size) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+
+def _table_attribute(name):
+    """Таблица приложения в виде DataFrame; присваивание заменяет содержимое таблицы с ключом"""
+    def getter(self):
+        return self._tables[name].frame
+
+    def setter(self, df):
+        self._tables[name].replace(df)
+
+    return property(getter, setter)
 
 
 class ForestHarvestingApp:
+    df_c = _table_attribute('income')
+    df_a = _table_attribute('labor')
+    df_b = _table_attribute('resources')
+    df_bj = _table_attribute('area')
+
     def __init__(self, root):
         self.root = root
         self.root.title("Оптимизация лесозаготовки")
@@ -26,13 +126,41 @@ class ForestHarvestingApp:
         # Устанавливаем геометрию (размер + позиция)
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
 
+        # Excel файл - только для импорта/экспорта, основное хранилище - SQLite
         self.file_path = "lesozagotovka.xlsx"
+        self.store = TableStore(open_store("lesozagotovka.sqlite"))
         self.is_editing = False
         self.edited_data = {}
         self.current_edit_cell = None
 
-        # Создаем файл если его нет
-        self.create_default_excel()
+        # Таблицы с доступом по ключу (участок, месяц) и отметки об изменениях:
+        # на экране обновляются только измененные таблицы
+        self.changed = set()
+        self.views = {}
+        self.income = KeyedTable(('Участок', 'Месяц'), 'Доход (тыс. руб./га)',
+                                 on_change=lambda: self.changed.add('income'))
+        self.labor = KeyedTable(('Участок', 'Месяц'), 'Трудозатраты (ч/га)',
+                                on_change=lambda: self.changed.add('labor'))
+        self.resources = KeyedTable(('Месяц',), 'Ресурсы (часы)',
+                                    on_change=lambda: self.changed.add('resources'))
+        self.area = KeyedTable(('Участок',), 'Площадь (га)',
+                               on_change=lambda: self.changed.add('area'))
+        self._tables = {'income': self.income, 'labor': self.labor,
+                        'resources': self.resources, 'area': self.area}
+
+        # Постоянная модель для быстрых пересчетов после правок (строится при первом расчете)
+        self.harvesting_model = None
+        # Идущий в рабочем потоке расчет (None - расчета нет)
+        self.solve_job = None
+        # Замер этапов последнего расчета (при включенном "Замер этапов")
+        self.last_profile = None
+        # Оптимальные планы по содержимому таблиц: повторный расчет тех же данных мгновенный.
+        # Два последних показанных плана - для сравнения
+        self.result_cache = ResultCache()
+        self.last_results = []
+
+        # Создаем хранилище если его нет
+        self.create_default_store()
 
         # Загружаем данные
         self.load_data()
@@ -40,9 +168,13 @@ class ForestHarvestingApp:
         # Создаем интерфейс
         self.create_widgets()
 
-    def create_default_excel(self):
-        """Создает файл Excel с данными по умолчанию если его нет"""
-        if not os.path.exists(self.file_path):
+    def create_default_store(self):
+        """Заполняет хранилище данными из Excel файла, а если его нет - данными по умолчанию"""
+        if self.store.exists():
+            return
+        if os.path.exists(self.file_path):
+            self.store.save(import_excel(self.file_path), force=True)
+        else:
             # Данные по умолчанию
             df_c = pd.DataFrame({
                 'Участок': [1, 1, 1, 2, 2, 2],
@@ -66,71 +198,38 @@ class ForestHarvestingApp:
                 'Площадь (га)': [50, 40]
             })
 
-            with pd.ExcelWriter(self.file_path, engine='openpyxl') as writer:
-                df_c.to_excel(writer, sheet_name='Доход', index=False)
-                df_a.to_excel(writer, sheet_name='Труд', index=False)
-                df_b.to_excel(writer, sheet_name='Ресурсы', index=False)
-                df_bj.to_excel(writer, sheet_name='Площадь', index=False)
+            self.store.save({'income': df_c, 'labor': df_a, 'resources': df_b, 'area': df_bj}, force=True)
+
+    def tables(self):
+        """Текущие таблицы по именам хранилища"""
+        return {name: table.frame for name, table in self._tables.items()}
 
     def load_data(self):
-        """Загружает данные из Excel файла"""
+        """Загружает данные из хранилища"""
         try:
-            self.df_c = pd.read_excel(self.file_path, sheet_name="Доход")
-            self.df_a = pd.read_excel(self.file_path, sheet_name="Труд")
-            self.df_b = pd.read_excel(self.file_path, sheet_name="Ресурсы")
-            self.df_bj = pd.read_excel(self.file_path, sheet_name="Площадь")
-
-            # ПРЕОБРАЗУЕМ ДАННЫЕ ДЛЯ ОТОБРАЖЕНИЯ
-            self.df_c['Доход (тыс. руб./га)'] = self.df_c['Доход (тыс. руб./га)'].apply(
-                lambda x: "Не указано" if pd.isna(x) else (int(x) if x == int(x) else round(x, 2))
-            )
-            self.df_a['Трудозатраты (ч/га)'] = self.df_a['Трудозатраты (ч/га)'].apply(
-                lambda x: "Не указано" if pd.isna(x) else (int(x) if x == int(x) else round(x, 2))
-            )
-
-            # УБИРАЕМ ЛИШНИЕ ЗНАКИ ПОСЛЕ ТОЧКИ ДЛЯ ОСТАЛЬНЫХ ТАБЛИЦ
-            self.df_b['Ресурсы (часы)'] = self.df_b['Ресурсы (часы)'].apply(
-                lambda x: int(x) if x == int(x) else round(x, 2)
-            )
-            self.df_bj['Площадь (га)'] = self.df_bj['Площадь (га)'].apply(
-                lambda x: int(x) if x == int(x) else round(x, 2)
-            )
+            tables = self.store.load()
+            # Значения хранятся как float64, отсутствующие - NaN ("Не указано" только на экране);
+            # таблицы с ключом заполняются целиком, без построчных вставок
+            self.df_c = tables['income']
+            self.df_a = tables['labor']
+            self.df_b = tables['resources']
+            self.df_bj = tables['area']
 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {str(e)}")
 
-    def save_data(self):
-        """Сохраняет данные в Excel файл"""
+    def save_data(self, export_path=None):
+        """Сохраняет изменившиеся таблицы в хранилище, при export_path - еще и в Excel файл"""
         try:
-            # ПОДГОТАВЛИВАЕМ ДАННЫЕ НАПРЯМУЮ, БЕЗ СОЗДАНИЯ КОПИЙ
-            # Заменяем "Не указано" на пустые значения для числовых колонок
-            self.df_c['Доход (тыс. руб./га)'] = pd.to_numeric(
-                self.df_c['Доход (тыс. руб./га)'], errors='coerce'
-            )
-            self.df_a['Трудозатраты (ч/га)'] = pd.to_numeric(
-                self.df_a['Трудозатраты (ч/га)'], errors='coerce'
-            )
-
-            # УБИРАЕМ ЛИШНИЕ ЗНАКИ ПОСЛЕ ТОЧКИ - округляем до 2 знаков
-            self.df_c['Доход (тыс. руб./га)'] = self.df_c['Доход (тыс. руб./га)'].round(2)
-            self.df_a['Трудозатраты (ч/га)'] = self.df_a['Трудозатраты (ч/га)'].round(2)
-            self.df_b['Ресурсы (часы)'] = self.df_b['Ресурсы (часы)'].round(2)
-            self.df_bj['Площадь (га)'] = self.df_bj['Площадь (га)'].round(2)
-
-            # Сохраняем данные
-            with pd.ExcelWriter(self.file_path, engine='openpyxl') as writer:
-                self.df_c.to_excel(writer, sheet_name='Доход', index=False)
-                self.df_a.to_excel(writer, sheet_name='Труд', index=False)
-                self.df_b.to_excel(writer, sheet_name='Ресурсы', index=False)
-                self.df_bj.to_excel(writer, sheet_name='Площадь', index=False)
-
-            # ВОССТАНАВЛИВАЕМ "Не указано" ДЛЯ ОТОБРАЖЕНИЯ В ПРИЛОЖЕНИИ
-            self.df_c['Доход (тыс. руб./га)'] = self.df_c['Доход (тыс. руб./га)'].apply(
-                lambda x: "Не указано" if pd.isna(x) else (int(x) if x == int(x) else x)
-            )
-            self.df_a['Трудозатраты (ч/га)'] = self.df_a['Трудозатраты (ч/га)'].apply(
-                lambda x: "Не указано" if pd.isna(x) else (int(x) if x == int(x) else x)
-            )
+            tables = {}
+            for name, table in self._tables.items():
+                # Значения уже числовые (NaN для отсутствующих), только округляем до 2 знаков
+                tables[name] = table.frame.round({table.value_col: 2})
+
+            # Сохраняем данные: перезаписываются только изменившиеся таблицы
+            self.store.save(tables)
+            if export_path:
+                export_excel(tables, export_path)
 
             return True
 
@@ -142,6 +241,10 @@ class ForestHarvestingApp:
 
     def create_widgets(self):
         """Создает элементы интерфейса"""
+        # Строка состояния внизу окна; создается первой, чтобы вкладки не вытеснили ее
+        self.status_bar = ttk.Label(self.root, text="", anchor='w', relief='sunken', padding=(5, 2))
+        self.status_bar.pack(side='bottom', fill='x')
+
         # Основной фрейм с вкладками
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill='both', expand=True, padx=10, pady=10)
@@ -184,7 +287,13 @@ class ForestHarvestingApp:
                    command=self.add_month).pack(side='left', padx=5)
 
         ttk.Button(self.normal_buttons_frame, text="Обновить данные",
-                   command=self.refresh_data).pack(side='left', padx=5)
+                   command=self.reload_data).pack(side='left', padx=5)
+
+        ttk.Button(self.normal_buttons_frame, text="Импорт из Excel",
+                   command=self.import_from_excel).pack(side='left', padx=5)
+
+        ttk.Button(self.normal_buttons_frame, text="Экспорт в Excel",
+                   command=self.export_to_excel).pack(side='left', padx=5)
 
         # Фрейм для кнопок редактирования (изначально скрыт)
         self.edit_buttons_frame = ttk.Frame(control_frame)
@@ -206,9 +315,43 @@ class ForestHarvestingApp:
         # Фрейм для результатов
         self.create_results_tab(result_frame)
 
-        # Кнопка расчета
-        ttk.Button(result_frame, text="Рассчитать оптимальный план",
-                   command=self.calculate).pack(pady=10)
+        # Панель расчета: запуск, лимит времени, ход расчета и отмена
+        calc_frame = ttk.Frame(result_frame)
+        calc_frame.pack(fill='x', padx=10, pady=10)
+
+        self.calc_button = ttk.Button(calc_frame, text="Рассчитать оптимальный план",
+                                      command=self.calculate)
+        self.calc_button.pack(side='left', padx=5)
+
+        ttk.Label(calc_frame, text="Лимит времени (с):").pack(side='left', padx=(15, 5))
+        self.time_limit_var = tk.StringVar(value="")
+        ttk.Entry(calc_frame, textvariable=self.time_limit_var, width=8).pack(side='left')
+
+        self.ranging_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(calc_frame, text="Анализ чувствительности",
+                        variable=self.ranging_var).pack(side='left', padx=(15, 0))
+
+        self.progress = ttk.Progressbar(calc_frame, mode='indeterminate', length=150)
+        self.progress.pack(side='left', padx=15)
+
+        self.stop_button = ttk.Button(calc_frame, text="Отмена", state='disabled',
+                                      command=self.cancel_calculation)
+        self.stop_button.pack(side='left', padx=5)
+
+        self.calc_status = ttk.Label(calc_frame, text="")
+        self.calc_status.pack(side='left', padx=10)
+
+        # Замер этапов расчета: итог в строке состояния, трасса - в файл
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(calc_frame, text="Замер этапов",
+                        variable=self.profile_var).pack(side='left', padx=(15, 0))
+        self.trace_button = ttk.Button(calc_frame, text="Сохранить трассу...", state='disabled',
+                                       command=self.save_trace)
+        self.trace_button.pack(side='left', padx=5)
+
+        self.compare_button = ttk.Button(calc_frame, text="Сравнить с предыдущим", state='disabled',
+                                         command=self.compare_results)
+        self.compare_button.pack(side='left', padx=5)
 
     def create_income_tab(self, parent):
         """Создает вкладку с данными о доходах"""
@@ -225,9 +368,8 @@ class ForestHarvestingApp:
         tree.column('Месяц', width=100)
         tree.column('Доход', width=150)
 
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar управляет окном виртуальной таблицы, а не самим Treeview
+        scrollbar = ttk.Scrollbar(frame, orient='vertical')
 
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -236,6 +378,8 @@ class ForestHarvestingApp:
         tree.bind('<Double-1>', self.on_double_click_income)
 
         self.income_tree = tree
+        self.views['income'] = VirtualTable(tree, scrollbar, lambda: self.df_c,
+                                            ['Участок', 'Месяц', 'Доход (тыс. руб./га)'])
         self.refresh_income_data()
 
     def create_labor_tab(self, parent):
@@ -252,8 +396,7 @@ class ForestHarvestingApp:
         tree.column('Месяц', width=100)
         tree.column('Трудозатраты', width=150)
 
-        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical')
 
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -262,6 +405,8 @@ class ForestHarvestingApp:
         tree.bind('<Double-1>', self.on_double_click_labor)
 
         self.labor_tree = tree
+        self.views['labor'] = VirtualTable(tree, scrollbar, lambda: self.df_a,
+                                           ['Участок', 'Месяц', 'Трудозатраты (ч/га)'])
         self.refresh_labor_data()
 
     def create_resources_tab(self, parent):
@@ -276,8 +421,7 @@ class ForestHarvestingApp:
         tree.column('Месяц', width=100)
         tree.column('Ресурсы', width=150)
 
-        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical')
 
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -286,6 +430,8 @@ class ForestHarvestingApp:
         tree.bind('<Double-1>', self.on_double_click_resources)
 
         self.resources_tree = tree
+        self.views['resources'] = VirtualTable(tree, scrollbar, lambda: self.df_b,
+                                               ['Месяц', 'Ресурсы (часы)'])
         self.refresh_resources_data()
 
     def create_area_tab(self, parent):
@@ -300,8 +446,7 @@ class ForestHarvestingApp:
         tree.column('Участок', width=100)
         tree.column('Площадь', width=150)
 
-        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
-        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(frame, orient='vertical')
 
         tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -310,6 +455,8 @@ class ForestHarvestingApp:
         tree.bind('<Double-1>', self.on_double_click_area)
 
         self.area_tree = tree
+        self.views['area'] = VirtualTable(tree, scrollbar, lambda: self.df_bj,
+                                          ['Участок', 'Площадь (га)'])
         self.refresh_area_data()
 
     def create_results_tab(self, parent):
@@ -327,52 +474,70 @@ class ForestHarvestingApp:
         scrollbar.pack(side='right', fill='y')
 
     def refresh_income_data(self):
-        """Обновляет данные о доходах в treeview"""
-        for item in self.income_tree.get_children():
-            self.income_tree.delete(item)
-
-        for _, row in self.df_c.iterrows():
-            self.income_tree.insert('', 'end', values=(
-                row['Участок'], row['Месяц'], row['Доход (тыс. руб./га)']
-            ))
+        """Обновляет видимые строки данных о доходах в treeview"""
+        self.views['income'].render()
 
     def refresh_labor_data(self):
-        """Обновляет данные о трудозатратах в treeview"""
-        for item in self.labor_tree.get_children():
-            self.labor_tree.delete(item)
-
-        for _, row in self.df_a.iterrows():
-            self.labor_tree.insert('', 'end', values=(
-                row['Участок'], row['Месяц'], row['Трудозатраты (ч/га)']
-            ))
+        """Обновляет видимые строки данных о трудозатратах в treeview"""
+        self.views['labor'].render()
 
     def refresh_resources_data(self):
-        """Обновляет данные о ресурсах в treeview"""
-        for item in self.resources_tree.get_children():
-            self.resources_tree.delete(item)
-
-        for _, row in self.df_b.iterrows():
-            self.resources_tree.insert('', 'end', values=(
-                row['Месяц'], row['Ресурсы (часы)']
-            ))
+        """Обновляет видимые строки данных о ресурсах в treeview"""
+        self.views['resources'].render()
 
     def refresh_area_data(self):
-        """Обновляет данные о площадях в treeview"""
-        for item in self.area_tree.get_children():
-            self.area_tree.delete(item)
-
-        for _, row in self.df_bj.iterrows():
-            self.area_tree.insert('', 'end', values=(
-                row['Участок'], row['Площадь (га)']
-            ))
-
-    def refresh_data(self):
-        """Обновляет все данные"""
+        """Обновляет видимые строки данных о площадях в treeview"""
+        self.views['area'].render()
+
+    def refresh_data(self, *names):
+        """Обновляет на экране измененные таблицы (или перечисленные) без перечитывания хранилища"""
+        names = names or tuple(self.changed)
+        for name in names:
+            self.views[name].render()
+        self.changed.difference_update(names)
+
+    def reload_data(self):
+        """Перечитывает данные из хранилища и сбрасывает постоянную модель"""
+        self.invalidate_model()
         self.load_data()
-        self.refresh_income_data()
-        self.refresh_labor_data()
-        self.refresh_resources_data()
-        self.refresh_area_data()
+        self.refresh_data(*self.views)
+
+    def import_from_excel(self):
+        """Заменяет данные хранилища таблицами из выбранного Excel файла"""
+        file_path = filedialog.askopenfilename(title="Импорт из Excel",
+                                               filetypes=[("Excel", "*.xlsx"), ("Все файлы", "*.*")])
+        if not file_path:
+            return
+        try:
+            self.store.save(import_excel(file_path))
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось импортировать данные: {str(e)}")
+            return
+        self.reload_data()
+        messagebox.showinfo("Успех", "Данные импортированы!")
+
+    def export_to_excel(self):
+        """Сохраняет текущие данные в выбранный Excel файл"""
+        file_path = filedialog.asksaveasfilename(title="Экспорт в Excel", defaultextension=".xlsx",
+                                                 initialfile=os.path.basename(self.file_path),
+                                                 filetypes=[("Excel", "*.xlsx")])
+        if file_path and self.save_data(export_path=file_path):
+            messagebox.showinfo("Успех", f"Данные сохранены в {file_path}")
+
+    def invalidate_model(self):
+        """Сбрасывает постоянную модель, она будет построена заново при расчете"""
+        self.harvesting_model = None
+        if self.solve_job is not None:
+            # Модель идущего расчета уже не соответствует данным и не сохраняется
+            self.solve_job['stale'] = True
+
+    def update_model(self, method, *args):
+        """Передает правку данных в постоянную модель, если она уже построена"""
+        if self.solve_job is not None:
+            # Модель занята рабочим потоком: менять ее нельзя, она строится заново
+            self.invalidate_model()
+        elif self.harvesting_model is not None:
+            getattr(self.harvesting_model, method)(*args)
 
     def start_editing(self):
         """Начинает режим редактирования"""
@@ -419,7 +584,7 @@ class ForestHarvestingApp:
         self.df_b = self.edited_data['resources']
         self.df_bj = self.edited_data['area']
 
-        self.refresh_data()
+        self.reload_data()
         messagebox.showinfo("Отменено", "Изменения отменены!")
 
     # Методы для редактирования ячеек
@@ -495,12 +660,10 @@ class ForestHarvestingApp:
             new_value = entry.get()
             entry.destroy()
 
-            # Обновляем значение в treeview
-            values[col_index] = new_value
-            tree.item(row, values=values)
-
-            # Обновляем значение в DataFrame
-            self.update_dataframe(table_type, row, col_index, new_value)
+            # Обновляем значение в таблице (строка ищется по старому ключу из treeview),
+            # затем перерисовываем измененные строки
+            if self.update_dataframe(table_type, row, col_index, new_value):
+                self.refresh_data()
 
         def cancel_edit(event=None):
             """Отменяет редактирование"""
@@ -511,127 +674,127 @@ class ForestHarvestingApp:
         entry.bind('<FocusOut>', lambda e: save_edit())
 
     def update_dataframe(self, table_type, row_id, col_index, new_value):
-        """Обновляет DataFrame после редактирования ячейки"""
+        """Обновляет таблицу после редактирования ячейки"""
         try:
             if table_type == 'income':
-                df = self.df_c
                 item_values = self.income_tree.item(row_id)['values']
-                old_site = item_values[0]
-                old_month = item_values[1]
+                old_key = (int(item_values[0]), int(item_values[1]))
 
-                # Находим строку в DataFrame
-                mask = (df['Участок'] == old_site) & (df['Месяц'] == old_month)
+                # Строка находится по ключу (участок, месяц)
                 if col_index == 0:  # Участок
                     site_val = int(new_value)
                     if site_val <= 0:
                         messagebox.showerror("Ошибка", "Номер участка должен быть положительным!")
                         return False
-                    df.loc[mask, 'Участок'] = site_val
+                    self.income.rekey(old_key, (site_val, old_key[1]))
+                    self.invalidate_model()
                 elif col_index == 1:  # Месяц
                     month_val = int(new_value)
                     if month_val < 1 or month_val > 12:
                         messagebox.showerror("Ошибка", "Месяц должен быть в диапазоне от 1 до 12!")
                         return False
-                    df.loc[mask, 'Месяц'] = month_val
+                    self.income.rekey(old_key, (old_key[0], month_val))
+                    self.invalidate_model()
                 elif col_index == 2:  # Доход
                     income_val = float(new_value)
                     if income_val < 0:
                         messagebox.showerror("Ошибка", "Доход не может быть отрицательным!")
                         return False
-                    df.loc[mask, 'Доход (тыс. руб./га)'] = income_val
+                    self.income.upsert(old_key, income_val)
+                    self.update_model('set_income', *old_key, income_val)
 
             elif table_type == 'labor':
-                df = self.df_a
                 item_values = self.labor_tree.item(row_id)['values']
-                old_site = item_values[0]
-                old_month = item_values[1]
+                old_key = (int(item_values[0]), int(item_values[1]))
 
-                # Находим строку в DataFrame
-                mask = (df['Участок'] == old_site) & (df['Месяц'] == old_month)
+                # Строка находится по ключу (участок, месяц)
                 if col_index == 0:  # Участок
                     site_val = int(new_value)
                     if site_val <= 0:
                         messagebox.showerror("Ошибка", "Номер участка должен быть положительным!")
                         return False
-                    df.loc[mask, 'Участок'] = site_val
+                    self.labor.rekey(old_key, (site_val, old_key[1]))
+                    self.invalidate_model()
                 elif col_index == 1:  # Месяц
                     month_val = int(new_value)
                     if month_val < 1 or month_val > 12:
                         messagebox.showerror("Ошибка", "Месяц должен быть в диапазоне от 1 до 12!")
                         return False
-                    df.loc[mask, 'Месяц'] = month_val
+                    self.labor.rekey(old_key, (old_key[0], month_val))
+                    self.invalidate_model()
                 elif col_index == 2:  # Трудозатраты
                     labor_val = float(new_value)
                     if labor_val < 0:
                         messagebox.showerror("Ошибка", "Трудозатраты не могут быть отрицательными!")
                         return False
-                    df.loc[mask, 'Трудозатраты (ч/га)'] = labor_val
+                    self.labor.upsert(old_key, labor_val)
+                    self.update_model('set_labor', *old_key, labor_val)
 
             elif table_type == 'resources':
-                df = self.df_b
                 item_values = self.resources_tree.item(row_id)['values']
-                old_month = item_values[0]
+                old_month = int(item_values[0])
 
-                # Находим строку в DataFrame
-                mask = (df['Месяц'] == old_month)
                 if col_index == 0:  # Месяц
                     month_val = int(new_value)
                     if month_val < 1 or month_val > 12:
                         messagebox.showerror("Ошибка", "Месяц должен быть в диапазоне от 1 до 12!")
                         return False
-                    df.loc[mask, 'Месяц'] = month_val
+                    self.resources.rekey((old_month,), (month_val,))
+                    self.invalidate_model()
                 elif col_index == 1:  # Ресурсы
                     resources_val = float(new_value)
                     if resources_val < 0:
                         messagebox.showerror("Ошибка", "Ресурсы не могут быть отрицательными!")
                         return False
-                    df.loc[mask, 'Ресурсы (часы)'] = resources_val
+                    self.resources.upsert((old_month,), resources_val)
+                    self.update_model('set_resources', old_month, resources_val)
 
             elif table_type == 'area':
-                df = self.df_bj
                 item_values = self.area_tree.item(row_id)['values']
-                old_site = item_values[0]
+                old_site = int(item_values[0])
 
-                # Находим строку в DataFrame
-                mask = (df['Участок'] == old_site)
                 if col_index == 0:  # Участок
                     site_val = int(new_value)
                     if site_val <= 0:
                         messagebox.showerror("Ошибка", "Номер участка должен быть положительным!")
                         return False
-                    df.loc[mask, 'Участок'] = site_val
+                    self.area.rekey((old_site,), (site_val,))
+                    self.invalidate_model()
                 elif col_index == 1:  # Площадь
                     area_val = float(new_value)
                     if area_val < 0:
                         messagebox.showerror("Ошибка", "Площадь не может быть отрицательной!")
                         return False
-                    df.loc[mask, 'Площадь (га)'] = area_val
+                    self.area.upsert((old_site,), area_val)
+                    self.update_model('set_area', old_site, area_val)
 
             # ОБНОВЛЯЕМ ОТОБРАЖЕНИЕ ПОСЛЕ УСПЕШНОГО ОБНОВЛЕНИЯ
             return True
 
         except ValueError as e:
             messagebox.showerror("Ошибка", "Введите числовое значение!")
-            self.refresh_data()  # Восстанавливаем исходные данные
+            self.reload_data()  # Восстанавливаем исходные данные
             return False
 
     def remove_related_month_data(self, month):
         """Удаляет все данные, связанные с указанным месяцем"""
+        self.update_model('remove_month', month)
         # Удаляем из таблицы доходов
-        self.df_c = self.df_c[self.df_c['Месяц'] != month]
+        self.income.delete_with('Месяц', month)
         # Удаляем из таблицы трудозатрат
-        self.df_a = self.df_a[self.df_a['Месяц'] != month]
+        self.labor.delete_with('Месяц', month)
         # Удаляем из таблицы ресурсов
-        self.df_b = self.df_b[self.df_b['Месяц'] != month]
+        self.resources.delete((month,))
 
     def remove_related_site_data(self, site):
         """Удаляет все данные, связанные с указанным участком"""
+        self.update_model('remove_site', site)
         # Удаляем из таблицы доходов
-        self.df_c = self.df_c[self.df_c['Участок'] != site]
+        self.income.delete_with('Участок', site)
         # Удаляем из таблицы трудозатрат
-        self.df_a = self.df_a[self.df_a['Участок'] != site]
+        self.labor.delete_with('Участок', site)
         # Удаляем из таблицы площадей
-        self.df_bj = self.df_bj[self.df_bj['Участок'] != site]
+        self.area.delete((site,))
 
     def add_site(self):
         """Добавляет новый участок"""
@@ -644,191 +807,173 @@ class ForestHarvestingApp:
         self.root.wait_window(dialog.dialog)
 
     def calculate(self):
-        """Выполняет расчет оптимального плана"""
+        """Запускает расчет оптимального плана в рабочем потоке
+
+        Окно не блокируется: результат забирается из очереди опросом через
+        root.after. Во время расчета доступна кнопка отмены; при отмене или
+        исчерпании лимита времени выводится лучший найденный план.
+        """
+        if self.solve_job is not None:
+            return
+        try:
+            time_limit = self.time_limit_var.get().strip().replace(',', '.')
+            time_limit = float(time_limit) if time_limit else None
+            if time_limit is not None and time_limit <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Лимит времени должен быть положительным числом секунд")
+            return
+
         try:
-            # Преобразуем данные в словари, пропуская "Не указано"
-            c = {}
-            for _, row in self.df_c.iterrows():
-                # Пропускаем строки с "Не указано"
-                if row["Доход (тыс. руб./га)"] == "Не указано":
-                    continue
-                key = (int(row["Участок"]), int(row["Месяц"]))
-                value = float(row["Доход (тыс. руб./га)"])
-                c[key] = value
-
-            a = {}
-            for _, row in self.df_a.iterrows():
-                # Пропускаем строки с "Не указано"
-                if row["Трудозатраты (ч/га)"] == "Не указано":
-                    continue
-                key = (int(row["Участок"]), int(row["Месяц"]))
-                value = float(row["Трудозатраты (ч/га)"])
-                a[key] = value
-
-            b = {}
-            for _, row in self.df_b.iterrows():
-                key = int(row["Месяц"])
-                value = float(row["Ресурсы (часы)"])
-                b[key] = value
-
-            b_j = {}
-            for _, row in self.df_bj.iterrows():
-                key = int(row["Участок"])
-                value = float(row["Площадь (га)"])
-                b_j[key] = value
-
-            # Проверка полноты данных (теперь будет показывать "Не указано" как отсутствующие данные)
-            missing_data = self.check_data_completeness(c, a, b, b_j)
+            # Проверка полноты данных по маскам NaN на сетке участок x месяц
+            missing_data = check_tables_completeness(self.df_c, self.df_a, self.df_b, self.df_bj)
 
             if missing_data:
                 response = self.ask_about_missing_data(missing_data)
                 if response == "cancel":
                     return
-                elif response == "continue":
-                    # Удаляем проблемные данные
-                    c, a, b, b_j = self.remove_problematic_data(c, a, b, b_j, missing_data)
-
-            # Проверяем, остались ли данные для расчета
-            if not b_j or not b:
-                messagebox.showerror("Ошибка", "Недостаточно данных для расчета!")
-                return
-
-            model = LpProblem("Оптимизация_лесозаготовки", LpMaximize)
-            x = {(j, t): LpVariable(f"x_{j}_{t}", lowBound=0) for j in b_j.keys() for t in b.keys()}
-
-            # Функция цели (пропускаем отсутствующие данные)
-            objective_terms = []
-            for j in b_j.keys():
-                for t in b.keys():
-                    if (j, t) in c and (j, t) in a:
-                        objective_terms.append(c[j, t] * x[j, t])
-
-            if not objective_terms:
-                messagebox.showerror("Ошибка", "Нет данных для расчета целевой функции!")
-                return
-
-            model += lpSum(objective_terms)
-
-            # Ограничения по трудовым ресурсам с явными именами
-            for t in b.keys():
-                labor_terms = []
-                for j in b_j.keys():
-                    if (j, t) in a:
-                        labor_terms.append(a[j, t] * x[j, t])
-                if labor_terms:
-                    model += lpSum(labor_terms) <= b[t], f"Ресурсы_месяц_{t}"
-
-            # Ограничения по площади участков с явными именами
-            for j in b_j.keys():
-                area_terms = []
-                for t in b.keys():
-                    if (j, t) in c and (j, t) in a:
-                        area_terms.append(x[j, t])
-                if area_terms:
-                    model += lpSum(area_terms) <= b_j[j], f"Площадь_участок_{j}"
-
-            # РЕШАЕМ СИМПЛЕКС-МЕТОДОМ
-            # Попробуем разные решатели, которые поддерживают симплекс-метод
-            try:
-                # Первый вариант: используем GLPK если установлен
-                model.solve(pulp.GLPK(msg=True, options=["--simplex"]))
-            except:
-                try:
-                    # Второй вариант: используем COIN с симплекс-методом
-                    model.solve(PULP_CBC_CMD(msg=True, options=["simplex"]))
-                except:
-                    # Третий вариант: стандартный решатель (часто использует симплекс)
-                    model.solve(PULP_CBC_CMD(msg=True))
-
-            # Вывод результатов
-            self.result_text.delete(1.0, tk.END)
-
-            if model.status == 1:
-                self.result_text.insert(tk.END, f"Максимальный доход: {model.objective.value():.2f} тыс. руб.\n\n")
-                self.result_text.insert(tk.END, "План лесозаготовки:\n")
-
-                found_plan = False
-                for t in sorted(b.keys()):
-                    for j in sorted(b_j.keys()):
-                        if (j, t) in c and (j, t) in a:
-                            harvested_area = x[j, t].value()
-                            if harvested_area and harvested_area > 0.001:
-                                self.result_text.insert(tk.END, f"Месяц {t}, участок {j}: {harvested_area:.2f} га\n")
-                                found_plan = True
-
-                if not found_plan:
-                    self.result_text.insert(tk.END, "Нет активных планов заготовки\n")
-
-                # ВЫВОД ДВОЙСТВЕННЫХ ПЕРЕМЕННЫХ
-                self.result_text.insert(tk.END, "\n" + "=" * 50 + "\n")
-                self.result_text.insert(tk.END, "ДВОЙСТВЕННЫЕ ПЕРЕМЕННЫЕ:\n\n")
-
-                # Теневые цены ресурсов (по месяцам)
-                self.result_text.insert(tk.END, "Теневые цены ресурсов (по месяцам):\n")
-                for t in sorted(b.keys()):
-                    constraint_name = f"Ресурсы_месяц_{t}"
-                    if constraint_name in model.constraints:
-                        shadow_price = model.constraints[constraint_name].pi
-                        if shadow_price is not None:
-                            if abs(shadow_price) < 0.0001:  # Если значение очень близко к нулю
-                                shadow_price = 0.0
-                            self.result_text.insert(tk.END, f"Месяц {t}: {shadow_price:.4f} тыс. руб./час\n")
-                        else:
-                            self.result_text.insert(tk.END, f"Месяц {t}: 0.0000 тыс. руб./час\n")
-                    else:
-                        self.result_text.insert(tk.END, f"Месяц {t}: ограничение не создано\n")
-
-                # Теневые цены площадей (по участкам)
-                self.result_text.insert(tk.END, "\nТеневые цены площадей (по участкам):\n")
-                for j in sorted(b_j.keys()):
-                    constraint_name = f"Площадь_участок_{j}"
-                    if constraint_name in model.constraints:
-                        shadow_price = model.constraints[constraint_name].pi
-                        if shadow_price is not None:
-                            if abs(shadow_price) < 0.0001:  # Если значение очень близко к нулю
-                                shadow_price = 0.0
-                            self.result_text.insert(tk.END, f"Участок {j}: {shadow_price:.4f} тыс. руб./га\n")
-                        else:
-                            self.result_text.insert(tk.END, f"Участок {j}: 0.0000 тыс. руб./га\n")
-                    else:
-                        self.result_text.insert(tk.END, f"Участок {j}: ограничение не создано\n")
-
-            else:
-                self.result_text.insert(tk.END, f"Решение не найдено. Статус: {model.status}\n")
-
+                # При продолжении пары без дохода или трудозатрат в модель не входят
         except Exception as e:
             messagebox.showerror("Ошибка расчета", f"Произошла ошибка при расчете: {str(e)}")
+            return
 
-
-    def check_data_completeness(self, c, a, b, b_j):
-        """Проверяет полноту данных и возвращает список отсутствующих данных"""
-        missing_data = {
-            'income': [],  # Отсутствующие доходы
-            'labor': [],  # Отсутствующие трудозатраты
-            'resources': [],  # Отсутствующие ресурсы
-            'area': []  # Отсутствующие площади
+        # Профилировщик включается на время расчета: этапы в рабочем потоке пишутся в него же
+        profiler = profiling.enable() if self.profile_var.get() else None
+        self.status_bar.config(text="Замер этапов..." if profiler is not None else "")
+
+        # Модель строится один раз (в рабочем потоке), дальше правки передаются в нее как изменения.
+        # Потоку передаются текущие DataFrame: правки таблиц создают новые, а эти не меняются
+        with profiling.stage('load'):
+            tables = self.tables()
+        key = result_key(tables, ranging=self.ranging_var.get())
+        result = self.result_cache.get(key)
+        if result is not None:
+            if profiler is not None:
+                profiling.disable()
+                self.last_profile = profiler
+                self.status_bar.config(text=f"Этапы расчета: {profiler.summary()}")
+                self.trace_button.config(state='normal')
+            self.calc_status.config(text="Готово (из кэша)")
+            self.show_result(result)
+            return
+        self.solve_job = {
+            'model': self.harvesting_model,
+            'tables': tables if self.harvesting_model is None else None,
+            'key': key,
+            'profiler': profiler,
+            'time_limit': time_limit,
+            'ranging': self.ranging_var.get(),
+            'queue': queue.Queue(),
+            'cancelled': threading.Event(),
+            'stale': False,
+            'start': time.perf_counter(),
         }
+        threading.Thread(target=self._solve_worker, args=(self.solve_job,), daemon=True).start()
 
-        # Проверяем все возможные комбинации участков и месяцев
-        for site in b_j.keys():
-            for month in b.keys():
-                # Проверяем доходы
-                if (site, month) not in c:
-                    missing_data['income'].append((site, month))
+        self.calc_button.config(state='disabled')
+        self.stop_button.config(state='normal')
+        self.progress.start(10)
+        self.calc_status.config(text="Расчет...")
+        self.root.after(100, self._poll_calculation)
 
-                # Проверяем трудозатраты
-                if (site, month) not in a:
-                    missing_data['labor'].append((site, month))
+    @staticmethod
+    def _solve_worker(job):
+        """Строит (при необходимости) и решает модель; выполняется в рабочем потоке"""
+        try:
+            model = job['model']
+            if model is None:
+                model = HarvestingModel.from_tables(*(job['tables'][name] for name in TABLES))
+                job['model'] = model
+            if job['cancelled'].is_set():
+                # Отмена во время построения модели: решение прервется сразу после начала
+                model.cancel()
+            job['queue'].put(('result', model.solve(msg=True, time_limit=job['time_limit'],
+                                                    ranging=job['ranging'])))
+        except Exception as e:
+            job['queue'].put(('error', e))
 
-        # Проверяем ресурсы для месяцев
-        for site in b_j.keys():
-            if site not in b_j:
-                missing_data['area'].append(site)
+    def _poll_calculation(self):
+        """Проверяет, закончился ли расчет; пока нет - обновляет время и ждет дальше"""
+        job = self.solve_job
+        try:
+            kind, value = job['queue'].get_nowait()
+        except queue.Empty:
+            elapsed = time.perf_counter() - job['start']
+            text = "Отмена..." if job['cancelled'].is_set() else "Расчет..."
+            self.calc_status.config(text=f"{text} {elapsed:.1f} с")
+            self.root.after(100, self._poll_calculation)
+            return
 
-        # Убираем пустые категории
-        missing_data = {k: v for k, v in missing_data.items() if v}
+        self.solve_job = None
+        self.progress.stop()
+        self.calc_button.config(state='normal')
+        self.stop_button.config(state='disabled')
+        self.calc_status.config(text=f"Готово за {time.perf_counter() - job['start']:.1f} с")
+        if job['profiler'] is not None:
+            profiling.disable()
+            self.last_profile = job['profiler']
+            self.status_bar.config(text=f"Этапы расчета: {self.last_profile.summary()}")
+            self.trace_button.config(state='normal')
+
+        # Построенная в потоке модель сохраняется для следующих расчетов, если данные не менялись
+        if not job['stale']:
+            self.harvesting_model = job['model']
+
+        if kind == 'error':
+            if isinstance(value, ValueError):
+                messagebox.showerror("Ошибка", str(value))
+            else:
+                messagebox.showerror("Ошибка расчета", f"Произошла ошибка при расчете: {str(value)}")
+            return
+        if job['cancelled'].is_set() and not value.get('partial'):
+            # Решатель без поддержки отмены дорабатывает, но его результат не показывается
+            self.calc_status.config(text="Расчет отменен")
+            return
 
-        return missing_data
+        # В кэш попадает только оптимальный план, найденный по неизменным с начала расчета данным
+        if value['status'] == 1 and not value.get('partial') and not job['stale']:
+            self.result_cache.put(job['key'], value)
+        self.show_result(value)
+
+    def show_result(self, result):
+        """Выводит результат расчета и запоминает его для сравнения с предыдущим"""
+        self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, format_result(result) + format_ranging(result))
+        self.last_results = (self.last_results + [result])[-2:]
+        self.compare_button.config(state='normal' if len(self.last_results) == 2 else 'disabled')
+
+    def compare_results(self):
+        """Дописывает к результату, какие площади x[j, t] изменились по сравнению с предыдущим расчетом"""
+        if len(self.last_results) < 2:
+            return
+        previous, current = self.last_results
+        self.result_text.insert(tk.END, "\nСравнение с предыдущим расчетом:\n"
+                                + format_plan_diff(diff_plans(previous, current)))
+        self.result_text.see(tk.END)
+
+    def cancel_calculation(self):
+        """Прерывает идущий расчет; будет показан лучший найденный к этому моменту план"""
+        job = self.solve_job
+        if job is None or not job['queue'].empty():
+            return
+        job['cancelled'].set()
+        if job['model'] is not None:
+            job['model'].cancel()
+        self.stop_button.config(state='disabled')
+
+    def save_trace(self):
+        """Сохраняет замер этапов последнего расчета как трассу Chrome (chrome://tracing)"""
+        if self.last_profile is None:
+            return
+        file_path = filedialog.asksaveasfilename(title="Сохранить трассу", defaultextension=".json",
+                                                 initialfile="trace.json",
+                                                 filetypes=[("Трасса Chrome", "*.json")])
+        if not file_path:
+            return
+        try:
+            self.last_profile.save_trace(file_path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить трассу: {str(e)}")
 
     def ask_about_missing_data(self, missing_data):
         """Спрашивает пользователя как поступить с отсутствующими данными"""
@@ -905,45 +1050,6 @@ class ForestHarvestingApp:
 
         return result.get()
 
-    def remove_problematic_data(self, c, a, b, b_j, missing_data):
-        """Удаляет проблемные данные из словарей"""
-        # Удаляем отсутствующие доходы и трудозатраты
-        for site, month in missing_data.get('income', []):
-            if (site, month) in c:
-                del c[(site, month)]
-
-        for site, month in missing_data.get('labor', []):
-            if (site, month) in a:
-                del a[(site, month)]
-
-        # Удаляем участки без площади
-        for site in missing_data.get('area', []):
-            if site in b_j:
-                del b_j[site]
-                # Также удаляем все связанные данные
-                keys_to_remove = [key for key in c.keys() if key[0] == site]
-                for key in keys_to_remove:
-                    del c[key]
-
-                keys_to_remove = [key for key in a.keys() if key[0] == site]
-                for key in keys_to_remove:
-                    del a[key]
-
-        # Удаляем месяцы без ресурсов
-        for month in missing_data.get('resources', []):
-            if month in b:
-                del b[month]
-                # Также удаляем все связанные данные
-                keys_to_remove = [key for key in c.keys() if key[1] == month]
-                for key in keys_to_remove:
-                    del c[key]
-
-                keys_to_remove = [key for key in a.keys() if key[1] == month]
-                for key in keys_to_remove:
-                    del a[key]
-
-        return c, a, b, b_j
-
 
 class EditMonthDialog:
     def __init__(self, parent, app, month):
@@ -978,9 +1084,9 @@ class EditMonthDialog:
         self.resources_entry.pack(side='right', fill='x', expand=True)
 
         # Загружаем текущие ресурсы
-        current_resources = self.app.df_b[self.app.df_b['Месяц'] == month]['Ресурсы (часы)'].values
-        if len(current_resources) > 0:
-            self.resources_entry.insert(0, str(current_resources[0]))
+        current_resources = self.app.resources.get((month,))
+        if current_resources is not None:
+            self.resources_entry.insert(0, str(format_value(current_resources)))
 
         # Таблица трудозатрат по участкам
         ttk.Label(main_frame, text="Трудозатраты по участкам:",
@@ -1055,12 +1161,10 @@ class EditMonthDialog:
         labor_container = ttk.Frame(self.labor_content_frame)
         labor_container.pack(fill='x')
 
-        # Загружаем данные для этого месяца
-        month_labor_data = self.app.df_a[self.app.df_a['Месяц'] == self.month]
         self.labor_entries = {}
 
         # Получаем все участки
-        all_sites = self.app.df_bj['Участок'].unique()
+        all_sites = [site for (site,) in self.app.area.keys()]
 
         for site in all_sites:
             site = int(site)
@@ -1072,12 +1176,10 @@ class EditMonthDialog:
             labor_entry = ttk.Entry(row_frame, width=20, font=('Arial', 10))
             labor_entry.pack(side='left')
 
-            # Загружаем текущее значение
-            site_data = month_labor_data[month_labor_data['Участок'] == site]
-            if len(site_data) > 0:
-                labor_value = site_data['Трудозатраты (ч/га)'].values[0]
-                if labor_value != "Не указано":
-                    labor_entry.insert(0, str(labor_value))
+            # Загружаем текущее значение по ключу (участок, месяц)
+            labor_value = self.app.labor.get((site, self.month))
+            if labor_value is not None and not np.isnan(labor_value):
+                labor_entry.insert(0, str(format_value(labor_value)))
 
             self.labor_entries[site] = labor_entry
 
@@ -1123,12 +1225,10 @@ class EditMonthDialog:
         income_container = ttk.Frame(self.income_content_frame)
         income_container.pack(fill='x')
 
-        # Загружаем данные для этого месяца
-        month_income_data = self.app.df_c[self.app.df_c['Месяц'] == self.month]
         self.income_entries = {}
 
         # Получаем все участки
-        all_sites = self.app.df_bj['Участок'].unique()
+        all_sites = [site for (site,) in self.app.area.keys()]
 
         for site in all_sites:
             site = int(site)
@@ -1140,12 +1240,10 @@ class EditMonthDialog:
             income_entry = ttk.Entry(row_frame, width=20, font=('Arial', 10))
             income_entry.pack(side='left')
 
-            # Загружаем текущее значение
-            site_data = month_income_data[month_income_data['Участок'] == site]
-            if len(site_data) > 0:
-                income_value = site_data['Доход (тыс. руб./га)'].values[0]
-                if income_value != "Не указано":
-                    income_entry.insert(0, str(income_value))
+            # Загружаем текущее значение по ключу (участок, месяц)
+            income_value = self.app.income.get((site, self.month))
+            if income_value is not None and not np.isnan(income_value):
+                income_entry.insert(0, str(format_value(income_value)))
 
             self.income_entries[site] = income_entry
 
@@ -1178,58 +1276,37 @@ class EditMonthDialog:
             # Сохраняем ресурсы
             if self.resources_entry.get():
                 resources = float(self.resources_entry.get())
-                # Проверяем, существует ли уже запись для этого месяца
-                if self.month in self.app.df_b['Месяц'].values:
-                    self.app.df_b.loc[self.app.df_b['Месяц'] == self.month, 'Ресурсы (часы)'] = resources
-                else:
-                    # Создаем новую запись
-                    new_resource = pd.DataFrame({
-                        'Месяц': [self.month],
-                        'Ресурсы (часы)': [resources]
-                    })
-                    self.app.df_b = pd.concat([self.app.df_b, new_resource], ignore_index=True)
+                # Запись месяца заменяется или создается
+                self.app.resources.upsert((self.month,), resources)
+                self.app.update_model('set_resources', self.month, resources)
 
             # Сохраняем трудозатраты
+            # Новые и измененные значения записываются одним пакетом
+            rows = []
             for site, entry in self.labor_entries.items():
                 if entry.get():
                     labor = float(entry.get())
-                    mask = (self.app.df_a['Участок'] == site) & (self.app.df_a['Месяц'] == self.month)
-                    if mask.any():
-                        self.app.df_a.loc[mask, 'Трудозатраты (ч/га)'] = labor
-                    else:
-                        # Создаем новую запись
-                        new_labor = pd.DataFrame({
-                            'Участок': [site],
-                            'Месяц': [self.month],
-                            'Трудозатраты (ч/га)': [labor]
-                        })
-                        self.app.df_a = pd.concat([self.app.df_a, new_labor], ignore_index=True)
+                    self.app.update_model('set_labor', site, self.month, labor)
+                    rows.append(((site, self.month), labor))
                 else:
                     # Если поле пустое, удаляем запись если она существует
-                    mask = (self.app.df_a['Участок'] == site) & (self.app.df_a['Месяц'] == self.month)
-                    if mask.any():
-                        self.app.df_a = self.app.df_a[~mask]
+                    self.app.update_model('set_labor', site, self.month, None)
+                    self.app.labor.delete((site, self.month))
+            self.app.labor.update(rows)
 
             # Сохраняем доходы
+            # Новые и измененные значения записываются одним пакетом
+            rows = []
             for site, entry in self.income_entries.items():
                 if entry.get():
                     income = float(entry.get())
-                    mask = (self.app.df_c['Участок'] == site) & (self.app.df_c['Месяц'] == self.month)
-                    if mask.any():
-                        self.app.df_c.loc[mask, 'Доход (тыс. руб./га)'] = income
-                    else:
-                        # Создаем новую запись
-                        new_income = pd.DataFrame({
-                            'Участок': [site],
-                            'Месяц': [self.month],
-                            'Доход (тыс. руб./га)': [income]
-                        })
-                        self.app.df_c = pd.concat([self.app.df_c, new_income], ignore_index=True)
+                    self.app.update_model('set_income', site, self.month, income)
+                    rows.append(((site, self.month), income))
                 else:
                     # Если поле пустое, удаляем запись если она существует
-                    mask = (self.app.df_c['Участок'] == site) & (self.app.df_c['Месяц'] == self.month)
-                    if mask.any():
-                        self.app.df_c = self.app.df_c[~mask]
+                    self.app.update_model('set_income', site, self.month, None)
+                    self.app.income.delete((site, self.month))
+            self.app.income.update(rows)
 
             if self.app.save_data():
                 self.app.refresh_data()
@@ -1285,9 +1362,9 @@ class EditSiteDialog:
         self.area_entry.pack(side='right', fill='x', expand=True)
 
         # Загружаем текущую площадь
-        current_area = self.app.df_bj[self.app.df_bj['Участок'] == site]['Площадь (га)'].values
-        if len(current_area) > 0:
-            self.area_entry.insert(0, str(current_area[0]))
+        current_area = self.app.area.get((site,))
+        if current_area is not None:
+            self.area_entry.insert(0, str(format_value(current_area)))
 
         # Таблица доходов по месяцам
         ttk.Label(main_frame, text="Доходы по месяцам:",
@@ -1362,12 +1439,10 @@ class EditSiteDialog:
         income_container = ttk.Frame(self.income_content_frame)
         income_container.pack(fill='x')
 
-        # Загружаем данные для этого участка
-        site_income_data = self.app.df_c[self.app.df_c['Участок'] == self.site]
         self.income_entries = {}
 
         # Получаем все месяцы
-        all_months = self.app.df_b['Месяц'].unique()
+        all_months = [month for (month,) in self.app.resources.keys()]
 
         for month in all_months:
             month = int(month)
@@ -1379,12 +1454,10 @@ class EditSiteDialog:
             income_entry = ttk.Entry(row_frame, width=20, font=('Arial', 10))
             income_entry.pack(side='left')
 
-            # Загружаем текущее значение
-            month_data = site_income_data[site_income_data['Месяц'] == month]
-            if len(month_data) > 0:
-                income_value = month_data['Доход (тыс. руб./га)'].values[0]
-                if income_value != "Не указано":
-                    income_entry.insert(0, str(income_value))
+            # Загружаем текущее значение по ключу (участок, месяц)
+            income_value = self.app.income.get((self.site, month))
+            if income_value is not None and not np.isnan(income_value):
+                income_entry.insert(0, str(format_value(income_value)))
 
             self.income_entries[month] = income_entry
 
@@ -1430,12 +1503,10 @@ class EditSiteDialog:
         labor_container = ttk.Frame(self.labor_content_frame)
         labor_container.pack(fill='x')
 
-        # Загружаем данные для этого участка
-        site_labor_data = self.app.df_a[self.app.df_a['Участок'] == self.site]
         self.labor_entries = {}
 
         # Получаем все месяцы
-        all_months = self.app.df_b['Месяц'].unique()
+        all_months = [month for (month,) in self.app.resources.keys()]
 
         for month in all_months:
             month = int(month)
@@ -1447,12 +1518,10 @@ class EditSiteDialog:
             labor_entry = ttk.Entry(row_frame, width=20, font=('Arial', 10))
             labor_entry.pack(side='left')
 
-            # Загружаем текущее значение
-            month_data = site_labor_data[site_labor_data['Месяц'] == month]
-            if len(month_data) > 0:
-                labor_value = month_data['Трудозатраты (ч/га)'].values[0]
-                if labor_value != "Не указано":
-                    labor_entry.insert(0, str(labor_value))
+            # Загружаем текущее значение по ключу (участок, месяц)
+            labor_value = self.app.labor.get((self.site, month))
+            if labor_value is not None and not np.isnan(labor_value):
+                labor_entry.insert(0, str(format_value(labor_value)))
 
             self.labor_entries[month] = labor_entry
 
@@ -1484,58 +1553,37 @@ class EditSiteDialog:
             # Сохраняем площадь
             if self.area_entry.get():
                 area = float(self.area_entry.get())
-                # Проверяем, существует ли уже запись для этого участка
-                if self.site in self.app.df_bj['Участок'].values:
-                    self.app.df_bj.loc[self.app.df_bj['Участок'] == self.site, 'Площадь (га)'] = area
-                else:
-                    # Создаем новую запись
-                    new_area = pd.DataFrame({
-                        'Участок': [self.site],
-                        'Площадь (га)': [area]
-                    })
-                    self.app.df_bj = pd.concat([self.app.df_bj, new_area], ignore_index=True)
+                # Запись участка заменяется или создается
+                self.app.area.upsert((self.site,), area)
+                self.app.update_model('set_area', self.site, area)
 
             # Сохраняем доходы
+            # Новые и измененные значения записываются одним пакетом
+            rows = []
             for month, entry in self.income_entries.items():
                 if entry.get():
                     income = float(entry.get())
-                    mask = (self.app.df_c['Участок'] == self.site) & (self.app.df_c['Месяц'] == month)
-                    if mask.any():
-                        self.app.df_c.loc[mask, 'Доход (тыс. руб./га)'] = income
-                    else:
-                        # Создаем новую запись
-                        new_income = pd.DataFrame({
-                            'Участок': [self.site],
-                            'Месяц': [month],
-                            'Доход (тыс. руб./га)': [income]
-                        })
-                        self.app.df_c = pd.concat([self.app.df_c, new_income], ignore_index=True)
+                    self.app.update_model('set_income', self.site, month, income)
+                    rows.append(((self.site, month), income))
                 else:
                     # Если поле пустое, удаляем запись если она существует
-                    mask = (self.app.df_c['Участок'] == self.site) & (self.app.df_c['Месяц'] == month)
-                    if mask.any():
-                        self.app.df_c = self.app.df_c[~mask]
+                    self.app.update_model('set_income', self.site, month, None)
+                    self.app.income.delete((self.site, month))
+            self.app.income.update(rows)
 
             # Сохраняем трудозатраты
+            # Новые и измененные значения записываются одним пакетом
+            rows = []
             for month, entry in self.labor_entries.items():
                 if entry.get():
                     labor = float(entry.get())
-                    mask = (self.app.df_a['Участок'] == self.site) & (self.app.df_a['Месяц'] == month)
-                    if mask.any():
-                        self.app.df_a.loc[mask, 'Трудозатраты (ч/га)'] = labor
-                    else:
-                        # Создаем новую запись
-                        new_labor = pd.DataFrame({
-                            'Участок': [self.site],
-                            'Месяц': [month],
-                            'Трудозатраты (ч/га)': [labor]
-                        })
-                        self.app.df_a = pd.concat([self.app.df_a, new_labor], ignore_index=True)
+                    self.app.update_model('set_labor', self.site, month, labor)
+                    rows.append(((self.site, month), labor))
                 else:
                     # Если поле пустое, удаляем запись если она существует
-                    mask = (self.app.df_a['Участок'] == self.site) & (self.app.df_a['Месяц'] == month)
-                    if mask.any():
-                        self.app.df_a = self.app.df_a[~mask]
+                    self.app.update_model('set_labor', self.site, month, None)
+                    self.app.labor.delete((self.site, month))
+            self.app.labor.update(rows)
 
             if self.app.save_data():
                 self.app.refresh_data()
@@ -1726,18 +1774,12 @@ class AddSiteDialog:
                 return
 
             # Проверяем, существует ли уже участок
-            if site in self.app.df_bj['Участок'].values:
+            if (site,) in self.app.area:
                 messagebox.showerror("Ошибка", f"Участок {site} уже существует!")
                 return
 
-            # Добавляем в таблицу площадей с явным указанием типов
-            new_area = pd.DataFrame({
-                'Участок': [int(site)],  # Явно преобразуем в int
-                'Площадь (га)': [float(area)]  # Явно преобразуем в float
-            })
-            self.app.df_bj = pd.concat([self.app.df_bj, new_area], ignore_index=True)
-
-            # Добавляем доходы с явным указанием типов
+            # Доходы собираются в пакет и добавляются после всех проверок
+            income_rows = []
             for month_entry, income_entry, _ in self.income_entries:
                 if month_entry.get() and income_entry.get():
                     month = int(month_entry.get())
@@ -1752,36 +1794,24 @@ class AddSiteDialog:
                         messagebox.showerror("Ошибка", "Доход не может быть отрицательным!")
                         return
 
-                    new_income = pd.DataFrame({
-                        'Участок': [int(site)],  # Явно преобразуем в int
-                        'Месяц': [int(month)],  # Явно преобразуем в int
-                        'Доход (тыс. руб./га)': [float(income)]  # Явно преобразуем в float
-                    })
-                    self.app.df_c = pd.concat([self.app.df_c, new_income], ignore_index=True)
-
-            months = [int(m) for m in self.app.df_b['Месяц'].unique()]  # Преобразуем месяцы
-
-            # ДОБАВЛЯЕМ ДОХОДЫ "Не указано" для всех месяцев, которые не были указаны
-            specified_months = [int(month_entry.get()) for month_entry, income_entry, _ in self.income_entries
-                                if month_entry.get() and income_entry.get()]
-
-            for month in months:
-                if month not in specified_months:
-                    new_income = pd.DataFrame({
-                        'Участок': [int(site)],  # Явно преобразуем в int
-                        'Месяц': [int(month)],  # Явно преобразуем в int
-                        'Доход (тыс. руб./га)': ["Не указано"]  # Вместо числа - строка
-                    })
-                    self.app.df_c = pd.concat([self.app.df_c, new_income], ignore_index=True)
-
-            # Добавляем трудозатраты как "Не указано" для всех месяцев
-            for month in months:
-                new_labor = pd.DataFrame({
-                    'Участок': [int(site)],  # Явно преобразуем в int
-                    'Месяц': [int(month)],  # Явно преобразуем в int
-                    'Трудозатраты (ч/га)': ["Не указано"]  # Вместо числа - строка
-                })
-                self.app.df_a = pd.concat([self.app.df_a, new_labor], ignore_index=True)
+                    income_rows.append(((site, month), float(income)))
+
+            # Добавляем в таблицу площадей
+            self.app.area.upsert((site,), float(area))
+            self.app.update_model('set_area', site, area)
+
+            months = [month for (month,) in self.app.resources.keys()]
+
+            for (_, month), income in income_rows:
+                self.app.update_model('set_income', site, month, income)
+
+            # ДОБАВЛЯЕМ ДОХОДЫ "Не указано" (NaN) для всех месяцев, которые не были указаны
+            specified_months = {month for (_, month), _ in income_rows}
+            income_rows += [((site, month), np.nan) for month in months if month not in specified_months]
+            self.app.income.update(income_rows)
+
+            # Добавляем трудозатраты как "Не указано" (NaN) для всех месяцев
+            self.app.labor.update(((site, month), np.nan) for month in months)
 
             if self.app.save_data():
                 self.app.refresh_data()
@@ -1984,18 +2014,12 @@ class AddMonthDialog:
                 return
 
             # Проверяем, существует ли уже месяц
-            if month in self.app.df_b['Месяц'].values:
+            if (month,) in self.app.resources:
                 messagebox.showerror("Ошибка", f"Месяц {month} уже существует!")
                 return
 
-            # Добавляем в таблицу ресурсов с явным указанием типов
-            new_resources = pd.DataFrame({
-                'Месяц': [int(month)],  # Явно преобразуем в int
-                'Ресурсы (часы)': [float(resources)]  # Явно преобразуем в float
-            })
-            self.app.df_b = pd.concat([self.app.df_b, new_resources], ignore_index=True)
-
-            # Добавляем трудозатраты с явным указанием типов
+            # Трудозатраты собираются в пакет и добавляются после всех проверок
+            labor_rows = []
             for site_entry, labor_entry, _ in self.labor_entries:
                 if site_entry.get() and labor_entry.get():
                     site = int(site_entry.get())
@@ -2011,36 +2035,24 @@ class AddMonthDialog:
                         messagebox.showerror("Ошибка", "Трудозатраты не могут быть отрицательными!")
                         return
 
-                    new_labor = pd.DataFrame({
-                        'Участок': [int(site)],  # Явно преобразуем в int
-                        'Месяц': [int(month)],  # Явно преобразуем в int
-                        'Трудозатраты (ч/га)': [float(labor)]  # Явно преобразуем в float
-                    })
-                    self.app.df_a = pd.concat([self.app.df_a, new_labor], ignore_index=True)
-
-            sites = [int(s) for s in self.app.df_bj['Участок'].unique()]  # Преобразуем участки
-
-            # ДОБАВЛЯЕМ ТРУДОЗАТРАТЫ "Не указано" для всех участков, которые не были указаны
-            specified_sites = [int(site_entry.get()) for site_entry, labor_entry, _ in self.labor_entries
-                               if site_entry.get() and labor_entry.get()]
-
-            for site in sites:
-                if site not in specified_sites:
-                    new_labor = pd.DataFrame({
-                        'Участок': [int(site)],  # Явно преобразуем в int
-                        'Месяц': [int(month)],  # Явно преобразуем в int
-                        'Трудозатраты (ч/га)': ["Не указано"]  # Вместо числа - строка
-                    })
-                    self.app.df_a = pd.concat([self.app.df_a, new_labor], ignore_index=True)
-
-            # Добавляем доходы как "Не указано" для всех участков
-            for site in sites:
-                new_income = pd.DataFrame({
-                    'Участок': [int(site)],  # Явно преобразуем в int
-                    'Месяц': [int(month)],  # Явно преобразуем в int
-                    'Доход (тыс. руб./га)': ["Не указано"]  # Вместо числа - строка
-                })
-                self.app.df_c = pd.concat([self.app.df_c, new_income], ignore_index=True)
+                    labor_rows.append(((site, month), float(labor)))
+
+            # Добавляем в таблицу ресурсов
+            self.app.resources.upsert((month,), float(resources))
+            self.app.update_model('set_resources', month, resources)
+
+            sites = [site for (site,) in self.app.area.keys()]
+
+            for (site, _), labor in labor_rows:
+                self.app.update_model('set_labor', site, month, labor)
+
+            # ДОБАВЛЯЕМ ТРУДОЗАТРАТЫ "Не указано" (NaN) для всех участков, которые не были указаны
+            specified_sites = {site for (site, _), _ in labor_rows}
+            labor_rows += [((site, month), np.nan) for site in sites if site not in specified_sites]
+            self.app.labor.update(labor_rows)
+
+            # Добавляем доходы как "Не указано" (NaN) для всех участков
+            self.app.income.update(((site, month), np.nan) for site in sites)
 
             if self.app.save_data():
                 self.app.refresh_data()
@@ -1,85 +1,543 @@
 from pulp import *
 import pandas as pd
 import numpy as np
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from scipy import sparse
+from scipy.optimize import linprog
+
+import transport_simplex
+from profiling import instrument_pulp, session, stage
+from result_cache import result_key
+
+try:
+    import highspy
+except ImportError:  # без HiGHS перебор N идет через PuLP и CBC
+    highspy = None
+
+# Запрещенные маршруты и маршрут с фиксированной перевозкой
+FORBIDDEN = [(0, 1), (1, 4)]  # A1->B2, A2->B5
+FIXED_ROUTE = (1, 0)  # A2->B1
+
+# Лист-матрица: первая строка - потребители и "Запасы", первый столбец - поставщики и "Потребности"
+MATRIX_SHEET = 'transport'
+SUPPLY_LABEL = 'Запасы'
+DEMAND_LABEL = 'Потребности'
+
+# Разреженная сеть: только разрешенные маршруты, запасы и потребности по пунктам
+ROUTES_SHEET = 'Маршруты'
+SUPPLY_SHEET = 'Запасы'
+DEMAND_SHEET = 'Потребности'
+# Запреты и фиксированные перевозки: пустой объем - запрет маршрута, число - фиксированная перевозка
+RULES_SHEET = 'Ограничения'
+FROM_COL = 'Откуда'
+TO_COL = 'Куда'
+COST_COL = 'Стоимость'
+POINT_COL = 'Пункт'
+SUPPLY_COL = 'Запас'
+DEMAND_COL = 'Потребность'
+VOLUME_COL = 'Объем'
+
+
+def _read_matrix(df):
+    """Разбирает лист-матрицу: названия, запасы (столбец "Запасы"), потребности
+    (строка "Потребности") и стоимости; размеры m x n определяются по листу
+    """
+    header = [str(label).strip() for label in df.iloc[0]]
+    first_col = [str(label).strip() for label in df.iloc[:, 0]]
+    n = header.index(SUPPLY_LABEL) - 1
+    m = first_col.index(DEMAND_LABEL) - 1
+    return {
+        'suppliers': first_col[1:m + 1],
+        'consumers': header[1:n + 1],
+        'supply': df.iloc[1:m + 1, n + 1].tolist(),
+        'demand': df.iloc[m + 1, 1:n + 1].tolist(),
+        'cost': np.array(df.iloc[1:m + 1, 1:n + 1].values.tolist()),
+        'end_row': m + 1,
+    }
 
 
 def load_data_from_excel(file_path):
     """Загружает данные из Excel файла"""
     # Чтение данных из Excel
-    df = pd.read_excel(file_path, sheet_name='transport', header=None)
+    with stage('load'):
+        df = pd.read_excel(file_path, sheet_name=MATRIX_SHEET, header=None)
+
+    # Запасы, потребности и матрица стоимостей; размеры берутся из листа
+    matrix = _read_matrix(df)
 
-    # Извлечение данных
-    supply = [df.iloc[1, 6], df.iloc[2, 6], df.iloc[3, 6]]  # Запасы
-    demand = [df.iloc[4, 1], df.iloc[4, 2], df.iloc[4, 3],  # Потребности
-                  df.iloc[4, 4], df.iloc[4, 5]]
+    # Фиксированное количество груза из A2 в B1 - через строку после потребностей
+    row = matrix['end_row'] + 2
+    fixed_N = df.iloc[row, 1] if row < len(df) and not pd.isna(df.iloc[row, 1]) else 60
 
-    # Матрица стоимостей
-    cost = np.array([
-        [df.iloc[1, 1], df.iloc[1, 2], df.iloc[1, 3], df.iloc[1, 4], df.iloc[1, 5]],
-        [df.iloc[2, 1], df.iloc[2, 2], df.iloc[2, 3], df.iloc[2, 4], df.iloc[2, 5]],
-        [df.iloc[3, 1], df.iloc[3, 2], df.iloc[3, 3], df.iloc[3, 4], df.iloc[3, 5]]
-    ])
+    return matrix['supply'], matrix['demand'], matrix['cost'], fixed_N
 
-    # Фиксированное количество груза из A2 в B1
-    fixed_N = df.iloc[6, 1] if not pd.isna(df.iloc[6, 1]) else 60
 
-    return supply, demand, cost, fixed_N
+def solve_transportation(N, supply, demand, cost, method='modi'):
+    """Решает транспортную задачу для заданного N
 
+    method='modi' - метод потенциалов на NumPy (transport_simplex), без внешнего решателя;
+    method='cbc' - модель PuLP и решатель CBC, оставлен для перекрестной проверки.
+    """
+    if method == 'modi':
+        with stage('solve'):
+            return transport_simplex.solve(cost, supply, demand, forbidden=FORBIDDEN, fixed={FIXED_ROUTE: N})
 
-def solve_transportation(N, supply, demand, cost):
-    """Решает транспортную задачу для заданного N"""
-    prob = LpProblem(f"Transportation_N_{N}", LpMinimize)
-    x = LpVariable.dicts("x", [(i, j) for i in range(3) for j in range(5)], lowBound=0)
+    m, n = np.shape(cost)
+    with stage('build'):
+        prob = LpProblem(f"Transportation_N_{N}", LpMinimize)
+        x = LpVariable.dicts("x", [(i, j) for i in range(m) for j in range(n)], lowBound=0)
 
-    # Целевая функция - минимизация стоимости
-    prob += lpSum([cost[i][j] * x[(i, j)] for i in range(3) for j in range(5)])
+        # Целевая функция - минимизация стоимости
+        prob += lpSum([cost[i][j] * x[(i, j)] for i in range(m) for j in range(n)])
 
-    # Ограничения по запасам
-    for i in range(3):
-        prob += lpSum([x[(i, j)] for j in range(5)]) == supply[i]
+        # Ограничения по запасам
+        for i in range(m):
+            prob += lpSum([x[(i, j)] for j in range(n)]) == supply[i]
 
-    # Ограничения по потребностям
-    for j in range(5):
-        prob += lpSum([x[(i, j)] for i in range(3)]) == demand[j]
+        # Ограничения по потребностям
+        for j in range(n):
+            prob += lpSum([x[(i, j)] for i in range(m)]) == demand[j]
 
-    # Дополнительные условия
-    prob += x[(0, 1)] == 0  # Запрет A1->B2
-    prob += x[(1, 4)] == 0  # Запрет A2->B5
-    prob += x[(1, 0)] == N  # Фиксированная перевозка A2->B1
+        # Дополнительные условия: запреты (A1->B2, A2->B5) и фиксированная перевозка A2->B1
+        for cell in FORBIDDEN:
+            prob += x[cell] == 0
+        prob += x[FIXED_ROUTE] == N
 
-    prob.solve(PULP_CBC_CMD(msg=False))
+    solver = PULP_CBC_CMD(msg=False)
+    instrument_pulp(prob, solver)
+    with stage('solve'):
+        prob.solve(solver)
 
     if LpStatus[prob.status] == 'Optimal':
         # Возвращаем стоимость и матрицу перевозок
-        solution = np.zeros((3, 5))
-        for i in range(3):
-            for j in range(5):
-                solution[i, j] = value(x[(i, j)])
-        return value(prob.objective), solution
+        with stage('extract'):
+            solution = np.zeros((m, n))
+            for i in range(m):
+                for j in range(n):
+                    solution[i, j] = value(x[(i, j)])
+            return value(prob.objective), solution
     return None, None
 
 
-def main():
-    # Загрузка данных
-    supply, demand, cost, fixed_N = load_data_from_excel('transport.xlsx')
-
-    print("Успешно загружены данные:")
-    print(f"Запасы: A1={supply[0]}, A2={supply[1]}, A3={supply[2]}")
-    print(f"Потребности: B1={demand[0]}, B2={demand[1]}, B3={demand[2]}, B4={demand[3]}, B5={demand[4]}")
-    print(f"\nФиксированная перевозка A2->B1: {fixed_N}")
-
-    # Решение задачи для заданного N из файла
-    total_cost, solution = solve_transportation(fixed_N, supply, demand, cost)
-
-    if total_cost is not None:
-        print("\nОптимальное решение:")
-        print(f"Общая стоимость перевозок: {total_cost:.2f}")
-        print("\nМатрица перевозок:")
-        print("     B1  B2  B3  B4  B5")
-        for i in range(3):
-            print(f"A{i + 1}: {[int(solution[i, j]) for j in range(5)]}")
+def build_highs(supply, demand, cost, forbidden=FORBIDDEN):
+    """Строит модель транспортной задачи m x n в HiGHS с запретом маршрутов forbidden"""
+    m, n = np.shape(cost)
+    inf = highspy.kHighsInf
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+
+    # Столбец (i, j) имеет номер i * n + j, строки: запасы, затем потребности
+    rows = np.column_stack([np.repeat(np.arange(m), n), m + np.tile(np.arange(n), m)]).ravel().astype(np.int32)
+    rhs = np.concatenate([np.asarray(supply, dtype=float), np.asarray(demand, dtype=float)])
+    h.addRows(m + n, rhs, rhs, 0, np.array([], dtype=np.int32), np.array([], dtype=np.int32),
+              np.array([], dtype=float))
+    h.addCols(m * n, np.asarray(cost, dtype=float).ravel(), np.zeros(m * n), np.full(m * n, inf),
+              2 * m * n, np.arange(0, 2 * m * n, 2, dtype=np.int32), rows, np.ones(2 * m * n))
+    for i, j in forbidden:
+        h.changeColBounds(i * n + j, 0, 0)
+    return h
+
+
+def _sweep_highs(N_values, supply, demand, cost):
+    """Перебор N на одной модели HiGHS: меняются только границы x[A2->B1]"""
+    m, n = np.shape(cost)
+    with stage('build'):
+        h = build_highs(supply, demand, cost)
+    fixed_col = FIXED_ROUTE[0] * n + FIXED_ROUTE[1]
+    points = []
+    for N in N_values:
+        h.changeColBounds(fixed_col, N, N)
+        with stage('solve'):
+            h.run()  # после первого решения HiGHS стартует с предыдущего базиса
+        if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            points.append({'N': N, 'cost': None, 'solution': None, 'basis': None})
+            continue
+        with stage('extract'):
+            basis = h.getBasis()
+            points.append({
+                'N': N,
+                'cost': h.getInfo().objective_function_value,
+                'solution': np.array(h.getSolution().col_value).reshape(m, n),
+                'basis': tuple(k for k, st in enumerate(basis.col_status) if st == highspy.HighsBasisStatus.kBasic),
+            })
+    return points
+
+
+def _sweep_pulp(N_values, supply, demand, cost):
+    """Перебор N на одной модели PuLP: меняется только правая часть x[A2->B1] == N"""
+    m, n = np.shape(cost)
+    with stage('build'):
+        prob = LpProblem("Transportation_sweep", LpMinimize)
+        x = LpVariable.dicts("x", [(i, j) for i in range(m) for j in range(n)], lowBound=0)
+        prob += lpSum([cost[i][j] * x[(i, j)] for i in range(m) for j in range(n)])
+        for i in range(m):
+            prob += lpSum([x[(i, j)] for j in range(n)]) == supply[i]
+        for j in range(n):
+            prob += lpSum([x[(i, j)] for i in range(m)]) == demand[j]
+        for i, j in FORBIDDEN:
+            prob += x[(i, j)] == 0
+        prob += x[FIXED_ROUTE] == 0, "fixed"
+
+    points = []
+    for N in N_values:
+        prob.constraints["fixed"].constant = -N
+        # Начальное решение берется из значений переменных после предыдущего N
+        solver = PULP_CBC_CMD(msg=False, warmStart=bool(points))
+        instrument_pulp(prob, solver)
+        with stage('solve'):
+            prob.solve(solver)
+        if LpStatus[prob.status] != 'Optimal':
+            points.append({'N': N, 'cost': None, 'solution': None, 'basis': None})
+            continue
+        with stage('extract'):
+            solution = np.array([[value(x[(i, j)]) for j in range(n)] for i in range(m)])
+            points.append({
+                'N': N,
+                'cost': value(prob.objective),
+                'solution': solution,
+                # CBC не отдает базис, поэтому за базис принимается набор ненулевых перевозок
+                'basis': tuple(np.flatnonzero(solution.ravel() > 1e-9)),
+            })
+    return points
+
+
+def _sweep_chunk(args):
+    N_values, supply, demand, cost = args
+    if highspy is not None:
+        return _sweep_highs(N_values, supply, demand, cost)
+    return _sweep_pulp(N_values, supply, demand, cost)
+
+
+def sweep_transportation(N_values, supply, demand, cost, workers=1):
+    """Решает транспортную задачу для ряда значений N на одной модели
+
+    Модель строится один раз, между решениями меняется только фиксированная
+    перевозка A2->B1, каждое решение стартует с предыдущего. При workers > 1
+    значения N делятся на непрерывные отрезки, которые решаются в отдельных
+    процессах. Возвращает словарь с кривой стоимости 'curve' (список пар
+    (N, стоимость)), точками 'points' и значениями N, при которых меняется
+    базис, - 'breakpoints'.
+    """
+    N_values = list(N_values)
+    if workers > 1 and len(N_values) > 1:
+        size = -(-len(N_values) // workers)
+        chunks = [(N_values[k:k + size], supply, demand, cost) for k in range(0, len(N_values), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            points = [point for chunk in pool.map(_sweep_chunk, chunks) for point in chunk]
+    else:
+        points = _sweep_chunk((N_values, supply, demand, cost))
+
+    breakpoints = []
+    previous = None
+    for point in points:
+        if previous is not None and point['basis'] != previous['basis']:
+            breakpoints.append(point['N'])
+        previous = point
+
+    return {
+        'curve': [(point['N'], point['cost']) for point in points],
+        'points': points,
+        'breakpoints': breakpoints,
+    }
+
+
+def _solve_scenario(args):
+    """Решает один сценарий пакета и замеряет время решения"""
+    index, scenario, method = args
+    if isinstance(scenario, dict):
+        N, supply, demand, cost = scenario['N'], scenario['supply'], scenario['demand'], scenario['cost']
+    else:
+        N, supply, demand, cost = scenario
+    start = time.perf_counter()
+    try:
+        total_cost, solution = solve_transportation(N, supply, demand, cost, method=method)
+        status = 'Optimal' if total_cost is not None else 'Infeasible'
+    except Exception as e:
+        total_cost, solution, status = None, None, f"Error: {e}"
+    return {
+        'index': index,
+        'status': status,
+        'cost': total_cost,
+        'solution': solution,
+        'time': time.perf_counter() - start,
+    }
+
+
+def solve_batch(scenarios, workers=None, method='modi', window=None):
+    """Решает набор сценариев параллельно в пуле процессов
+
+    scenarios - итерируемый набор кортежей (N, supply, demand, cost) или словарей
+    с такими ключами. Результаты выдаются по мере готовности, но строго в порядке
+    сценариев: словари с номером сценария, статусом, стоимостью, планом и временем
+    решения. workers - число процессов (по умолчанию - число ядер); в пул
+    одновременно передается не больше window сценариев, так что набор может быть
+    генератором любой длины.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or 4 * workers
+    tasks = ((index, scenario, method) for index, scenario in enumerate(scenarios))
+
+    if workers == 1:
+        for task in tasks:
+            yield _solve_scenario(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_solve_scenario, task))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _point_index(names, points, kind):
+    """Номера пунктов names в списке points; неизвестный пункт - ошибка"""
+    index = pd.Index(points).get_indexer(pd.Index(names).astype(str).str.strip())
+    if (index < 0).any():
+        unknown = pd.Index(names)[index < 0][0]
+        raise ValueError(f"Неизвестный пункт {kind}: {unknown}")
+    return index
+
+
+def _numeric(series, name):
+    values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+    if np.isnan(values).any():
+        raise ValueError(f"В столбце \"{name}\" есть пустые или нечисловые значения")
+    return values
+
+
+def load_network(file_path):
+    """Загружает транспортную сеть любого размера из Excel файла
+
+    Сеть задается либо листом-матрицей transport (как в лабораторной, размеры
+    m x n определяются по подписям "Запасы" и "Потребности"), либо
+    разреженно: лист "Маршруты" (Откуда, Куда, Стоимость) только с
+    разрешенными маршрутами и листы "Запасы" (Пункт, Запас) и "Потребности"
+    (Пункт, Потребность). Необязательный лист "Ограничения" (Откуда, Куда,
+    Объем) задает запреты (пустой объем) и фиксированные перевозки.
+
+    Маршруты хранятся массивами длины k (число разрешенных маршрутов), а не
+    матрицей m x n: запрещенные маршруты в память не попадают. Возвращает
+    словарь: названия 'suppliers' и 'consumers', массивы 'supply', 'demand',
+    'arc_from', 'arc_to', 'arc_cost' и 'fixed' - фиксированный объем по
+    маршруту (NaN - не фиксирован).
+    """
+    with stage('load'):
+        xls = pd.ExcelFile(file_path)
+        if ROUTES_SHEET in xls.sheet_names:
+            routes = pd.read_excel(xls, ROUTES_SHEET)
+            supply_df = pd.read_excel(xls, SUPPLY_SHEET)
+            demand_df = pd.read_excel(xls, DEMAND_SHEET)
+        else:
+            matrix = _read_matrix(pd.read_excel(xls, MATRIX_SHEET, header=None))
+        rules = pd.read_excel(xls, RULES_SHEET) if RULES_SHEET in xls.sheet_names else None
+
+    with stage('convert'):
+        if ROUTES_SHEET in xls.sheet_names:
+            suppliers = supply_df[POINT_COL].astype(str).str.strip().tolist()
+            consumers = demand_df[POINT_COL].astype(str).str.strip().tolist()
+            supply = _numeric(supply_df[SUPPLY_COL], SUPPLY_COL)
+            demand = _numeric(demand_df[DEMAND_COL], DEMAND_COL)
+            arc_from = _point_index(routes[FROM_COL], suppliers, "отправления")
+            arc_to = _point_index(routes[TO_COL], consumers, "назначения")
+            arc_cost = _numeric(routes[COST_COL], COST_COL)
+        else:
+            suppliers, consumers = matrix['suppliers'], matrix['consumers']
+            supply = np.asarray(matrix['supply'], dtype=float)
+            demand = np.asarray(matrix['demand'], dtype=float)
+            m, n = len(suppliers), len(consumers)
+            arc_from = np.repeat(np.arange(m), n)
+            arc_to = np.tile(np.arange(n), m)
+            arc_cost = matrix['cost'].astype(float).ravel()
+
+        # Повтор маршрута - берется последняя строка
+        n = len(consumers)
+        keys = arc_from.astype(np.int64) * n + arc_to
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = np.sort(len(keys) - 1 - last)
+        arc_from, arc_to, arc_cost, keys = arc_from[keep], arc_to[keep], arc_cost[keep], keys[keep]
+        fixed = np.full(len(keys), np.nan)
+
+        if rules is not None and len(rules):
+            rule_keys = (_point_index(rules[FROM_COL], suppliers, "отправления").astype(np.int64) * n
+                         + _point_index(rules[TO_COL], consumers, "назначения"))
+            volumes = pd.to_numeric(rules[VOLUME_COL], errors='coerce').to_numpy(dtype=float)
+            banned = np.isnan(volumes)
+            # Запрещенные маршруты удаляются из сети
+            keep = ~np.isin(keys, rule_keys[banned])
+            arc_from, arc_to, arc_cost, keys, fixed = (arc_from[keep], arc_to[keep], arc_cost[keep],
+                                                       keys[keep], fixed[keep])
+            pos = pd.Index(keys).get_indexer(rule_keys[~banned])
+            if (pos < 0).any():
+                raise ValueError("Фиксированная перевозка задана для отсутствующего или запрещенного маршрута")
+            fixed[pos] = volumes[~banned]
+
+    return {
+        'suppliers': suppliers,
+        'consumers': consumers,
+        'supply': supply,
+        'demand': demand,
+        'arc_from': arc_from.astype(np.int32),
+        'arc_to': arc_to.astype(np.int32),
+        'arc_cost': arc_cost,
+        'fixed': fixed,
+    }
+
+
+def _arc_bounds(net):
+    fixed = net['fixed']
+    is_fixed = ~np.isnan(fixed)
+    return np.where(is_fixed, fixed, 0.0), np.where(is_fixed, fixed, np.inf)
+
+
+def _solve_network_highs(net, msg=False):
+    """Решает сеть в HiGHS: столбец - маршрут с двумя коэффициентами (строки запаса и потребности)"""
+    m, n, k = len(net['supply']), len(net['demand']), len(net['arc_cost'])
+    inf = highspy.kHighsInf
+    lower, upper = _arc_bounds(net)
+    with stage('build'):
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', bool(msg))
+        # Вывоз не больше запаса, потребность покрывается точно (в закрытой задаче это равенства)
+        h.addRows(m + n, np.concatenate([np.full(m, -inf), net['demand']]),
+                  np.concatenate([net['supply'], net['demand']]), 0,
+                  np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+        rows = np.column_stack([net['arc_from'], m + net['arc_to']]).ravel().astype(np.int32)
+        h.addCols(k, net['arc_cost'], lower, upper,
+                  2 * k, np.arange(0, 2 * k, 2, dtype=np.int32), rows, np.ones(2 * k))
+    with stage('solve'):
+        h.run()
+    model_status = h.getModelStatus()
+    if model_status != highspy.HighsModelStatus.kOptimal:
+        status = 'Infeasible' if model_status == highspy.HighsModelStatus.kInfeasible else h.modelStatusToString(
+            model_status)
+        return status, None, None
+    return 'Optimal', h.getInfo().objective_function_value, np.array(h.getSolution().col_value)
+
+
+def _solve_network_scipy(net, msg=False):
+    """То же через scipy.optimize.linprog (HiGHS в составе scipy)"""
+    m, n, k = len(net['supply']), len(net['demand']), len(net['arc_cost'])
+    lower, upper = _arc_bounds(net)
+    with stage('build'):
+        cols = np.arange(k)
+        A_ub = sparse.csr_matrix((np.ones(k), (net['arc_from'], cols)), shape=(m, k))
+        A_eq = sparse.csr_matrix((np.ones(k), (net['arc_to'], cols)), shape=(n, k))
+    with stage('solve'):
+        res = linprog(net['arc_cost'], A_ub=A_ub, b_ub=net['supply'], A_eq=A_eq, b_eq=net['demand'],
+                      bounds=np.column_stack([lower, upper]), method='highs', options={'disp': bool(msg)})
+    if res.status != 0:
+        return 'Infeasible' if res.status == 2 else res.message, None, None
+    return 'Optimal', float(res.fun), res.x
+
+
+def _solve_network_modi(net):
+    """Метод потенциалов на плотной матрице m x n (для небольших сетей и сверки)"""
+    m, n = len(net['supply']), len(net['demand'])
+    with stage('build'):
+        cost = np.zeros((m, n))
+        cost[net['arc_from'], net['arc_to']] = net['arc_cost']
+        allowed = np.zeros((m, n), dtype=bool)
+        allowed[net['arc_from'], net['arc_to']] = True
+        is_fixed = ~np.isnan(net['fixed'])
+        fixed = {(int(i), int(j)): q for i, j, q in zip(net['arc_from'][is_fixed], net['arc_to'][is_fixed],
+                                                         net['fixed'][is_fixed])}
+    with stage('solve'):
+        total, flow = transport_simplex.solve(cost, net['supply'], net['demand'], fixed=fixed, allowed=allowed)
+    if flow is None:
+        return 'Infeasible', None, None
+    return 'Optimal', total, flow[net['arc_from'], net['arc_to']]
+
+
+def solve_network(net, method='highs', msg=False, cache=None):
+    """Решает транспортную сеть из load_network
+
+    method='highs' - разреженная модель HiGHS (highspy, без него - scipy);
+    method='modi' - метод потенциалов, требует баланса запасов и потребностей
+    и строит плотную матрицу m x n.
+    Возвращает словарь: 'status', стоимость 'cost' и перевозки по маршрутам
+    'flow' (массив в порядке маршрутов сети) или None.
+    cache - ResultCache: оптимальное решение той же сети берется из кэша.
+    """
+    if cache is not None:
+        result, _ = cache.get_or_compute(result_key(net, method=method),
+                                         lambda: solve_network(net, method, msg),
+                                         store=lambda result: result['status'] == 'Optimal')
+        return result
+
+    if method == 'modi':
+        status, total, flow = _solve_network_modi(net)
+    elif highspy is not None:
+        status, total, flow = _solve_network_highs(net, msg)
     else:
-        print("Не удалось найти оптимальное решение.")
+        status, total, flow = _solve_network_scipy(net, msg)
+    if flow is not None:
+        flow[np.abs(flow) < 1e-9] = 0.0
+    return {'status': status, 'cost': total, 'flow': flow}
+
+
+def network_flows(net, result):
+    """Ненулевые перевозки решения в виде словаря {(пункт отправления, пункт назначения): объем}
+
+    Подходит для сравнения планов (result_cache.diff_plans).
+    """
+    if result['flow'] is None:
+        return {}
+    used = np.flatnonzero(result['flow'])
+    return {(net['suppliers'][net['arc_from'][a]], net['consumers'][net['arc_to'][a]]): float(result['flow'][a])
+            for a in used}
+
+
+def format_network(net, result, limit=50):
+    """Текстовый отчет: стоимость и ненулевые перевозки (не больше limit строк)"""
+    if result['status'] != 'Optimal':
+        return f"Не удалось найти оптимальное решение: {result['status']}"
+    used = np.flatnonzero(result['flow'])
+    lines = [f"Общая стоимость перевозок: {result['cost']:.2f}",
+             f"Пунктов отправления: {len(net['suppliers'])}, назначения: {len(net['consumers'])}, "
+             f"маршрутов: {len(net['arc_cost'])}, задействовано: {len(used)}", "", "Перевозки:"]
+    for a in used[:limit]:
+        lines.append(f"{net['suppliers'][net['arc_from'][a]]} -> {net['consumers'][net['arc_to'][a]]}: "
+                     f"{result['flow'][a]:g}")
+    if len(used) > limit:
+        lines.append(f"... и еще {len(used) - limit}")
+    return "\n".join(lines)
+
+
+def main():
+    with session():
+        # Загрузка данных
+        supply, demand, cost, fixed_N = load_data_from_excel('transport.xlsx')
+
+        print("Успешно загружены данные:")
+        print(f"Запасы: A1={supply[0]}, A2={supply[1]}, A3={supply[2]}")
+        print(f"Потребности: B1={demand[0]}, B2={demand[1]}, B3={demand[2]}, B4={demand[3]}, B5={demand[4]}")
+        print(f"\nФиксированная перевозка A2->B1: {fixed_N}")
+
+        # Решение задачи для заданного N из файла
+        total_cost, solution = solve_transportation(fixed_N, supply, demand, cost)
+
+        # Перекрестная проверка решением CBC
+        check_cost, _ = solve_transportation(fixed_N, supply, demand, cost, method='cbc')
+        if (check_cost is None) != (total_cost is None) or (
+                total_cost is not None and abs(check_cost - total_cost) > 1e-6):
+            print(f"Внимание: решение CBC отличается (стоимость {check_cost})")
+
+        if total_cost is not None:
+            print("\nОптимальное решение:")
+            print(f"Общая стоимость перевозок: {total_cost:.2f}")
+            print("\nМатрица перевозок:")
+            print("     B1  B2  B3  B4  B5")
+            for i in range(3):
+                print(f"A{i + 1}: {[int(solution[i, j]) for j in range(5)]}")
+        else:
+            print("Не удалось найти оптимальное решение.")
 
 
 if __name__ == "__main__":
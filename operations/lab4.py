@@ -1,146 +1,453 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 from pulp import *
+from concurrent.futures import ProcessPoolExecutor
 
+from profiling import instrument_pulp, session, stage
+from result_cache import ResultCache
 
-def load_data_from_excel(file_path):
-    """Загружает данные из Excel файла"""
-    xls = pd.ExcelFile(file_path)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:  # без python-calamine листы читает openpyxl (медленнее на больших матрицах)
+    EXCEL_ENGINE = None
 
-    # Загрузка параметров
-    params = pd.read_excel(xls, 'Параметры')
-    alpha1 = params[params['Параметр'] == 'alpha1']['Доля древесины'].values[0]
-    alpha2 = params[params['Параметр'] == 'alpha2']['Доля древесины'].values[0]
 
-    # Проверка корректности параметров
-    if not (abs((alpha1 + alpha2) - 1) < 1e-6):
-        raise ValueError("Сумма долей α1 и α2 должна равняться 1")
+# Листы файла с исходными данными
+SHEETS = ('Параметры', 'ЛЗП', 'ЛПП', 'Транспортные расходы')
+
+# Массивы, которые хранятся в кэше разобранного файла
+ARRAY_KEYS = ('alpha1', 'alpha2', 'b', 'r', 'd1', 'd2', 'c')
+CACHE_VERSION = 1
+
+
+def split_capacity(b, alpha1, alpha2):
+    """Делит объемы заготовки b на лиственную и хвойную части (векторно)
+
+    При alpha1 = 0.5 нечетный объем делится с округлением лиственной части
+    вверх, хвойной - вниз, остальные - с отбрасыванием дробной части; при
+    других долях обе части округляются как round (половина - к четному).
+    Возвращает два массива целых чисел.
+    """
+    b = np.asarray(b)
+    if alpha1 == 0.5:
+        odd = b % 2 == 1
+        hardwood = np.where(odd, np.ceil(alpha1 * b), np.trunc(alpha1 * b))
+        softwood = np.where(odd, np.floor(alpha2 * b), np.trunc(alpha2 * b))
+    else:
+        hardwood = np.round(alpha1 * b)
+        softwood = np.round(alpha2 * b)
+    return hardwood.astype(np.int64), softwood.astype(np.int64)
 
-    # Загрузка данных ЛЗП
-    lzp_df = pd.read_excel(xls, 'ЛЗП')
-    b = lzp_df['Максимальный объем заготовок'].tolist()
-    r = lzp_df['Траты на изготовление ед.'].tolist()
-    m = len(b)
-
-    # Рассчитываем максимальные объёмы по типам древесины для каждого ЛЗП
-    b_hardwood = []
-    b_softwood = []
-    for bi in b:
-        if alpha1 == 0.5:  # Если alpha1 равно 0.5
-            if bi % 2 == 1:  # Если нечётное количество
-                hw = math.ceil(alpha1 * bi)
-                sw = math.floor(alpha2 * bi)
-            else:  # Если чётное количество
-                hw = int(alpha1 * bi)
-                sw = int(alpha2 * bi)
-        else:
-            hw = round(alpha1 * bi)
-            sw = round(alpha2 * bi)
 
-        b_hardwood.append(hw)
-        b_softwood.append(sw)
+def _parse_workbook(file_path):
+    """Читает четыре листа за одно открытие файла и возвращает массивы NumPy"""
+    sheets = pd.read_excel(file_path, sheet_name=list(SHEETS), engine=EXCEL_ENGINE)
+    params = sheets['Параметры']
+    lzp_df = sheets['ЛЗП']
+    lpp_df = sheets['ЛПП']
+    return {
+        'alpha1': np.float64(params[params['Параметр'] == 'alpha1']['Доля древесины'].values[0]),
+        'alpha2': np.float64(params[params['Параметр'] == 'alpha2']['Доля древесины'].values[0]),
+        'b': lzp_df['Максимальный объем заготовок'].to_numpy(),
+        'r': lzp_df['Траты на изготовление ед.'].to_numpy(),
+        'd1': lpp_df['Потребность в лиственной древесине'].to_numpy(),
+        'd2': lpp_df['Потребность в хвойной древесине'].to_numpy(),
+        # Первый столбец листа - названия ЛЗП
+        'c': sheets['Транспортные расходы'].iloc[:, 1:].to_numpy(),
+    }
+
 
-    # Загрузка данных ЛПП
-    lpp_df = pd.read_excel(xls, 'ЛПП')
-    d1 = lpp_df['Потребность в лиственной древесине'].tolist()
-    d2 = lpp_df['Потребность в хвойной древесине'].tolist()
-    n = len(d1)
+def _make_data(arrays):
+    """Словарь данных задачи по разобранным массивам"""
+    alpha1, alpha2 = float(arrays['alpha1']), float(arrays['alpha2'])
+
+    # Проверка корректности параметров
+    if not (abs((alpha1 + alpha2) - 1) < 1e-6):
+        raise ValueError("Сумма долей α1 и α2 должна равняться 1")
 
-    # Загрузка матрицы транспортных расходов
-    transport_df = pd.read_excel(xls, 'Транспортные расходы', index_col=0)
-    c = transport_df.values.tolist()
+    # Максимальные объёмы по типам древесины для каждого ЛЗП
+    b_hardwood, b_softwood = split_capacity(arrays['b'], alpha1, alpha2)
 
     return {
-        'm': m,  # Кол-во ЛЗП
-        'n': n,  # Кол-во ЛПП
+        'm': len(arrays['b']),  # Кол-во ЛЗП
+        'n': len(arrays['d1']),  # Кол-во ЛПП
         'alpha1': alpha1,  # Доля лиственных деревьев
         'alpha2': alpha2,  # Доля хвойных деревьев
-        'c': c,  # Матрица стоимостей перевозок
-        'b': b,  # Макс. объемы заготовки по ЛЗП
-        'b_hardwood': b_hardwood,  # Лимит лиственных по ЛЗП
-        'b_softwood': b_softwood,  # Лимит хвойных по ЛЗП
-        'r': r,  # Себестоимость заготовки по ЛЗП
-        'd1': d1,  # Потребность в лиственных по ЛПП
-        'd2': d2  # Потребность в хвойных по ЛПП
+        'c': arrays['c'].tolist(),  # Матрица стоимостей перевозок
+        'b': arrays['b'].tolist(),  # Макс. объемы заготовки по ЛЗП
+        'b_hardwood': b_hardwood.tolist(),  # Лимит лиственных по ЛЗП
+        'b_softwood': b_softwood.tolist(),  # Лимит хвойных по ЛЗП
+        'r': arrays['r'].tolist(),  # Себестоимость заготовки по ЛЗП
+        'd1': arrays['d1'].tolist(),  # Потребность в лиственных по ЛПП
+        'd2': arrays['d2'].tolist()  # Потребность в хвойных по ЛПП
     }
 
 
-# Загрузка данных из Excel
-try:
-    data = load_data_from_excel('transport_data.xlsx')
-except Exception as e:
-    print(f"Ошибка при загрузке данных: {e}")
-    exit()
-
-# Создаем задачу
-prob = LpProblem("Timber_Transportation", LpMinimize)
-
-# Переменные
-x = []
-y = []
-for i in range(data['m']):
-    x_row = []
-    y_row = []
+def load_data_from_excel(file_path):
+    """Загружает данные из Excel файла"""
+    with stage('load'):
+        return _make_data(_parse_workbook(file_path))
+
+
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path_for(file_path, cache_dir=None):
+    """Путь к кэшу разобранного файла: по умолчанию рядом с ним, скрытым файлом .npz"""
+    file_path = os.path.abspath(file_path)
+    return os.path.join(cache_dir or os.path.dirname(file_path), f".{os.path.basename(file_path)}.lab4.npz")
+
+
+def _read_cache(cache_path):
+    try:
+        with np.load(cache_path) as cached:
+            meta = json.loads(str(cached['meta']))
+            if meta.get('version') != CACHE_VERSION:
+                return None, None
+            return meta, {key: cached[key] for key in ARRAY_KEYS}
+    except (OSError, KeyError, ValueError):
+        # Нет кэша, он поврежден или в нем объектные массивы - файл разбирается заново
+        return None, None
+
+
+def _write_cache(cache_path, arrays, stat, digest):
+    meta = {'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Запись во временный файл и замена: параллельный запуск не прочитает половину кэша
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Кэш - только ускорение: каталог только для чтения не мешает расчету
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_data(file_path, use_cache=True, cache_dir=None):
+    """Загружает данные как load_data_from_excel, но с кэшем разобранного файла на диске
+
+    Кэш хранит массивы листов вместе с временем изменения, размером и SHA-256
+    файла. Если время и размер совпали, Excel не открывается вовсе; если
+    файл перезаписан, но содержимое (хэш) прежнее, обновляется только
+    отметка в кэше. Иначе файл разбирается заново и кэш перезаписывается.
+    """
+    if not use_cache:
+        return load_data_from_excel(file_path)
+
+    with stage('load'):
+        cache_path = cache_path_for(file_path, cache_dir)
+        stat = os.stat(file_path)
+        meta, arrays = _read_cache(cache_path)
+        if meta is not None and (meta['mtime_ns'], meta['size']) == (stat.st_mtime_ns, stat.st_size):
+            return _make_data(arrays)
+
+        digest = _file_hash(file_path)
+        if meta is None or meta['sha256'] != digest:
+            arrays = _parse_workbook(file_path)
+        _write_cache(cache_path, arrays, stat, digest)
+        return _make_data(arrays)
+
+
+def build_model(data, relax=False):
+    """Строит модель перевозок; при relax=True переменные непрерывные"""
+    cat = 'Continuous' if relax else 'Integer'
+    prob = LpProblem("Timber_Transportation", LpMinimize)
+
+    # Переменные
+    x = []
+    y = []
+    for i in range(data['m']):
+        x_row = []
+        y_row = []
+        for j in range(data['n']):
+            x_ij = LpVariable(f"x_{i}_{j}", lowBound=0, cat=cat)  # Целые деревья
+            y_ij = LpVariable(f"y_{i}_{j}", lowBound=0, cat=cat)  # Целые деревья
+            x_row.append(x_ij)
+            y_row.append(y_ij)
+        x.append(x_row)
+        y.append(y_row)
+
+    # Целевая функция: сумма (c_ij + r_i) * (x_ij + y_ij)
+    prob += lpSum(
+        (data['c'][i][j] + data['r'][i]) * (x[i][j] + y[i][j])
+        for i in range(data['m']) for j in range(data['n'])
+    )
+
+    # Ограничения:
+    # 1. Общий объём лиственной древесины от ЛЗП i не превышает alpha1*b_i
+    for i in range(data['m']):
+        prob += lpSum(x[i][j] for j in range(data['n'])) <= data['b_hardwood'][i], f"hardwood_supply_{i}"
+
+    # 2. Общий объём хвойной древесины от ЛЗП i не превышает alpha2*b_i
+    for i in range(data['m']):
+        prob += lpSum(y[i][j] for j in range(data['n'])) <= data['b_softwood'][i], f"softwood_supply_{i}"
+
+    # 3. Потребности в лиственной древесине
     for j in range(data['n']):
-        x_ij = LpVariable(f"x_{i}_{j}", lowBound=0, cat='Integer')  # Целые деревья
-        y_ij = LpVariable(f"y_{i}_{j}", lowBound=0, cat='Integer')  # Целые деревья
-        x_row.append(x_ij)
-        y_row.append(y_ij)
-    x.append(x_row)
-    y.append(y_row)
-
-# Целевая функция: сумма (c_ij + r_i) * (x_ij + y_ij)
-prob += lpSum(
-    (data['c'][i][j] + data['r'][i]) * (x[i][j] + y[i][j])
-    for i in range(data['m']) for j in range(data['n'])
-)
-
-# Ограничения:
-# 1. Общий объём лиственной древесины от ЛЗП i не превышает alpha1*b_i
-for i in range(data['m']):
-    prob += lpSum(x[i][j] for j in range(data['n'])) <= data['b_hardwood'][i]
-
-# 2. Общий объём хвойной древесины от ЛЗП i не превышает alpha2*b_i
-for i in range(data['m']):
-    prob += lpSum(y[i][j] for j in range(data['n'])) <= data['b_softwood'][i]
-
-# 3. Потребности в лиственной древесине
-for j in range(data['n']):
-    prob += lpSum(x[i][j] for i in range(data['m'])) == data['d1'][j]
-
-# 4. Потребности в хвойной древесине
-for j in range(data['n']):
-    prob += lpSum(y[i][j] for i in range(data['m'])) == data['d2'][j]
-
-# Решаем
-prob.solve()
-
-# Вывод решения
-print("\nСтатус решения:", LpStatus[prob.status])
-print("Общие затраты:", value(prob.objective))
-
-# Суммарная доставленная древесина по типам
-total_hardwood = sum(value(x[i][j]) for i in range(data['m']) for j in range(data['n']))
-total_softwood = sum(value(y[i][j]) for i in range(data['m']) for j in range(data['n']))
-
-print("\nОптимальные объемы перевозок:")
-for i in range(data['m']):
+        prob += lpSum(x[i][j] for i in range(data['m'])) == data['d1'][j], f"hardwood_demand_{j}"
+
+    # 4. Потребности в хвойной древесине
     for j in range(data['n']):
-        if value(x[i][j]) > 0 or value(y[i][j]) > 0:
-            print(f"ЛЗП {i+1} -> ЛПП {j+1}: "
-                  f"Лиственная: {value(x[i][j])} деревьев, "
-                  f"Хвойная: {value(y[i][j])} деревьев")
-
-print("\nИтого доставлено:")
-print(f"Лиственная древесина: {total_hardwood} деревьев")
-print(f"Хвойная древесина: {total_softwood} деревьев")
-print(f"Всего деревьев перевезено: {total_hardwood + total_softwood}")
-
-# Проверка использования мощностей ЛЗП
-print("\nИспользование мощностей ЛЗП:")
-for i in range(data['m']):
-    used_hardwood = sum(value(x[i][j]) for j in range(data['n']))
-    used_softwood = sum(value(y[i][j]) for j in range(data['n']))
-    print(f"ЛЗП {i+1}: Лиственная {used_hardwood}/{data['b_hardwood'][i]} "
-          f"({used_hardwood/data['b_hardwood'][i]*100:.1f}%), "
-          f"Хвойная {used_softwood}/{data['b_softwood'][i]} "
-          f"({used_softwood/data['b_softwood'][i]*100:.1f}%)")
\ No newline at end of file
+        prob += lpSum(y[i][j] for i in range(data['m'])) == data['d2'][j], f"softwood_demand_{j}"
+
+    return prob, x, y
+
+
+def find_blocks(prob):
+    """Находит независимые блоки модели - группы переменных, не связанные ни одним ограничением"""
+    parent = {v.name: v.name for v in prob.variables()}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for constraint in prob.constraints.values():
+        names = [v.name for v in constraint.keys()]
+        root = find(names[0]) if names else None
+        for name in names[1:]:
+            other = find(name)
+            if other != root:
+                parent[other] = root
+
+    blocks = {}
+    for name in parent:
+        blocks.setdefault(find(name), set()).add(name)
+    return list(blocks.values())
+
+
+def split_model(prob):
+    """Разбивает модель на независимые подзадачи по блокам переменных"""
+    subproblems = []
+    for k, names in enumerate(find_blocks(prob)):
+        sub = LpProblem(f"{prob.name}_block_{k}", prob.sense)
+        sub += LpAffineExpression([(v, coef) for v, coef in prob.objective.items() if v.name in names])
+        for name, constraint in prob.constraints.items():
+            if any(v.name in names for v in constraint.keys()):
+                sub += constraint.copy(), name
+        subproblems.append(sub)
+    return subproblems
+
+
+def _is_integral(values, tol=1e-6):
+    return all(abs(v - round(v)) <= tol for v in values.values() if v is not None)
+
+
+def _solve_block(args):
+    """Решает подзадачу, переданную в виде словаря (годится для пула процессов)
+
+    При relax=True подзадача сначала решается как ЛП: матрица транспортной
+    задачи вполне унимодулярна, и при целых запасах и потребностях оптимальный
+    опорный план уже целочисленный. Если план все же дробный (дробные данные),
+    подзадача перерешивается как целочисленная.
+    """
+    model_dict, relax, msg = args
+    variables, prob = LpProblem.from_dict(model_dict)
+    solver = PULP_CBC_CMD(msg=msg)
+    instrument_pulp(prob, solver)
+    if relax:
+        integer_vars = [v for v in variables.values() if v.cat == LpInteger]
+        for v in integer_vars:
+            v.cat = LpContinuous
+        prob.solve(solver)
+        values = {name: v.varValue for name, v in variables.items()}
+        if LpStatus[prob.status] != 'Optimal' or _is_integral(values) or not integer_vars:
+            return LpStatus[prob.status], value(prob.objective), values
+        for v in integer_vars:
+            v.cat = LpInteger
+    prob.solve(solver)
+    return LpStatus[prob.status], value(prob.objective), {name: v.varValue for name, v in variables.items()}
+
+
+def solve_timber(data, mode='monolithic', relax=False, workers=1, msg=False):
+    """Решает задачу перевозки древесины
+
+    mode='monolithic' - одна модель MILP;
+    mode='decomposed' - модель делится на независимые блоки (лиственная и хвойная
+    древесина не связаны ни одним ограничением), блоки решаются отдельно, при
+    workers > 1 - в пуле процессов, планы объединяются.
+    relax=True - решать блоки как ЛП, пользуясь полной унимодулярностью.
+    Возвращает словарь со статусом, стоимостью и матрицами перевозок x и y.
+    """
+    with stage('build'):
+        prob, x, y = build_model(data)
+        # Решатель получает модель словарем: так же она передается в рабочие процессы
+        if mode == 'decomposed':
+            tasks = [(sub.to_dict(), relax, msg) for sub in split_model(prob)]
+        else:
+            tasks = [(prob.to_dict(), relax, msg)]
+
+    # В рабочих процессах профилировщик не включен: решение пула - один этап
+    with stage('solve'):
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_solve_block, tasks))
+        else:
+            results = [_solve_block(task) for task in tasks]
+
+    with stage('extract'):
+        statuses = [status for status, _, _ in results]
+        status = 'Optimal' if all(st == 'Optimal' for st in statuses) else next(
+            st for st in statuses if st != 'Optimal')
+        objective = sum(obj or 0 for _, obj, _ in results) if status == 'Optimal' else None
+        values = {}
+        for _, _, block_values in results:
+            values.update(block_values)
+
+        return {
+            'status': status,
+            'objective': objective,
+            'x': [[values.get(x[i][j].name) for j in range(data['n'])] for i in range(data['m'])],
+            'y': [[values.get(y[i][j].name) for j in range(data['n'])] for i in range(data['m'])],
+        }
+
+
+# Кэш решений в памяти: ключ - хэш исходных данных и параметров решения,
+# давно не использованные решения вытесняются
+_cache = ResultCache()
+
+
+def _json_default(obj):
+    # Числа NumPy (например, alpha из pandas) приводятся к обычным числам Python
+    if hasattr(obj, 'item'):
+        return obj.item()
+    raise TypeError(f"Неподдерживаемый тип: {type(obj).__name__}")
+
+
+def data_key(data, **options):
+    """Хэш исходных данных (словаря load_data_from_excel) вместе с параметрами решения"""
+    payload = json.dumps({'data': data, 'options': options}, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def clear_cache():
+    """Очищает кэш решений"""
+    _cache.clear()
+
+
+def _share(used, limit):
+    return used / limit * 100 if limit else None
+
+
+def make_report(data, result):
+    """Собирает план перевозок и отчет об использовании мощностей ЛЗП"""
+    m, n = data['m'], data['n']
+    plan = {
+        'status': result['status'],
+        'objective': result['objective'],
+        'x': result['x'],
+        'y': result['y'],
+        'routes': [],
+        'utilization': [],
+    }
+    if result['status'] != 'Optimal':
+        plan['total_hardwood'] = plan['total_softwood'] = plan['total'] = None
+        return plan
+
+    x, y = result['x'], result['y']
+    for i in range(m):
+        for j in range(n):
+            if x[i][j] > 0 or y[i][j] > 0:
+                plan['routes'].append({'lzp': i + 1, 'lpp': j + 1, 'hardwood': x[i][j], 'softwood': y[i][j]})
+
+    # Суммарная доставленная древесина по типам
+    plan['total_hardwood'] = sum(x[i][j] for i in range(m) for j in range(n))
+    plan['total_softwood'] = sum(y[i][j] for i in range(m) for j in range(n))
+    plan['total'] = plan['total_hardwood'] + plan['total_softwood']
+
+    for i in range(m):
+        used_hardwood = sum(x[i][j] for j in range(n))
+        used_softwood = sum(y[i][j] for j in range(n))
+        plan['utilization'].append({
+            'lzp': i + 1,
+            'hardwood_used': used_hardwood,
+            'hardwood_limit': data['b_hardwood'][i],
+            'hardwood_share': _share(used_hardwood, data['b_hardwood'][i]),
+            'softwood_used': used_softwood,
+            'softwood_limit': data['b_softwood'][i],
+            'softwood_share': _share(used_softwood, data['b_softwood'][i]),
+        })
+    return plan
+
+
+def plan_timber(data, mode='monolithic', relax=False, workers=1, msg=False, use_cache=True):
+    """Решает задачу по словарю load_data_from_excel и возвращает план с отчетом
+
+    Повторный запрос с теми же данными и параметрами берется из кэша в памяти.
+    Возвращается копия, так что изменение результата не портит кэш.
+    """
+    key = data_key(data, mode=mode, relax=relax)
+    if use_cache:
+        plan = _cache.get(key)
+        if plan is not None:
+            return plan
+
+    result = solve_timber(data, mode=mode, relax=relax, workers=workers, msg=msg)
+    with stage('extract'):
+        plan = make_report(data, result)
+    if use_cache:
+        _cache.put(key, plan)
+    return plan
+
+
+def _fmt_share(share):
+    return "—" if share is None else f"{share:.1f}%"
+
+
+def format_report(plan):
+    """Текстовый отчет в том же виде, в каком его печатал скрипт"""
+    lines = ["", f"Статус решения: {plan['status']}", f"Общие затраты: {plan['objective']}"]
+    if plan['status'] != 'Optimal':
+        return "\n".join(lines)
+
+    lines += ["", "Оптимальные объемы перевозок:"]
+    for route in plan['routes']:
+        lines.append(f"ЛЗП {route['lzp']} -> ЛПП {route['lpp']}: "
+                     f"Лиственная: {route['hardwood']} деревьев, "
+                     f"Хвойная: {route['softwood']} деревьев")
+
+    lines += ["", "Итого доставлено:",
+              f"Лиственная древесина: {plan['total_hardwood']} деревьев",
+              f"Хвойная древесина: {plan['total_softwood']} деревьев",
+              f"Всего деревьев перевезено: {plan['total']}"]
+
+    # Проверка использования мощностей ЛЗП
+    lines += ["", "Использование мощностей ЛЗП:"]
+    for u in plan['utilization']:
+        lines.append(f"ЛЗП {u['lzp']}: Лиственная {u['hardwood_used']}/{u['hardwood_limit']} "
+                     f"({_fmt_share(u['hardwood_share'])}), "
+                     f"Хвойная {u['softwood_used']}/{u['softwood_limit']} "
+                     f"({_fmt_share(u['softwood_share'])})")
+    return "\n".join(lines)
+
+
+def main(file_path='transport_data.xlsx'):
+    with session():
+        # Загрузка данных из Excel
+        try:
+            data = load_data(file_path)
+        except Exception as e:
+            print(f"Ошибка при загрузке данных: {e}")
+            return 1
+
+        plan = plan_timber(data, msg=True)
+    print(format_report(plan))
+    return 0 if plan['status'] == 'Optimal' else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:2]))
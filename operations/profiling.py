@@ -0,0 +1,197 @@
+"""Замеры этапов расчета: загрузка, подготовка данных, построение модели,
+решение и разбор результата.
+
+Расчетные модули отмечают этапы через stage(name). Пока профилировщик не
+включен, stage возвращает общий пустой контекст, и замер стоит одного вызова
+функции. Включенный профилировщик записывает каждый этап с временем начала,
+длительностью и потоком; итог выводится строкой для строки состояния или
+сохраняется как трасса Chrome (chrome://tracing, https://ui.perfetto.dev).
+
+Этапы:
+    load        - чтение исходных данных (Excel, хранилище);
+    convert     - преобразование таблиц в словари и проверка полноты;
+    build       - построение модели (выражения PuLP, матрицы, модель HiGHS);
+    solve       - решение; для решателей PuLP внутри отмечаются запись файла
+                  модели (solve.write) и чтение файла решения (solve.parse),
+                  остальное время - работа внешней программы;
+    extract     - сбор результата (план, теневые цены, отчет).
+
+Включение:
+    with profiling.profile() as profiler:
+        ...
+    print(profiler.summary())
+    profiler.save_trace('trace.json')
+
+Из командной строки - ключ --profile файла harvesting.py или переменная
+окружения OPERATIONS_TRACE с путем к файлу трассы (lab3.py, lab4.py).
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Переменная окружения с путем к файлу трассы для session()
+TRACE_ENV = 'OPERATIONS_TRACE'
+
+STAGE_LABELS = {
+    'load': "загрузка",
+    'convert': "подготовка",
+    'build': "построение",
+    'solve': "решение",
+    'solve.write': "запись модели",
+    'solve.parse': "чтение решения",
+    'extract': "результат",
+}
+
+_NULL = contextlib.nullcontext()
+_active = None
+
+
+class Profiler:
+    """Журнал этапов расчета; пополнение журнала безопасно из нескольких потоков"""
+
+    def __init__(self):
+        self.events = []  # (этап, начало, длительность, поток)
+        self.origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # list.append атомарен, отдельная блокировка не нужна
+            self.events.append((name, start, time.perf_counter() - start, threading.get_ident()))
+
+    def clear(self):
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def totals(self):
+        """Суммарное время по этапам в порядке первого появления"""
+        totals = {}
+        for name, _, duration, _ in sorted(self.events, key=lambda event: event[1]):
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def summary(self):
+        """Строка вида "загрузка 0.05 с | решение 1.20 с (запись модели 0.30 с)" """
+        totals = self.totals()
+        parts = []
+        for name, total in totals.items():
+            if '.' in name:
+                continue
+            text = f"{STAGE_LABELS.get(name, name)} {total:.2f} с"
+            children = [f"{STAGE_LABELS.get(child, child)} {value:.2f} с"
+                        for child, value in totals.items() if child.startswith(name + '.')]
+            if children:
+                text += f" ({', '.join(children)})"
+            parts.append(text)
+        return " | ".join(parts)
+
+    def chrome_trace(self):
+        """Журнал в формате Chrome Trace Event (события 'X' с временем в микросекундах)"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': os.path.basename(sys.argv[0]) or 'python'}}]
+        for name, start, duration, tid in self.events:
+            events.append({
+                'name': STAGE_LABELS.get(name, name),
+                'cat': name.split('.')[0],
+                'ph': 'X',
+                'ts': (start - self.origin) * 1e6,
+                'dur': duration * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': {'stage': name},
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_trace(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+
+def stage(name):
+    """Контекст этапа name; без включенного профилировщика - пустой контекст"""
+    profiler = _active
+    if profiler is None:
+        return _NULL
+    return profiler.stage(name)
+
+
+def enabled():
+    return _active is not None
+
+
+def enable(profiler=None):
+    """Включает профилировщик (новый, если не передан) и возвращает его"""
+    global _active
+    _active = profiler if profiler is not None else Profiler()
+    return _active
+
+
+def disable():
+    """Выключает профилировщик и возвращает его"""
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+@contextlib.contextmanager
+def profile(profiler=None):
+    """Включает профилировщик на время блока with и возвращает его"""
+    global _active
+    previous = _active
+    profiler = enable(profiler)
+    try:
+        yield profiler
+    finally:
+        _active = previous
+
+
+@contextlib.contextmanager
+def session(trace_path=None):
+    """Замер для запуска из командной строки
+
+    Путь к трассе берется из аргумента или переменной окружения OPERATIONS_TRACE;
+    без пути замер не ведется. По окончании трасса сохраняется, а итог по
+    этапам выводится в stderr.
+    """
+    trace_path = trace_path or os.environ.get(TRACE_ENV)
+    if not trace_path:
+        yield None
+        return
+    with profile() as profiler:
+        try:
+            yield profiler
+        finally:
+            profiler.save_trace(trace_path)
+            print(f"Этапы: {profiler.summary()}\nТрасса: {trace_path}", file=sys.stderr)
+
+
+def traced(func, name):
+    """Обертка функции, отмечающая каждый ее вызов как этап name"""
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    wrapper.stage = name
+    return wrapper
+
+
+def instrument_pulp(prob, solver):
+    """Отмечает запись файла модели и чтение файла решения внутри решателя PuLP
+
+    Методы подменяются только у переданных объектов и только при включенном
+    профилировщике; повторный вызов для той же модели ее не меняет.
+    """
+    if _active is None:
+        return
+    for obj, names, name in ((prob, ('writeMPS', 'writeLP'), 'solve.write'),
+                             (solver, ('readsol_MPS', 'readsol'), 'solve.parse')):
+        for attr in names:
+            method = getattr(obj, attr, None)
+            if method is not None and getattr(method, 'stage', None) != name:
+                setattr(obj, attr, traced(method, name))
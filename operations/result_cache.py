@@ -0,0 +1,286 @@
+"""Кэш результатов расчета по содержимому исходных данных и сравнение планов.
+
+Ключ - SHA-256 канонического представления исходных таблиц и параметров
+решения: числа приводятся к float (10 и 10.0 дают один ключ), столбцы
+DataFrame упорядочиваются по имени, словари - по ключам. Порядок строк
+учитывается: от него зависит, какая из повторяющихся строк берется.
+
+Результаты хранятся сериализованными (pickle): попадание в кэш возвращает
+новую копию, которую можно менять, не портя кэш. Память ограничена числом
+записей и объемом, вытесняются давно не использованные (LRU). Необязательный
+второй уровень - каталог на диске, переживающий перезапуск программы.
+Читать стоит только свой каталог кэша: pickle исполняет код при загрузке.
+
+Сравнение планов (diff_plans) показывает, какие перевозки x[j, t] или
+x[(i, j)] изменились между двумя решениями.
+"""
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+
+def _feed(digest, obj):
+    """Добавляет в хэш каноническое представление объекта"""
+    if isinstance(obj, pd.DataFrame):
+        digest.update(b'D%d' % len(obj))
+        for col in sorted(obj.columns, key=str):
+            series = obj[col]
+            numeric = pd.to_numeric(series, errors='coerce')
+            if numeric.isna().equals(series.isna()):
+                # -0.0 и 0.0 дают один хэш
+                values = numeric.astype('float64') + 0.0
+            else:
+                values = series.astype(str)
+            digest.update(str(col).encode('utf-8') + b'\0')
+            digest.update(pd.util.hash_pandas_object(values, index=False).values.tobytes())
+    elif isinstance(obj, pd.Series):
+        _feed(digest, obj.to_frame(name=''))
+    elif isinstance(obj, np.ndarray):
+        digest.update(b'A' + repr(obj.shape).encode('ascii'))
+        if obj.dtype.kind in 'biuf':
+            digest.update(np.ascontiguousarray(obj, dtype=np.float64).tobytes())
+        else:
+            _feed(digest, obj.tolist())
+    elif isinstance(obj, dict):
+        digest.update(b'M%d' % len(obj))
+        for key in sorted(obj, key=repr):
+            _feed(digest, key)
+            _feed(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'L%d' % len(obj))
+        for item in obj:
+            _feed(digest, item)
+    elif isinstance(obj, (bool, np.bool_)) or obj is None:
+        digest.update(repr(obj if obj is None else bool(obj)).encode('ascii'))
+    elif isinstance(obj, (int, float, np.integer, np.floating)):
+        digest.update(b'F' + repr(float(obj) + 0.0).encode('ascii'))
+    else:
+        digest.update(b'S' + str(obj).encode('utf-8') + b'\0')
+
+
+def result_key(data, **options):
+    """Ключ кэша: хэш исходных данных (таблицы, массивы, словари) и параметров решения"""
+    digest = hashlib.sha256(b'v%d' % CACHE_VERSION)
+    _feed(digest, data)
+    _feed(digest, options)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Кэш результатов с вытеснением LRU и необязательным уровнем на диске
+
+    max_entries и max_bytes ограничивают память; disk_dir - каталог второго
+    уровня (None - только память), disk_max_bytes - его объем. Методы
+    безопасны при вызове из нескольких потоков.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=256 * 2 ** 20, disk_dir=None, disk_max_bytes=2 ** 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()  # ключ -> сериализованный результат
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.disk_dir is not None and os.path.exists(self._disk_file(key)))
+
+    def _disk_file(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _remember(self, key, payload):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = payload
+        self._size += len(payload)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, key, default=None):
+        """Результат по ключу (новая копия) или default"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(payload)
+        payload = self._read_disk(key)
+        if payload is None:
+            self.misses += 1
+            return default
+        with self._lock:
+            self._remember(key, payload)
+            self.disk_hits += 1
+        return pickle.loads(payload)
+
+    def put(self, key, result):
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, payload)
+        self._write_disk(key, payload)
+
+    def get_or_compute(self, key, compute, store=lambda result: True):
+        """Результат из кэша или compute(); в кэш попадают только результаты, для которых store() истинно
+
+        Возвращает пару (результат, взят ли он из кэша).
+        """
+        result = self.get(key)
+        if result is not None:
+            return result, True
+        result = compute()
+        if store(result):
+            self.put(key, result)
+        return result, False
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if disk and self.disk_dir is not None and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_file(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            os.utime(path)  # время изменения - отметка последнего использования для вытеснения
+            return payload
+        except OSError:
+            return None
+
+    def _write_disk(self, key, payload):
+        if self.disk_dir is None or len(payload) > self.disk_max_bytes:
+            return
+        path = self._disk_file(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError:
+            # Диск - только ускорение: ошибка записи не мешает расчету
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict_disk(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def plan_flows(result):
+    """Перевозки решения в виде словаря {ключ: объем}
+
+    Понимает план лесозаготовки ('plan' с ключами (участок, месяц)), матрицу
+    перевозок NumPy (ключи (i, j)) и результат lab4 с матрицами 'x' и 'y'
+    (ключи ('x', i, j) и ('y', i, j)).
+    """
+    if isinstance(result, np.ndarray):
+        rows, cols = np.nonzero(result)
+        return {(int(i), int(j)): float(result[i, j]) for i, j in zip(rows, cols)}
+    if 'plan' in result and isinstance(result['plan'], dict):
+        return result['plan']
+    if 'x' in result and 'y' in result:
+        flows = {}
+        for name in ('x', 'y'):
+            for i, row in enumerate(result[name] or []):
+                for j, value in enumerate(row):
+                    if value:
+                        flows[(name, i, j)] = value
+        return flows
+    raise ValueError("Неизвестный формат результата для сравнения планов")
+
+
+def diff_plans(old, new, tol=1e-6):
+    """Сравнивает два решения: изменившиеся перевозки и значение целевой функции
+
+    old и new - результаты решения (см. plan_flows) или словари перевозок.
+    Отсутствующая в плане перевозка считается нулевой. Возвращает словарь:
+    'changes' - список (ключ, было, стало), упорядоченный по убыванию
+    модуля изменения; 'added' и 'removed' - число перевозок, появившихся и
+    обнуленных в новом плане; 'objective' - пара (было, стало) или None.
+    """
+    old_flows = old if _is_flows(old) else plan_flows(old)
+    new_flows = new if _is_flows(new) else plan_flows(new)
+    changes = []
+    added = removed = 0
+    for key in old_flows.keys() | new_flows.keys():
+        before = old_flows.get(key) or 0.0
+        after = new_flows.get(key) or 0.0
+        if abs(after - before) <= tol * max(1.0, abs(before)):
+            continue
+        changes.append((key, before, after))
+        added += abs(before) <= tol
+        removed += abs(after) <= tol
+    changes.sort(key=lambda change: (-abs(change[2] - change[1]), repr(change[0])))
+
+    objective = None
+    if not _is_flows(old) and not _is_flows(new) and isinstance(old, dict) and isinstance(new, dict):
+        names = ('objective', 'cost')
+        objective = next(((old[name], new[name]) for name in names if name in old and name in new), None)
+    return {'changes': changes, 'added': added, 'removed': removed, 'objective': objective}
+
+
+def _is_flows(obj):
+    # Словарь перевозок: ключи - кортежи, а не поля результата
+    return isinstance(obj, dict) and all(isinstance(key, tuple) for key in obj)
+
+
+def _format_key(key, name):
+    if len(key) == 3 and isinstance(key[0], str):
+        name, key = key[0], key[1:]
+    return f"{name}[{', '.join(map(str, key))}]"
+
+
+def format_plan_diff(diff, name='x', limit=50):
+    """Текстовый отчет об изменениях плана (не больше limit строк перевозок)"""
+    lines = []
+    if diff['objective'] is not None:
+        before, after = diff['objective']
+        if before is not None and after is not None:
+            lines.append(f"Целевая функция: {before:.2f} -> {after:.2f} ({after - before:+.2f})")
+    changes = diff['changes']
+    if not changes:
+        lines.append("План не изменился")
+        return "\n".join(lines) + "\n"
+    lines.append(f"Изменений плана: {len(changes)} (новых {diff['added']}, "
+                 f"обнуленных {diff['removed']})")
+    for key, before, after in changes[:limit]:
+        lines.append(f"  {_format_key(key, name)}: {before:.2f} -> {after:.2f} ({after - before:+.2f})")
+    if len(changes) > limit:
+        lines.append(f"  ... и еще {len(changes) - limit}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,273 @@
+"""Многолетнее планирование лесозаготовки со скользящим горизонтом.
+
+Горизонт из нескольких лет разбивается на перекрывающиеся окна (например,
+окно 24 месяца с шагом 12). Каждое окно решается как задача линейного
+программирования, из его плана фиксируются только первые step периодов,
+а остаток площади участков с учетом восстановления переносится в следующее
+окно. Решение предыдущего окна передается в HiGHS как начальная точка.
+
+Размер одной задачи ограничен окном, поэтому память и время решения растут
+линейно с длиной горизонта, а не как у одной модели на весь горизонт.
+
+Запуск из командной строки:
+    python rolling.py lesozagotovka.xlsx --years 10 --window 24 --step 12
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pulp
+from scipy import sparse
+from scipy.optimize import linprog
+
+from harvesting import SITE_COL, EPS, highspy, load_tables, tables_to_dicts_fast
+
+MONTHS_PER_YEAR = 12
+
+# Необязательный лист Excel файла с восстановлением площади участков
+REGROWTH_SHEET = 'Восстановление'
+REGROWTH_COL = 'Восстановление (га/мес)'
+
+
+def period_label(p):
+    """Год и месяц периода горизонта (периоды нумеруются с 1, по 12 в году)"""
+    return (p - 1) // MONTHS_PER_YEAR + 1, (p - 1) % MONTHS_PER_YEAR + 1
+
+
+def expand_years(c, a, b, years):
+    """Повторяет годовые данные (месяцы 1..12) на years лет
+
+    Период p = 12 * (год - 1) + месяц. Возвращает словари c, a, b по периодам.
+    """
+    c_h, a_h, b_h = {}, {}, {}
+    for y in range(years):
+        shift = y * MONTHS_PER_YEAR
+        c_h.update({(j, t + shift): value for (j, t), value in c.items()})
+        a_h.update({(j, t + shift): value for (j, t), value in a.items()})
+        b_h.update({t + shift: value for t, value in b.items()})
+    return c_h, a_h, b_h
+
+
+def _window_matrices(keys, periods, sites, c, a, b, remaining, regrowth, start):
+    """Матричная форма задачи одного окна, начинающегося с месяца start
+
+    Столбцы - пары (участок, период) окна. Строки: ресурсы каждого периода,
+    затем для каждого участка и периода окна накопленная заготовка с начала
+    окна не больше остатка площади плюс восстановление к этому периоду.
+    """
+    n_periods = len(periods)
+    offset = {p: k for k, p in enumerate(periods)}
+    site_index = {j: k for k, j in enumerate(sites)}
+    site = np.fromiter((site_index[j] for j, _ in keys), dtype=np.int64, count=len(keys))
+    off = np.fromiter((offset[p] for _, p in keys), dtype=np.int64, count=len(keys))
+
+    # Столбец периода k входит в строку ресурсов k и в строки площади участка k..n-1
+    counts = 1 + n_periods - off
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    col = np.repeat(np.arange(len(keys)), counts)
+    pos = np.arange(indptr[-1]) - indptr[:-1][col]
+    indices = np.where(pos == 0, off[col], n_periods + site[col] * n_periods + off[col] + pos - 1)
+    labor = np.fromiter((a[key] for key in keys), dtype=float, count=len(keys))
+    values = np.where(pos == 0, labor[col], 1.0)
+    n_rows = n_periods + len(sites) * n_periods
+    A = sparse.csc_matrix((values, indices, indptr), shape=(n_rows, len(keys)))
+
+    elapsed = np.array(periods, dtype=float) - start
+    area = (np.array([remaining[j] for j in sites])[:, None]
+            + np.array([regrowth.get(j, 0.0) for j in sites])[:, None] * elapsed[None, :])
+    upper = np.concatenate([[b[p] for p in periods], area.ravel()])
+    cost = np.fromiter((c[key] for key in keys), dtype=float, count=len(keys))
+    return cost, A, upper
+
+
+def _solve_window_highspy(cost, A, upper, start=None, msg=False):
+    """Решает задачу окна через highspy; start - начальная точка (значения столбцов)"""
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', bool(msg))
+    # Прямой симплекс-метод: план x = 0 допустим, как и в HarvestingModel
+    h.setOptionValue('simplex_strategy', 4)
+    inf = highspy.kHighsInf
+    n_rows, n_cols = A.shape
+    h.addRows(n_rows, np.full(n_rows, -inf), upper, 0,
+              np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+    h.addCols(n_cols, cost, np.zeros(n_cols), np.full(n_cols, inf),
+              A.nnz, A.indptr[:-1].astype(np.int32), A.indices.astype(np.int32), A.data)
+    h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+    if start is not None:
+        solution = highspy.HighsSolution()
+        solution.col_value = start
+        solution.value_valid = True
+        h.setSolution(solution)
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        return None, h.getInfo().simplex_iteration_count
+    return np.asarray(h.getSolution().col_value), h.getInfo().simplex_iteration_count
+
+
+def _solve_window_scipy(cost, A, upper, start=None, msg=False):
+    """Решает задачу окна через scipy.optimize.linprog (без начальной точки)"""
+    res = linprog(-cost, A_ub=A, b_ub=upper, bounds=(0, None), method='highs', options={'disp': bool(msg)})
+    if res.status != 0:
+        return None, getattr(res, 'nit', 0)
+    return res.x, res.nit
+
+
+def plan_rolling(c, a, b, b_j, regrowth=None, window=24, step=12, warm_start=True, msg=False):
+    """Планирует заготовку на горизонт скользящими окнами
+
+    c, a, b - доходы, трудозатраты и ресурсы по периодам горизонта (см.
+    expand_years), b_j - начальная площадь участков, regrowth - площадь,
+    восстанавливающаяся на участке за месяц (га). Окно - window месяцев,
+    из его плана фиксируются первые step месяцев; window=None - весь
+    горизонт одной задачей. Возвращает словарь: status, status_name,
+    objective, plan {(участок, период): площадь}, remaining (остаток площади
+    в конце горизонта), periods, sites, windows (по окну: periods, objective,
+    iterations, solve_time) и solve_time.
+    """
+    periods = sorted(b)
+    sites = sorted(b_j)
+    if not periods or not sites:
+        raise ValueError("Недостаточно данных для расчета!")
+    if window is None:
+        window = step = periods[-1] - periods[0] + 1
+    if step < 1 or window < step:
+        raise ValueError("Шаг должен быть положительным и не больше окна")
+    regrowth = regrowth or {}
+    solve_window = _solve_window_highspy if highspy is not None else _solve_window_scipy
+
+    remaining = {j: float(b_j[j]) for j in sites}
+    plan = {}
+    windows = []
+    previous = {}
+    status = pulp.LpStatusOptimal
+    start_time = time.perf_counter()
+    first = 0  # номер первого периода окна в списке periods
+    for month in range(periods[0], periods[-1] + 1, step):
+        while first < len(periods) and periods[first] < month:
+            first += 1
+        last = first
+        while last < len(periods) and periods[last] < month + window:
+            last += 1
+        chunk = periods[first:last]
+        keys = [(j, p) for j in sites for p in chunk if (j, p) in c and (j, p) in a]
+        window_start = time.perf_counter()
+        harvested = dict.fromkeys(sites, 0.0)
+        if keys:
+            cost, A, upper = _window_matrices(keys, chunk, sites, c, a, b, remaining, regrowth, month)
+            start = [previous.get(key, 0.0) for key in keys] if warm_start and previous else None
+            x, iterations = solve_window(cost, A, upper, start, msg)
+            if x is None:
+                status = pulp.LpStatusNotSolved
+                break
+
+            # Фиксируются первые step месяцев окна, остальные будут пересчитаны в следующем окне
+            fixed = np.fromiter((p < month + step for _, p in keys), dtype=bool, count=len(keys))
+            x = np.where(x > EPS, x, 0.0)
+            for key, value in zip((key for key, f in zip(keys, fixed) if f), x[fixed].tolist()):
+                if value > 0:
+                    plan[key] = value
+                    harvested[key[0]] += value
+            previous = dict(zip(keys, x.tolist()))
+            windows.append({
+                'periods': (month, min(month + window, periods[-1] + 1) - 1),
+                'objective': float(cost[fixed] @ x[fixed]),
+                'iterations': int(iterations),
+                'solve_time': time.perf_counter() - window_start,
+            })
+
+        # Остаток переносится на начало следующего окна (или на конец горизонта);
+        # меньше нуля он может стать только из-за погрешностей решателя
+        months = min(step, periods[-1] + 1 - month)
+        for j in sites:
+            remaining[j] = max(remaining[j] + regrowth.get(j, 0.0) * months - harvested[j], 0.0)
+
+    objective = sum(c[key] * value for key, value in plan.items())
+    return {
+        'status': status,
+        'status_name': pulp.LpStatus[status],
+        'objective': objective if status == pulp.LpStatusOptimal else None,
+        'plan': plan,
+        'remaining': remaining,
+        'periods': periods,
+        'sites': sites,
+        'windows': windows,
+        'solve_time': time.perf_counter() - start_time,
+    }
+
+
+def load_regrowth(file_path):
+    """Восстановление площади по участкам с листа 'Восстановление' (пустой словарь, если листа нет)"""
+    try:
+        df = pd.read_excel(file_path, sheet_name=REGROWTH_SHEET)
+    except ValueError:
+        return {}
+    values = pd.to_numeric(df[REGROWTH_COL], errors='coerce')
+    return {int(j): float(v) for j, v in zip(df[SITE_COL], values) if not pd.isna(v)}
+
+
+def format_rolling(result):
+    """Формирует текстовый отчет по многолетнему плану"""
+    if result['status'] != 1:
+        return f"Решение не найдено. Статус: {result['status']}\n"
+
+    lines = [f"Доход за горизонт: {result['objective']:.2f} тыс. руб.", "", "По годам:"]
+    years = dict.fromkeys(sorted({period_label(p)[0] for p in result['periods']}), 0.0)
+    for (j, p), value in result['plan'].items():
+        years[period_label(p)[0]] += value
+    for year, area in years.items():
+        lines.append(f"Год {year}: заготовлено {area:.2f} га")
+
+    lines.append("")
+    lines.append("Окна:")
+    for w in result['windows']:
+        (y0, m0), (y1, m1) = period_label(w['periods'][0]), period_label(w['periods'][1])
+        lines.append(f"Год {y0} мес. {m0} - год {y1} мес. {m1}: доход зафиксированной части "
+                     f"{w['objective']:.2f}, итераций {w['iterations']}, время {w['solve_time']:.3f} с")
+
+    lines.append("")
+    lines.append(f"Остаток площади в конце горизонта: {sum(result['remaining'].values()):.2f} га")
+    lines.append(f"Время расчета: {result['solve_time']:.3f} с")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Многолетний план лесозаготовки скользящими окнами")
+    parser.add_argument('file', nargs='?', default='lesozagotovka.xlsx', help="Excel файл с данными")
+    parser.add_argument('--years', type=int, default=5, help="длина горизонта в годах")
+    parser.add_argument('--window', type=int, default=24, help="длина окна в месяцах (0 - весь горизонт)")
+    parser.add_argument('--step', type=int, default=12, help="число месяцев, фиксируемых из каждого окна")
+    parser.add_argument('--regrowth', type=float, default=None,
+                        help="восстановление площади, га/мес, для всех участков "
+                             "(по умолчанию - лист 'Восстановление', если он есть)")
+    parser.add_argument('--json', action='store_true', help="вывести результат в формате JSON")
+    args = parser.parse_args(argv)
+
+    tables = load_tables(args.file)
+    c, a, b, b_j = tables_to_dicts_fast(tables['income'], tables['labor'], tables['resources'], tables['area'])
+    if args.regrowth is not None:
+        regrowth = dict.fromkeys(b_j, args.regrowth)
+    else:
+        regrowth = load_regrowth(args.file)
+    c, a, b = expand_years(c, a, b, args.years)
+    try:
+        result = plan_rolling(c, a, b, b_j, regrowth, window=args.window or None, step=args.step)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        data = dict(result)
+        data['plan'] = [{'site': j, 'period': p, 'area': v} for (j, p), v in sorted(result['plan'].items())]
+        data['remaining'] = {str(j): v for j, v in result['remaining'].items()}
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print(format_rolling(result), end='')
+    return 0 if result['status'] == 1 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Двухэтапная стохастическая модель лесозаготовки по сценариям доходов и трудозатрат.
+
+Первый этап - план заготовки x (га по участкам и месяцам) в пределах площадей
+участков; он принимается до того, как станут известны фактические доходы и
+трудозатраты. Второй этап - сценарий: доход плана считается по доходам
+сценария, а нехватка ресурсов месяца покрывается сверхурочными часами по
+цене overtime_cost. Ищется план с наибольшим ожидаемым доходом.
+
+Сценарии не хранятся все сразу: они порождаются пакетами по chunk_size из
+генератора с зерном (seed, номер пакета), поэтому любой пакет можно получить
+заново в любом процессе. Модель решается L-методом (декомпозиция Бендерса):
+главная задача содержит только план и по одной оценке затрат на сверхурочные
+на месяц, а значения и субградиенты затрат считаются по пакетам сценариев
+векторно, при workers > 1 - в пуле процессов. Расширенная модель на все
+сценарии не строится, память ограничена размером пакета.
+
+Кроме плана вычисляются ожидаемый доход при полной информации (каждый сценарий
+решается отдельно), ожидаемая ценность полной информации (EVPI) и ценность
+стохастического решения (VSS) относительно плана по средним данным.
+
+Запуск из командной строки:
+    python stochastic.py lesozagotovka.xlsx --scenarios 1000 --workers 4
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pulp
+from scipy import sparse
+from scipy.optimize import linprog
+
+from harvesting import EPS, highspy, load_tables, tables_to_dicts_fast
+
+# Число сценариев в одном пакете: ограничивает память на пакет (2 x chunk_size x число пар)
+CHUNK_SIZE = 100
+
+
+def make_base(c, a, b, b_j, n_scenarios=100, cv_income=0.2, cv_labor=0.1, seed=0,
+              overtime_cost=None, chunk_size=CHUNK_SIZE):
+    """Описание задачи и генератора сценариев в виде массивов (годится для передачи в процессы)
+
+    Доходы и трудозатраты сценария - базовые значения, умноженные на
+    независимые логнормальные множители со средним 1 и коэффициентами
+    вариации cv_income и cv_labor. Цена сверхурочного часа по умолчанию -
+    полторы наибольших отдачи часа (доход / трудозатраты) по базовым данным.
+    """
+    keys = sorted(key for key in c if key in a and key[0] in b_j and key[1] in b)
+    if not keys:
+        raise ValueError("Нет данных для расчета целевой функции!")
+    months = sorted(b)
+    sites = sorted(b_j)
+    month_index = {t: k for k, t in enumerate(months)}
+    site_index = {j: k for k, j in enumerate(sites)}
+    income = np.array([c[key] for key in keys], dtype=float)
+    labor = np.array([a[key] for key in keys], dtype=float)
+    if overtime_cost is None:
+        with np.errstate(divide='ignore'):
+            overtime_cost = 1.5 * float(np.max(np.where(labor > 0, income / labor, 0.0)))
+    return {
+        'keys': keys,
+        'months': months,
+        'sites': sites,
+        'income': income,
+        'labor': labor,
+        'month_idx': np.array([month_index[t] for _, t in keys]),
+        'site_idx': np.array([site_index[j] for j, _ in keys]),
+        'resources': np.array([b[t] for t in months], dtype=float),
+        'area': np.array([b_j[j] for j in sites], dtype=float),
+        'n_scenarios': int(n_scenarios),
+        'chunk_size': int(chunk_size),
+        'cv_income': float(cv_income),
+        'cv_labor': float(cv_labor),
+        'seed': int(seed),
+        'overtime_cost': float(overtime_cost),
+    }
+
+
+def _lognormal(rng, cv, shape):
+    """Множители со средним 1 и коэффициентом вариации cv"""
+    if cv <= 0:
+        return np.ones(shape)
+    sigma2 = np.log1p(cv * cv)
+    return np.exp(np.sqrt(sigma2) * rng.standard_normal(shape) - sigma2 / 2)
+
+
+def scenario_chunk(base, chunk):
+    """Доходы и трудозатраты пакета сценариев chunk: две матрицы (сценарий x пара)"""
+    size = min(base['chunk_size'], base['n_scenarios'] - chunk * base['chunk_size'])
+    rng = np.random.default_rng([base['seed'], chunk])
+    n = len(base['keys'])
+    income = base['income'] * _lognormal(rng, base['cv_income'], (size, n))
+    labor = base['labor'] * _lognormal(rng, base['cv_labor'], (size, n))
+    return income, labor
+
+
+def _chunks(base):
+    return range(-(-base['n_scenarios'] // base['chunk_size']))
+
+
+def _recourse(base, labor, x):
+    """Сверхурочные часы по сценариям и месяцам и признак нехватки ресурсов"""
+    n = len(base['keys'])
+    months = sparse.csr_matrix((np.ones(n), (np.arange(n), base['month_idx'])), shape=(n, len(base['months'])))
+    usage = np.asarray((months.T @ (labor * x).T).T)
+    overtime = usage - base['resources']
+    return np.maximum(overtime, 0.0), overtime > 0
+
+
+def _evaluate_chunk(args):
+    """Сумма по пакету сценариев: доход плана x, сверхурочные по месяцам и их субградиент
+
+    Субградиент сверхурочных месяца t по x[j, t] - трудозатраты пары в
+    сценариях, где ресурсов месяца не хватило. Функция годится для пула процессов.
+    """
+    base, chunk, x = args
+    income, labor = scenario_chunk(base, chunk)
+    overtime, short = _recourse(base, labor, x)
+    profit = float((income @ x).sum() - base['overtime_cost'] * overtime.sum())
+    gradient = (labor * short[:, base['month_idx']]).sum(axis=0)
+    return profit, overtime.sum(axis=0), gradient, income.sum(axis=0)
+
+
+def _scenario_matrices(base):
+    """Матрица задачи одного сценария: столбцы - пары и сверхурочные по месяцам
+
+    Строки: ресурсы по месяцам (трудозатраты минус сверхурочные), затем
+    площади участков. Трудозатраты стоят в data[0::2] столбцов пар.
+    """
+    n, n_months, n_sites = len(base['keys']), len(base['months']), len(base['sites'])
+    indices = np.empty(2 * n + n_months, dtype=np.int32)
+    indices[0:2 * n:2] = base['month_idx']
+    indices[1:2 * n:2] = n_months + base['site_idx']
+    indices[2 * n:] = np.arange(n_months)
+    data = np.ones(2 * n + n_months)
+    data[0:2 * n:2] = base['labor']
+    data[2 * n:] = -1.0
+    indptr = np.concatenate([np.arange(0, 2 * n + 1, 2), 2 * n + np.arange(1, n_months + 1)])
+    A = sparse.csc_matrix((data, indices, indptr), shape=(n_months + n_sites, n + n_months))
+    upper = np.concatenate([base['resources'], base['area']])
+    return A, upper
+
+
+def _solve_scenarios(base, income, labor):
+    """Оптимальный доход задачи с известными доходами и трудозатратами для каждой строки income, labor
+
+    Возвращает массив доходов и план последней задачи. При установленном
+    highspy решение каждого сценария начинается с базиса предыдущего.
+    """
+    A, upper = _scenario_matrices(base)
+    n, n_months = len(base['keys']), len(base['months'])
+    penalty = np.full(n_months, -base['overtime_cost'])
+    objectives = np.empty(income.shape[0])
+    x = None
+    if highspy is None:
+        for k in range(income.shape[0]):
+            A.data[0:2 * n:2] = labor[k]
+            res = linprog(-np.concatenate([income[k], penalty]), A_ub=A, b_ub=upper, bounds=(0, None),
+                          method='highs')
+            objectives[k] = -res.fun
+            x = res.x[:n]
+        return objectives, x
+
+    inf = highspy.kHighsInf
+    basis = None
+    for k in range(income.shape[0]):
+        # Модель собирается заново одним пакетом (это быстрее поэлементной замены
+        # трудозатрат), а решение начинается с базиса предыдущего сценария
+        A.data[0:2 * n:2] = labor[k]
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        h.addRows(len(upper), np.full(len(upper), -inf), upper, 0,
+                  np.array([], dtype=np.int32), np.array([], dtype=np.int32), np.array([], dtype=float))
+        h.addCols(n + n_months, np.concatenate([income[k], penalty]), np.zeros(n + n_months),
+                  np.full(n + n_months, inf), A.nnz, A.indptr[:-1].astype(np.int32),
+                  A.indices.astype(np.int32), A.data)
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+        if basis is not None:
+            h.setBasis(basis)
+        h.run()
+        objectives[k] = h.getInfo().objective_function_value
+        basis = h.getBasis()
+    x = np.asarray(h.getSolution().col_value[:n])
+    return objectives, x
+
+
+def _wait_and_see_chunk(args):
+    """Сумма оптимальных доходов сценариев пакета (каждый сценарий решается отдельно)"""
+    base, chunk = args
+    income, labor = scenario_chunk(base, chunk)
+    return float(_solve_scenarios(base, income, labor)[0].sum())
+
+
+class _Master:
+    """Главная задача L-метода: план x и оценки phi_t ожидаемых сверхурочных по месяцам
+
+    max  c_mean x - q sum_t phi_t
+    при  sum_t x[j, t] <= площадь участка j,
+         phi_t >= f_t(x_k) + g_t(x_k) (x - x_k) для всех добавленных отсечений.
+    """
+
+    def __init__(self, base, income_mean):
+        self.base = base
+        self.n = len(base['keys'])
+        self.n_months = len(base['months'])
+        self.cost = np.concatenate([income_mean, np.full(self.n_months, -base['overtime_cost'])])
+        area = sparse.csr_matrix((np.ones(self.n), (base['site_idx'], np.arange(self.n))),
+                                 shape=(len(base['sites']), self.n + self.n_months))
+        self.rows = [area]
+        self.upper = [base['area']]
+        self._highs = None
+        if highspy is not None:
+            h = highspy.Highs()
+            h.setOptionValue('output_flag', False)
+            inf = highspy.kHighsInf
+            h.addCols(len(self.cost), self.cost, np.zeros(len(self.cost)), np.full(len(self.cost), inf),
+                      0, np.zeros(len(self.cost), dtype=np.int32), np.array([], dtype=np.int32),
+                      np.array([], dtype=float))
+            h.addRows(area.shape[0], np.full(area.shape[0], -inf), base['area'], area.nnz,
+                      area.indptr[:-1].astype(np.int32), area.indices.astype(np.int32), area.data)
+            h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+            self._highs = h
+
+    def add_cut(self, t, value, gradient, x):
+        """Отсечение месяца t: g x - phi_t <= g x_k - f_t (g - субградиент по парам месяца t)"""
+        cols = np.flatnonzero(self.base['month_idx'] == t)
+        coefs = np.concatenate([gradient[cols], [-1.0]])
+        cols = np.concatenate([cols, [self.n + t]])
+        rhs = float(gradient[cols[:-1]] @ x[cols[:-1]] - value)
+        if self._highs is not None:
+            self._highs.addRow(-highspy.kHighsInf, rhs, len(cols), cols.astype(np.int32), coefs)
+        else:
+            self.rows.append(sparse.csr_matrix((coefs, (np.zeros(len(cols), dtype=int), cols)),
+                                               shape=(1, len(self.cost))))
+            self.upper.append([rhs])
+
+    def solve(self):
+        """Решает главную задачу; возвращает план x и верхнюю оценку ожидаемого дохода"""
+        if self._highs is not None:
+            h = self._highs
+            h.run()
+            values = np.asarray(h.getSolution().col_value)
+            return values[:self.n], h.getInfo().objective_function_value
+        res = linprog(-self.cost, A_ub=sparse.vstack(self.rows), b_ub=np.concatenate(self.upper),
+                      bounds=(0, None), method='highs')
+        return res.x[:self.n], -res.fun
+
+
+def plan_stochastic(c, a, b, b_j, n_scenarios=100, cv_income=0.2, cv_labor=0.1, seed=0, overtime_cost=None,
+                    workers=1, chunk_size=CHUNK_SIZE, tol=1e-4, max_iter=200):
+    """Ищет план с наибольшим ожидаемым доходом по n_scenarios сценариям
+
+    Возвращает словарь:
+        status, status_name - 1 (Optimal), если разрыв между оценками меньше tol;
+        objective - ожидаемый доход найденного плана (RP), upper_bound - верхняя оценка;
+        plan - {(участок, месяц): площадь}, expected_overtime - {месяц: часы};
+        wait_and_see - ожидаемый доход при полной информации (WS), evpi = WS - RP;
+        expected_value_objective - ожидаемый доход плана по средним данным (EEV), vss = RP - EEV;
+        iterations, n_scenarios, overtime_cost, months, sites, solve_time.
+    """
+    start_time = time.perf_counter()
+    base = make_base(c, a, b, b_j, n_scenarios, cv_income, cv_labor, seed, overtime_cost, chunk_size)
+    n = len(base['keys'])
+    chunks = list(_chunks(base))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run = pool.map if pool is not None else map
+    try:
+        def evaluate(x):
+            # Ожидаемые доход, сверхурочные по месяцам, их субградиент и средние доходы пар
+            results = list(run(_evaluate_chunk, [(base, chunk, x) for chunk in chunks]))
+            return tuple(sum(parts) / n_scenarios for parts in zip(*results))
+
+        # Средние доходы по сценариям - коэффициенты целевой функции главной задачи
+        _, _, _, income_mean = evaluate(np.zeros(n))
+        master = _Master(base, income_mean)
+
+        best_value, best_x, best_overtime = -np.inf, None, None
+        upper_bound = np.inf
+        status = pulp.LpStatusNotSolved
+        for iteration in range(1, max_iter + 1):
+            x, upper_bound = master.solve()
+            value, overtime, gradient, _ = evaluate(x)
+            if value > best_value:
+                best_value, best_x, best_overtime = value, x, overtime
+            if upper_bound - best_value <= tol * max(1.0, abs(upper_bound)):
+                status = pulp.LpStatusOptimal
+                break
+            for t in range(len(base['months'])):
+                master.add_cut(t, overtime[t], gradient, x)
+
+        # План по средним данным и его ожидаемый доход на тех же сценариях
+        _, mean_x = _solve_scenarios(base, base['income'][None, :], base['labor'][None, :])
+        expected_value_objective = evaluate(mean_x)[0]
+        wait_and_see = sum(run(_wait_and_see_chunk, [(base, chunk) for chunk in chunks])) / n_scenarios
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best_x = np.where(best_x > EPS, best_x, 0.0)
+    return {
+        'status': status,
+        'status_name': pulp.LpStatus[status],
+        'objective': best_value,
+        'upper_bound': upper_bound,
+        'plan': dict(zip(base['keys'], best_x.tolist())),
+        'expected_overtime': dict(zip(base['months'], best_overtime.tolist())),
+        'wait_and_see': wait_and_see,
+        'evpi': wait_and_see - best_value,
+        'expected_value_objective': expected_value_objective,
+        'vss': best_value - expected_value_objective,
+        'iterations': iteration,
+        'n_scenarios': n_scenarios,
+        'overtime_cost': base['overtime_cost'],
+        'months': base['months'],
+        'sites': base['sites'],
+        'solve_time': time.perf_counter() - start_time,
+    }
+
+
+def format_stochastic(result):
+    """Формирует текстовый отчет по стохастическому плану"""
+    lines = [
+        f"Сценариев: {result['n_scenarios']}, цена сверхурочного часа: {result['overtime_cost']:.4f} тыс. руб.",
+        f"Ожидаемый доход плана: {result['objective']:.2f} тыс. руб."
+        + ("" if result['status'] == 1 else f" (не сошлось, верхняя оценка {result['upper_bound']:.2f})"),
+        f"Ожидаемый доход при полной информации: {result['wait_and_see']:.2f} тыс. руб.",
+        f"Ожидаемая ценность полной информации (EVPI): {result['evpi']:.2f} тыс. руб.",
+        f"Ожидаемый доход плана по средним данным: {result['expected_value_objective']:.2f} тыс. руб.",
+        f"Ценность стохастического решения (VSS): {result['vss']:.2f} тыс. руб.",
+        "",
+        "План лесозаготовки:",
+    ]
+    found_plan = False
+    for (j, t), harvested_area in sorted(result['plan'].items(), key=lambda item: (item[0][1], item[0][0])):
+        if harvested_area > 0.001:
+            lines.append(f"Месяц {t}, участок {j}: {harvested_area:.2f} га")
+            found_plan = True
+    if not found_plan:
+        lines.append("Нет активных планов заготовки")
+
+    lines.append("")
+    lines.append("Ожидаемые сверхурочные (по месяцам):")
+    for t, hours in result['expected_overtime'].items():
+        lines.append(f"Месяц {t}: {hours:.2f} ч")
+    lines.append("")
+    lines.append(f"Итераций: {result['iterations']}, время: {result['solve_time']:.3f} с")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Стохастический план лесозаготовки по сценариям")
+    parser.add_argument('file', nargs='?', default='lesozagotovka.xlsx', help="Excel файл с данными")
+    parser.add_argument('--scenarios', type=int, default=100, help="число сценариев")
+    parser.add_argument('--cv-income', type=float, default=0.2, help="коэффициент вариации доходов")
+    parser.add_argument('--cv-labor', type=float, default=0.1, help="коэффициент вариации трудозатрат")
+    parser.add_argument('--overtime-cost', type=float, default=None, help="цена сверхурочного часа, тыс. руб.")
+    parser.add_argument('--seed', type=int, default=0, help="зерно генератора сценариев")
+    parser.add_argument('--workers', type=int, default=1, help="число процессов для расчета сценариев")
+    parser.add_argument('--json', action='store_true', help="вывести результат в формате JSON")
+    args = parser.parse_args(argv)
+
+    tables = load_tables(args.file)
+    c, a, b, b_j = tables_to_dicts_fast(tables['income'], tables['labor'], tables['resources'], tables['area'])
+    try:
+        result = plan_stochastic(c, a, b, b_j, n_scenarios=args.scenarios, cv_income=args.cv_income,
+                                 cv_labor=args.cv_labor, seed=args.seed, overtime_cost=args.overtime_cost,
+                                 workers=args.workers)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        data = dict(result)
+        data['plan'] = [{'site': j, 'month': t, 'area': v} for (j, t), v in sorted(result['plan'].items())]
+        data['expected_overtime'] = {str(t): v for t, v in result['expected_overtime'].items()}
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        print(format_stochastic(result), end='')
+    return 0 if result['status'] == 1 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Хранилища таблиц задачи лесозаготовки.
+
+Основное хранилище - SQLite (модуль стандартной библиотеки) или каталог с
+файлами Parquet/Feather (нужен pyarrow). Каждая таблица хранится отдельно,
+поэтому при сохранении перезаписываются только изменившиеся таблицы.
+Excel используется только для импорта и экспорта.
+"""
+import hashlib
+import os
+import sqlite3
+
+import pandas as pd
+
+from harvesting import SHEETS
+
+# Таблицы задачи: income, labor, resources, area
+TABLES = tuple(SHEETS)
+
+
+def table_hash(df):
+    """Хэш содержимого таблицы; не зависит от того, хранится число как int или float"""
+    values = df.apply(pd.to_numeric, errors='coerce').astype('float64')
+    digest = hashlib.sha256(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(values, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def import_excel(file_path):
+    """Читает четыре таблицы из Excel файла"""
+    return {name: pd.read_excel(file_path, sheet_name=sheet) for name, sheet in SHEETS.items()}
+
+
+def export_excel(tables, file_path):
+    """Записывает четыре таблицы в Excel файл (листы Доход, Труд, Ресурсы, Площадь)"""
+    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+        for name, sheet in SHEETS.items():
+            tables[name].to_excel(writer, sheet_name=sheet, index=False)
+
+
+class SQLiteStore:
+    """Таблицы в одном файле SQLite, по одной SQL-таблице на таблицу задачи"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        with sqlite3.connect(self.path) as conn:
+            names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        return set(TABLES) <= names
+
+    def load(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return {name: pd.read_sql_query(f'SELECT * FROM "{name}"', conn) for name in TABLES}
+        finally:
+            conn.close()
+
+    def save(self, tables):
+        """Перезаписывает переданные таблицы в одной транзакции"""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                for name, df in tables.items():
+                    df.to_sql(name, conn, if_exists='replace', index=False)
+        finally:
+            conn.close()
+
+
+class FileStore:
+    """Таблицы в каталоге, по одному файлу Parquet или Feather на таблицу"""
+
+    readers = {'parquet': pd.read_parquet, 'feather': pd.read_feather}
+
+    def __init__(self, path, fmt='parquet'):
+        if fmt not in self.readers:
+            raise ValueError(f"Неизвестный формат хранилища: {fmt}")
+        self.path = path
+        self.fmt = fmt
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.{self.fmt}")
+
+    def exists(self):
+        return all(os.path.exists(self._file(name)) for name in TABLES)
+
+    def load(self):
+        return {name: self.readers[self.fmt](self._file(name)) for name in TABLES}
+
+    def save(self, tables):
+        """Записывает переданные таблицы; файл заменяется целиком только после успешной записи"""
+        os.makedirs(self.path, exist_ok=True)
+        for name, df in tables.items():
+            tmp = self._file(name) + '.tmp'
+            df = df.reset_index(drop=True)
+            if self.fmt == 'parquet':
+                df.to_parquet(tmp, index=False)
+            else:
+                df.to_feather(tmp)
+            os.replace(tmp, self._file(name))
+
+
+def open_store(path):
+    """Выбирает хранилище по расширению: .parquet и .feather - каталог файлов, иначе SQLite"""
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    if ext in FileStore.readers:
+        return FileStore(path, ext)
+    return SQLiteStore(path)
+
+
+class TableStore:
+    """Хранилище с учетом изменений: save пишет только таблицы, хэш которых изменился"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._hashes = {}
+
+    def exists(self):
+        return self.backend.exists()
+
+    def load(self):
+        tables = self.backend.load()
+        self._hashes = {name: table_hash(df) for name, df in tables.items()}
+        return tables
+
+    def save(self, tables, force=False):
+        """Сохраняет изменившиеся таблицы и возвращает список их имен"""
+        hashes = {name: table_hash(df) for name, df in tables.items()}
+        changed = [name for name in tables if force or self._hashes.get(name) != hashes[name]]
+        if changed:
+            self.backend.save({name: tables[name] for name in changed})
+            self._hashes.update({name: hashes[name] for name in changed})
+        return changed
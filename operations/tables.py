@@ -0,0 +1,132 @@
+"""Таблицы задачи лесозаготовки с доступом по ключу (участок, месяц).
+
+Строки хранятся в словаре ключ -> значение, поэтому поиск, вставка, замена и
+удаление строки стоят O(1), а не просмотр всей таблицы по маске. Для удаления
+всех строк участка или месяца ведутся вспомогательные индексы по каждому
+столбцу ключа. DataFrame для отображения и расчета собирается только по
+запросу и кэшируется до следующего изменения.
+"""
+import numpy as np
+import pandas as pd
+
+
+class KeyedTable:
+    """Таблица с ключом из одного или нескольких столбцов и числовым столбцом значений
+
+    Значения хранятся как float; отсутствующее значение - NaN.
+    """
+
+    def __init__(self, key_cols, value_col, df=None, on_change=None):
+        self.key_cols = tuple(key_cols)
+        self.value_col = value_col
+        self.on_change = on_change  # вызывается после каждого изменения
+        self.rows = {}
+        self._index = [{} for _ in self.key_cols]  # значение столбца ключа -> {ключ: None}
+        self._frame = None
+        if df is not None:
+            self.replace(df)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def keys(self):
+        return self.rows.keys()
+
+    def get(self, key, default=None):
+        return self.rows.get(key, default)
+
+    def _changed(self):
+        self._frame = None
+        if self.on_change is not None:
+            self.on_change()
+
+    def _add_to_index(self, key):
+        for index, part in zip(self._index, key):
+            index.setdefault(part, {})[key] = None
+
+    def _remove_from_index(self, key):
+        for index, part in zip(self._index, key):
+            keys = index[part]
+            del keys[key]
+            if not keys:
+                del index[part]
+
+    def _put(self, key, value):
+        if key not in self.rows:
+            self._add_to_index(key)
+        self.rows[key] = value
+
+    def upsert(self, key, value):
+        """Вставляет строку или заменяет значение существующей"""
+        self._put(tuple(key), value)
+        self._changed()
+
+    def update(self, items):
+        """Пакетная вставка/замена строк из пар (ключ, значение); DataFrame пересобирается один раз"""
+        for key, value in items:
+            self._put(tuple(key), value)
+        self._changed()
+
+    def delete(self, key):
+        """Удаляет строку; возвращает True, если она была"""
+        key = tuple(key)
+        if key not in self.rows:
+            return False
+        del self.rows[key]
+        self._remove_from_index(key)
+        self._changed()
+        return True
+
+    def keys_with(self, col, value):
+        """Ключи строк, у которых столбец ключа col равен value"""
+        return list(self._index[self.key_cols.index(col)].get(value, ()))
+
+    def values_with(self, col, value):
+        """Словарь {ключ: значение} строк, у которых столбец ключа col равен value"""
+        return {key: self.rows[key] for key in self.keys_with(col, value)}
+
+    def delete_with(self, col, value):
+        """Удаляет все строки, у которых столбец ключа col равен value"""
+        keys = self.keys_with(col, value)
+        for key in keys:
+            del self.rows[key]
+            self._remove_from_index(key)
+        if keys:
+            self._changed()
+        return len(keys)
+
+    def rekey(self, old_key, new_key):
+        """Меняет ключ строки, сохраняя ее место в таблице (требует пересборки словаря)"""
+        old_key, new_key = tuple(old_key), tuple(new_key)
+        if old_key not in self.rows or old_key == new_key:
+            return
+        if new_key in self.rows:
+            self._remove_from_index(new_key)
+            del self.rows[new_key]
+        self.rows = {new_key if key == old_key else key: value for key, value in self.rows.items()}
+        self._remove_from_index(old_key)
+        self._add_to_index(new_key)
+        self._changed()
+
+    def replace(self, df):
+        """Заменяет содержимое таблицы строками DataFrame (при повторах ключа берется последняя)"""
+        keys = zip(*(df[col].tolist() for col in self.key_cols))
+        values = pd.to_numeric(df[self.value_col], errors='coerce').astype('float64')
+        self.rows = dict(zip(keys, values.tolist()))
+        self._index = [{} for _ in self.key_cols]
+        for key in self.rows:
+            self._add_to_index(key)
+        self._changed()
+
+    @property
+    def frame(self):
+        """Таблица в виде DataFrame в порядке добавления строк"""
+        if self._frame is None:
+            keys = np.array(list(self.rows), dtype=np.int64).reshape(len(self.rows), len(self.key_cols))
+            data = {col: keys[:, k] for k, col in enumerate(self.key_cols)}
+            data[self.value_col] = np.fromiter(self.rows.values(), dtype=np.float64, count=len(self.rows))
+            self._frame = pd.DataFrame(data)
+        return self._frame
@@ -0,0 +1,327 @@
+"""Решение сбалансированной транспортной задачи методом потенциалов (MODI) на NumPy.
+
+Начальный опорный план строится методом северо-западного угла или методом
+Фогеля, затем улучшается методом потенциалов. Поддерживаются запрещенные
+клетки и фиксированные перевозки. Решение идет в текущем процессе, без
+сериализации модели и запуска внешнего решателя.
+"""
+from collections import deque
+
+import numpy as np
+
+TOL = 1e-9
+
+
+def _big_m(cost, allowed):
+    """Штраф для запрещенных клеток, заведомо больший любой экономии по циклу"""
+    m, n = cost.shape
+    scale = np.abs(cost[allowed]).max() if allowed.any() else 0.0
+    return 2.0 * (m + n) * (scale + 1.0)
+
+
+def northwest_corner(supply, demand):
+    """Начальный план методом северо-западного угла
+
+    Возвращает матрицу перевозок и список m + n - 1 базисных клеток
+    (в вырожденном случае часть из них имеет нулевую перевозку).
+    """
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    m, n = len(supply), len(demand)
+    flow = np.zeros((m, n))
+    basis = []
+    i = j = 0
+    while i < m and j < n:
+        q = min(supply[i], demand[j])
+        flow[i, j] = q
+        basis.append((i, j))
+        supply[i] -= q
+        demand[j] -= q
+        # При одновременном исчерпании вычеркивается только строка (кроме последней),
+        # чтобы в базисе было ровно m + n - 1 клеток
+        if supply[i] <= TOL and i < m - 1:
+            i += 1
+        else:
+            j += 1
+    return flow, basis
+
+
+def _two_smallest(values, axis):
+    """Номера и значения двух наименьших элементов по строкам (axis=1) или столбцам (axis=0)"""
+    idx = np.argpartition(values, 1, axis=axis)
+    idx = idx[:, :2] if axis == 1 else idx[:2, :].T
+    vals = np.take_along_axis(values, idx, axis=1) if axis == 1 else np.take_along_axis(values.T, idx, axis=1)
+    return idx, vals
+
+
+def vogel(cost, supply, demand, allowed=None):
+    """Начальный план методом Фогеля
+
+    Запрещенные клетки (allowed == False) выбираются только в крайнем случае.
+    Для каждой строки и столбца хранятся две наименьшие стоимости; после
+    вычеркивания линии пересчитываются только те, у которых она в них входила.
+    Возвращает матрицу перевозок и список m + n - 1 базисных клеток.
+    """
+    cost = np.asarray(cost, dtype=float)
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    m, n = cost.shape
+    if min(m, n) == 1:
+        # Единственный допустимый план совпадает с планом северо-западного угла
+        return northwest_corner(supply, demand)
+    if allowed is None:
+        allowed = np.ones((m, n), dtype=bool)
+    work = np.where(allowed, cost, _big_m(cost, allowed))
+
+    flow = np.zeros((m, n))
+    basis = []
+    rows = np.ones(m, dtype=bool)
+    cols = np.ones(n, dtype=bool)
+
+    row_idx, row_vals = _two_smallest(work, axis=1)
+    col_idx, col_vals = _two_smallest(work, axis=0)
+
+    def penalties(vals, active):
+        # Разность двух наименьших стоимостей; если осталась одна линия - ноль
+        with np.errstate(invalid='ignore'):
+            pen = np.where(np.isinf(vals[:, 1]), 0.0, vals[:, 1] - vals[:, 0])
+        pen[~active] = -1.0
+        return pen
+
+    while rows.sum() + cols.sum() > 2:
+        row_pen = penalties(row_vals, rows)
+        col_pen = penalties(col_vals, cols)
+        if row_pen.max() >= col_pen.max():
+            i = int(np.argmax(row_pen))
+            j = int(row_idx[i, 0])
+        else:
+            j = int(np.argmax(col_pen))
+            i = int(col_idx[j, 0])
+
+        q = min(supply[i], demand[j])
+        flow[i, j] = q
+        basis.append((i, j))
+        supply[i] -= q
+        demand[j] -= q
+        # Вычеркиваем ровно одну линию, оставляя хотя бы одну строку и один столбец
+        if supply[i] <= TOL and rows.sum() > 1:
+            rows[i] = False
+            work[i, :] = np.inf
+            stale = np.flatnonzero(cols & ((col_idx[:, 0] == i) | (col_idx[:, 1] == i)))
+            if len(stale):
+                col_idx[stale], col_vals[stale] = _two_smallest(work[:, stale], axis=0)
+        else:
+            cols[j] = False
+            work[:, j] = np.inf
+            stale = np.flatnonzero(rows & ((row_idx[:, 0] == j) | (row_idx[:, 1] == j)))
+            if len(stale):
+                row_idx[stale], row_vals[stale] = _two_smallest(work[stale, :], axis=1)
+
+    # Последняя клетка на пересечении оставшихся строки и столбца
+    i, j = np.flatnonzero(rows)[0], np.flatnonzero(cols)[0]
+    flow[i, j] = supply[i]
+    basis.append((i, j))
+    return flow, basis
+
+
+def _traverse(adj, cost_rows, m, n):
+    """Обход дерева базиса в ширину от строки 0
+
+    Вершины 0..m-1 - строки, m..m+n-1 - столбцы; cost_rows - матрица стоимостей
+    в виде списка списков (поэлементный доступ к ним быстрее, чем к массиву).
+    Возвращает списки предков, глубин и потенциалов (u_i + v_j = c_ij).
+    """
+    parent = [-1] * (m + n)
+    depth = [0] * (m + n)
+    pot = [0.0] * (m + n)
+    parent[0] = 0
+    queue = deque([0])
+    while queue:
+        node = queue.popleft()
+        for nxt in adj[node]:
+            if parent[nxt] == -1:
+                parent[nxt] = node
+                depth[nxt] = depth[node] + 1
+                if nxt >= m:
+                    pot[nxt] = cost_rows[node][nxt - m] - pot[node]
+                else:
+                    pot[nxt] = cost_rows[nxt][node - m] - pot[node]
+                queue.append(nxt)
+    return parent, depth, np.array(pot)
+
+
+def _edge(a, b, m):
+    """Клетка (строка, столбец), соответствующая ребру дерева между вершинами a и b"""
+    return (a, b - m) if a < m else (b, a - m)
+
+
+def _cycle(parent, depth, i, j, m):
+    """Путь в дереве от столбца j до строки i (без вводимой клетки (i, j))"""
+    a, b = m + j, i
+    head, tail = [], []
+    while depth[a] > depth[b]:
+        head.append(_edge(a, parent[a], m))
+        a = parent[a]
+    while depth[b] > depth[a]:
+        tail.append(_edge(b, parent[b], m))
+        b = parent[b]
+    while a != b:
+        head.append(_edge(a, parent[a], m))
+        tail.append(_edge(b, parent[b], m))
+        a, b = parent[a], parent[b]
+    return head + tail[::-1]
+
+
+def modi(cost, supply, demand, allowed=None, start='vogel', max_iter=None):
+    """Решает сбалансированную транспортную задачу методом потенциалов
+
+    allowed - булева матрица разрешенных клеток. Возвращает пару
+    (стоимость, матрица перевозок) или (None, None), если задача
+    несбалансирована или не имеет допустимого плана.
+    """
+    cost = np.asarray(cost, dtype=float)
+    supply = np.asarray(supply, dtype=float)
+    demand = np.asarray(demand, dtype=float)
+    m, n = cost.shape
+    if allowed is None:
+        allowed = np.ones((m, n), dtype=bool)
+    allowed = np.asarray(allowed, dtype=bool)
+
+    if (supply < -TOL).any() or (demand < -TOL).any():
+        return None, None
+    if abs(supply.sum() - demand.sum()) > TOL * max(1.0, supply.sum()):
+        return None, None
+
+    # Запрещенные клетки получают большой штраф: если они останутся в плане
+    # с ненулевой перевозкой, допустимого плана нет
+    work = np.where(allowed, cost, _big_m(cost, allowed))
+    if start == 'northwest':
+        flow, basis = northwest_corner(supply, demand)
+    else:
+        flow, basis = vogel(cost, supply, demand, allowed)
+
+    if max_iter is None:
+        max_iter = 50 * (m + n) * max(m, n)
+    work_rows = work.tolist()
+    blocked = ~allowed
+    for cell in basis:
+        blocked[cell] = True
+    adj = [set() for _ in range(m + n)]
+    for i, j in basis:
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+
+    tol = TOL * max(1.0, np.abs(work).max())
+    delta = None
+    fresh = False
+    for it in range(max_iter):
+        # Оценки пересчитываются полностью в начале и периодически (от накопления
+        # погрешностей), в остальное время обновляются только для перевешенного поддерева
+        if delta is None or it % (m + n) == 0:
+            parent, depth, pot = _traverse(adj, work_rows, m, n)
+            delta = work - pot[:m, None] - pot[None, m:]
+            # Запрещенные и базисные клетки в базис не вводятся
+            delta[blocked] = np.inf
+            fresh = True
+        k = int(np.argmin(delta))
+        if delta.flat[k] >= -tol:
+            if fresh:
+                break
+            delta = None
+            continue
+        i, j = divmod(k, n)
+        d_in = delta.flat[k]
+        fresh = False
+
+        # Цикл: вводимая клетка (+), далее клетки пути от столбца j до строки i (-, +, ...)
+        path = _cycle(parent, depth, i, j, m)
+        minus = path[0::2]
+        plus = path[1::2]
+
+        theta_cell = min(minus, key=lambda cell: flow[cell])
+        theta = flow[theta_cell]
+        flow[i, j] += theta
+        for cell in minus:
+            flow[cell] -= theta
+        for cell in plus:
+            flow[cell] += theta
+        flow[theta_cell] = 0.0
+
+        # Удаление выводимой клетки отрезает поддерево; оно перевешивается на вводимую клетку
+        r, c = theta_cell
+        q = r if depth[r] > depth[m + c] else m + c
+        node = i
+        while depth[node] > depth[q]:
+            node = parent[node]
+        e_in, e_out = (i, m + j) if node == q else (m + j, i)
+
+        adj[r].discard(m + c)
+        adj[m + c].discard(r)
+        adj[i].add(m + j)
+        adj[m + j].add(i)
+
+        parent[e_in] = e_out
+        depth[e_in] = depth[e_out] + 1
+        subtree = [e_in]
+        for node in subtree:
+            for nxt in adj[node]:
+                if nxt != parent[node]:
+                    parent[nxt] = node
+                    depth[nxt] = depth[node] + 1
+                    subtree.append(nxt)
+
+        # Потенциалы поддерева сдвигаются так, чтобы оценка вводимой клетки стала нулевой
+        sub = np.array(subtree)
+        sub_rows = sub[sub < m]
+        sub_cols = sub[sub >= m]
+        shift = d_in if e_in < m else -d_in
+        pot[sub_rows] += shift
+        pot[sub_cols] -= shift
+        delta[sub_rows, :] -= shift
+        delta[:, sub_cols - m] += shift
+
+        blocked[i, j] = True
+        delta[i, j] = np.inf
+        blocked[r, c] = not allowed[r, c]
+        if allowed[r, c]:
+            delta[r, c] = work[r, c] - pot[r] - pot[m + c]
+    else:
+        raise RuntimeError("Метод потенциалов не сошелся за допустимое число итераций")
+
+    if (flow[~allowed] > TOL).any():
+        return None, None
+    flow[np.abs(flow) < TOL] = 0.0
+    return float((cost * flow).sum()), flow
+
+
+def solve(cost, supply, demand, forbidden=(), fixed=None, start='vogel', allowed=None):
+    """Транспортная задача с запретами и фиксированными перевозками
+
+    forbidden - список клеток (i, j), в которых перевозка равна нулю,
+    allowed - булева матрица разрешенных клеток (для сетей, где разрешенных
+    клеток меньше, чем запрещенных), fixed - словарь {(i, j): объем}
+    обязательных перевозок. Фиксированный объем вычитается из запасов и
+    потребностей, клетка запрещается, а после решения объем возвращается в
+    план. Возвращает (стоимость, матрица).
+    """
+    cost = np.asarray(cost, dtype=float)
+    supply = np.array(supply, dtype=float)
+    demand = np.array(demand, dtype=float)
+    allowed = np.ones(cost.shape, dtype=bool) if allowed is None else np.array(allowed, dtype=bool)
+    for cell in forbidden:
+        allowed[cell] = False
+
+    fixed = fixed or {}
+    for (i, j), q in fixed.items():
+        if q < 0 or (not allowed[i, j] and q > 0):
+            return None, None
+        supply[i] -= q
+        demand[j] -= q
+        allowed[i, j] = False
+
+    total, flow = modi(cost, supply, demand, allowed, start=start)
+    if flow is None:
+        return None, None
+    for (i, j), q in fixed.items():
+        flow[i, j] += q
+    return total + sum(cost[cell] * q for cell, q in fixed.items()), flow